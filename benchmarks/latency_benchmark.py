@@ -0,0 +1,268 @@
+########################################################################
+# Per-agent latency benchmark on recorded games
+#
+# python benchmarks/latency_benchmark.py transcript/ --output latency.json
+# python benchmarks/latency_benchmark.py transcript/ --output latency_new.json --baseline latency.json
+#
+# Every transcript is replayed through each agent class with a stubbed LLM,
+# so the numbers only depend on the agent code and the simulated latency.
+#########################################################################
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from replay import create_agent, load_agent_class, load_transcript, percentile, replay
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class AgentSpec:
+    agent_dir: str  # sys.path entry the module is imported from
+    module: str
+    agent_class: str
+    config_dir: str  # directory holding the agent's config.yaml
+
+
+AGENTS: Dict[str, AgentSpec] = {
+    "CoTAgent": AgentSpec(
+        "src/werewolf_agents/SuperWolf", "agent/cot_agent.py", "CoTAgent", "src/werewolf_agents/SuperWolf"
+    ),
+    "CoTAgent-DAG": AgentSpec(
+        "src/werewolf_agents/SuperWolfDAG", "agent/cot_agent.py", "CoTAgent", "src/werewolf_agents/SuperWolfDAG"
+    ),
+    # imports its prompts from the parent package, so it is loaded from src
+    "AutogenCoTAgent": AgentSpec(
+        "src", "werewolf_agents/SuperWolf/agent/autogen_cot_agent.py", "AutogenCoTAgent", "src/werewolf_agents/SuperWolf"
+    ),
+    "WerewolfAgent": AgentSpec(
+        "src/werewolf_agents/autogen_sample", "agent/single_agent.py", "WerewolfAgent", "src/werewolf_agents/autogen_sample"
+    ),
+    "SimpleReactiveAgent": AgentSpec(
+        "src/werewolf_agents/simple_sample", "agent/super_simple.py", "SimpleReactiveAgent", "src/werewolf_agents/simple_sample"
+    ),
+}
+
+# Answers that only name a player (the CoT agents' action types).
+VOTE_ACTIONS = ("day_vote", "wolf_target", "seer_check", "doctor_save")
+
+# Summary values compared against a baseline, lower is better for all of them.
+COMPARED_METRICS = (
+    "respond_latency_s.p50",
+    "respond_latency_s.p95",
+    "respond_latency_s.p99",
+    "vote_latency_s.p50",
+    "vote_latency_s.p95",
+    "notify_latency_s.p95",
+    "llm_calls_per_decision",
+    "prompt_tokens_per_decision",
+    "completion_tokens_per_decision",
+    "peak_memory_mb",
+)
+
+
+def find_transcripts(paths: List[str], player: Optional[str]) -> List[Tuple[str, str]]:
+    """(transcript, player) pairs. Directories are searched for *.jsonl. The
+    runner names transcripts <player>_..., so the player defaults to that prefix."""
+    files = []
+    for path in map(Path, paths):
+        files.extend(sorted(path.rglob("*.jsonl")) if path.is_dir() else [path])
+    return [(str(f), player or f.name.split("_", 1)[0]) for f in files]
+
+
+def load_stub_class(spec: str):
+    """`module:Class`, e.g. replay:StubChatModel. The class is built with
+    latency_ms, jitter_ms, seed and ms_per_token and must look like
+    replay.StubChatModel."""
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean": statistics.mean(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values, default=0.0),
+    }
+
+
+def summarize(decisions: List[Dict[str, Any]], notify_latencies: List[float], totals: Dict[str, int]) -> Dict[str, Any]:
+    count = len(decisions) or 1
+    return {
+        "decisions": len(decisions),
+        "respond_latency_s": latency_summary([d["latency_s"] for d in decisions]),
+        # time to decision for votes, targets, checks and saves
+        "vote_latency_s": latency_summary([d["latency_s"] for d in decisions if d.get("action") in VOTE_ACTIONS]),
+        "notify_latency_s": latency_summary(notify_latencies),
+        "llm_calls_per_decision": sum(d["llm_calls"] for d in decisions) / count,
+        "prompt_tokens_per_decision": sum(d["prompt_tokens"] for d in decisions) / count,
+        "completion_tokens_per_decision": sum(d["completion_tokens"] for d in decisions) / count,
+        # including the calls made while notified, e.g. background summaries
+        **totals,
+    }
+
+
+async def bench_agent(name: str, spec: AgentSpec, transcripts: List[Tuple[str, str]], args) -> Dict[str, Any]:
+    agent_class = load_agent_class(str(REPO_ROOT / spec.agent_dir), spec.module, spec.agent_class)
+    config_path = REPO_ROOT / spec.config_dir / "config.yaml"
+    config = {}
+    if config_path.exists():
+        with open(config_path) as f:
+            config = yaml.safe_load(f) or {}
+    if not args.agent_logs:
+        logging.disable(logging.INFO)
+    stub_class = load_stub_class(args.stub_model)
+
+    # build one agent up front so lazy imports do not count towards peak memory
+    create_agent(agent_class, transcripts[0][1], config, stub_class(latency_ms=0.0, jitter_ms=0.0, seed=args.seed, ms_per_token=0.0))
+
+    decisions, notify_latencies = [], []
+    totals = {"games": 0, "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    started = time.perf_counter()
+    tracemalloc.start()
+    try:
+        for path, player in transcripts:
+            messages = load_transcript(path, player)
+            if not any(message.expects_response for message in messages):
+                continue
+            model = stub_class(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed, ms_per_token=args.ms_per_token)
+            span_path = str(Path(path).with_name(f"{Path(path).stem}_{name}_llm_spans.jsonl")) if args.spans else None
+            agent = create_agent(agent_class, player, config, model, span_path)
+            game = await replay(agent, messages, player, model, notify_latencies)
+            for decision in game:
+                decision["transcript"] = path
+            decisions.extend(game)
+            totals["games"] += 1
+            totals["llm_calls"] += model.calls
+            totals["prompt_tokens"] += model.prompt_tokens
+            totals["completion_tokens"] += model.completion_tokens
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        logging.disable(logging.NOTSET)
+
+    summary = summarize(decisions, notify_latencies, totals)
+    summary["peak_memory_mb"] = peak / 2**20
+    summary["wall_s"] = time.perf_counter() - started
+    return {"spec": asdict(spec), "summary": summary, "decisions": decisions}
+
+
+def metric(summary: Dict[str, Any], path: str) -> Optional[float]:
+    value = summary
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(baseline: Dict[str, Any], results: Dict[str, Any]):
+    for name, result in results["agents"].items():
+        previous = baseline.get("agents", {}).get(name, {})
+        if "summary" not in result or "summary" not in previous:
+            continue
+        print(f"{name} (vs {baseline['meta'].get('commit', 'baseline')}):")
+        for path in COMPARED_METRICS:
+            old, new = metric(previous["summary"], path), metric(result["summary"], path)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old:+.1%}" if old else "n/a"
+            print(f"  {path:<32} {old:>12.4f} -> {new:>12.4f}  {change}")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> Dict[str, Any]:
+    transcripts = find_transcripts(args.transcripts, args.player)
+    if not transcripts:
+        raise SystemExit(f"No transcripts found in {args.transcripts}")
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "transcripts": [path for path, _ in transcripts],
+            "stub_model": args.stub_model,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "ms_per_token": args.ms_per_token,
+            "seed": args.seed,
+        },
+        "agents": {},
+    }
+    for name in args.agents:
+        try:
+            results["agents"][name] = await bench_agent(name, AGENTS[name], transcripts, args)
+            summary = results["agents"][name]["summary"]
+            print(
+                f"{name:>20}: {summary['decisions']} decisions, "
+                f"p50 {summary['respond_latency_s']['p50']:.3f}s, p95 {summary['respond_latency_s']['p95']:.3f}s, "
+                f"vote p50 {summary['vote_latency_s']['p50']:.3f}s, "
+                f"{summary['llm_calls_per_decision']:.1f} calls and "
+                f"{summary['prompt_tokens_per_decision']:.0f}+{summary['completion_tokens_per_decision']:.0f} tokens "
+                f"per decision, peak {summary['peak_memory_mb']:.1f} MB"
+            )
+        except Exception as e:
+            if args.strict:
+                raise
+            # e.g. an agent whose dependencies are not installed
+            results["agents"][name] = {"spec": asdict(AGENTS[name]), "error": f"{type(e).__name__}: {e}"}
+            print(f"{name:>20}: failed, {type(e).__name__}: {e}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-agent latency, LLM call, token and memory benchmark on recorded games")
+    parser.add_argument("transcripts", nargs="+", help="runner transcripts (JSONL) or directories holding them")
+    parser.add_argument("--player", help="player to replay as, by default the transcript file name prefix")
+    parser.add_argument("--agents", nargs="+", default=list(AGENTS), choices=list(AGENTS))
+    parser.add_argument("--stub-model", default="replay:StubChatModel", help="module:Class of the simulated LLM")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="mean simulated LLM latency")
+    parser.add_argument("--jitter-ms", type=float, default=200.0)
+    parser.add_argument("--ms-per-token", type=float, default=0.0, help="simulated generation time per completion token")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spans", action="store_true", help="write the agents' LLM spans next to each transcript")
+    parser.add_argument("--agent-logs", action="store_true", help="keep the agents' INFO/DEBUG logging on")
+    parser.add_argument("--strict", action="store_true", help="stop at the first agent that fails")
+    parser.add_argument("--baseline", help="results of an earlier run to compare against")
+    parser.add_argument("--output", default="latency_benchmark.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
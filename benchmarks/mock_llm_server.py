@@ -0,0 +1,255 @@
+########################################################################
+# OpenAI-compatible mock LLM server for offline games and benchmarks
+#
+# python benchmarks/mock_llm_server.py --profile realistic --port 8089
+#
+# then in .env:
+# SENTIENT_DEFAULT_LLM_BASE_URL="http://127.0.0.1:8089"
+# (the runner starts agents in docker, from there use
+#  http://host.docker.internal:8089 and start the server with --host 0.0.0.0)
+#########################################################################
+
+import argparse
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from werewolf_answers import plausible_answer, prompt_text
+
+logger = logging.getLogger("mock_llm_server")
+
+
+@dataclass
+class Profile:
+    """Upstream behaviour. Latencies are in milliseconds."""
+
+    latency: str = "lognormal"  # constant | normal | lognormal | uniform
+    latency_ms: float = 1500.0  # mean (normal), median (lognormal), value (constant), low end (uniform)
+    latency_spread: float = 0.5  # std dev in ms (normal), sigma (lognormal), high end in ms (uniform)
+    ms_per_completion_token: float = 0.0  # added per generated token, as a streaming model would
+    rate_limit_rate: float = 0.0  # share of requests answered with 429
+    retry_after_s: float = 2.0
+    timeout_rate: float = 0.0  # share of requests that hang for hang_s before answering
+    hang_s: float = 120.0
+    error_rate: float = 0.0  # share of requests answered with 500
+    max_concurrency: int = 0  # 429 once this many requests are in flight, 0 for no limit
+
+
+PROFILES: Dict[str, Profile] = {
+    "instant": Profile(latency="constant", latency_ms=0.0),
+    "fast": Profile(latency="normal", latency_ms=300.0, latency_spread=50.0),
+    "realistic": Profile(latency="lognormal", latency_ms=2500.0, latency_spread=0.6, ms_per_completion_token=15.0),
+    "congested": Profile(
+        latency="lognormal", latency_ms=6000.0, latency_spread=0.9, ms_per_completion_token=25.0,
+        rate_limit_rate=0.1, timeout_rate=0.02, error_rate=0.01, max_concurrency=16,
+    ),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / 4)
+
+
+class MockLLM:
+    def __init__(self, profile: Profile, seed: int = 0):
+        self.profile = profile
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = {"requests": 0, "completed": 0, "rate_limited": 0, "timeouts": 0, "errors": 0,
+                      "stopped_streams": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def latency_s(self, completion_tokens: int) -> float:
+        p = self.profile
+        with self.lock:
+            if p.latency == "constant":
+                ms = p.latency_ms
+            elif p.latency == "normal":
+                ms = self.random.gauss(p.latency_ms, p.latency_spread)
+            elif p.latency == "lognormal":
+                ms = p.latency_ms * math.exp(self.random.gauss(0.0, p.latency_spread))
+            elif p.latency == "uniform":
+                ms = self.random.uniform(p.latency_ms, p.latency_spread)
+            else:
+                raise ValueError(f"Unknown latency distribution {p.latency!r}")
+        return max(0.0, ms + completion_tokens * p.ms_per_completion_token) / 1000.0
+
+    def roll(self, rate: float) -> bool:
+        with self.lock:
+            return rate > 0 and self.random.random() < rate
+
+    def count(self, key: str, amount: int = 1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def answer(self, messages) -> str:
+        with self.lock:
+            return plausible_answer(messages, self.random)
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "MockLLM/0.1"
+    llm: MockLLM = None
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send(self, status: int, body: dict, headers: Dict[str, str] = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status: int, message: str, kind: str, headers: Dict[str, str] = None):
+        self._send(status, {"error": {"message": message, "type": kind, "code": status}}, headers)
+
+    def _stream(self, request: dict, content: str, completion_id: str) -> int:
+        """Sends the answer a word at a time as server-sent events, ms_per_completion_token
+        apart. Returns the completion tokens sent before the client hung up."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        sent = 0
+        for piece in re.findall(r"\s*\S+", content):
+            tokens = estimate_tokens(piece)
+            time.sleep(tokens * self.llm.profile.ms_per_completion_token / 1000.0)
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "mock-werewolf"),
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            }
+            try:
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                self.llm.count("stopped_streams")
+                return sent
+            sent += tokens
+        self.wfile.write(b"data: [DONE]\n\n")
+        return sent
+
+    def _rate_limited(self):
+        self.llm.count("rate_limited")
+        self._error(429, "Rate limit reached, please retry later", "rate_limit_error",
+                    {"Retry-After": f"{self.llm.profile.retry_after_s:g}"})
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path in ("/models", "/v1/models"):
+            self._send(200, {"object": "list", "data": [{"id": "mock-werewolf", "object": "model", "owned_by": "mock"}]})
+        elif path == "/stats":
+            self._send(200, {**self.llm.stats, "profile": asdict(self.llm.profile)})
+        else:
+            self._error(404, f"Unknown path {self.path}", "not_found")
+
+    def do_POST(self):
+        if self.path.rstrip("/") not in ("/chat/completions", "/v1/chat/completions"):
+            self._error(404, f"Unknown path {self.path}", "not_found")
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            messages = request["messages"]
+        except (ValueError, KeyError) as e:
+            self._error(400, f"Invalid request: {e}", "invalid_request_error")
+            return
+
+        llm, profile = self.llm, self.llm.profile
+        llm.count("requests")
+        with llm.lock:
+            saturated = profile.max_concurrency and llm.in_flight >= profile.max_concurrency
+            if not saturated:
+                llm.in_flight += 1
+        if saturated:
+            self._rate_limited()
+            return
+        try:
+            if llm.roll(profile.rate_limit_rate):
+                self._rate_limited()
+                return
+            if llm.roll(profile.error_rate):
+                llm.count("errors")
+                self._error(500, "Internal server error", "server_error")
+                return
+            content = llm.answer(messages)
+            prompt_tokens = estimate_tokens(prompt_text(messages))
+            completion_tokens = estimate_tokens(content)
+            if llm.roll(profile.timeout_rate):
+                llm.count("timeouts")
+                time.sleep(profile.hang_s)
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+            llm.count("prompt_tokens", prompt_tokens)
+            if request.get("stream"):
+                # time to the first token, the rest is paced per token
+                time.sleep(llm.latency_s(0))
+                llm.count("completion_tokens", self._stream(request, content, completion_id))
+                llm.count("completed")
+                return
+            time.sleep(llm.latency_s(completion_tokens))
+            llm.count("completed")
+            llm.count("completion_tokens", completion_tokens)
+            self._send(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock-werewolf"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("Client went away before the answer was sent")
+        finally:
+            with llm.lock:
+                llm.in_flight -= 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM for werewolf agents")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--profile", default="realistic", choices=sorted(PROFILES))
+    parser.add_argument("--seed", type=int, default=0)
+    # any Profile field can be overridden, e.g. --rate-limit-rate 0.2
+    for field, default in asdict(Profile()).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=None)
+    args = parser.parse_args()
+
+    overrides = {field: getattr(args, field) for field in asdict(Profile()) if getattr(args, field) is not None}
+    profile = replace(PROFILES[args.profile], **overrides)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    Handler.llm = MockLLM(profile, seed=args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    logger.info(f"Mock LLM listening on http://{args.host}:{args.port} with {profile}")
+    logger.info(f'Set SENTIENT_DEFAULT_LLM_BASE_URL="http://{args.host}:{args.port}" in .env to use it')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info(f"Stats: {Handler.llm.stats}")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
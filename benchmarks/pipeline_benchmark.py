@@ -0,0 +1,81 @@
+########################################################################
+# Compares decision pipelines (full / fast / fast_critique / dag) on replayed games
+#
+# python benchmarks/pipeline_benchmark.py --agent-dir src/werewolf_agents/SuperWolf \
+#     --player Ethan games/*.jsonl --output pipeline_benchmark.json
+#########################################################################
+
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import statistics
+from pathlib import Path
+
+import yaml
+
+from replay import StubChatModel, create_agent, load_agent_class, load_transcript, percentile, replay
+
+PIPELINES = ("full", "fast", "fast_critique", "dag")
+
+
+def summarize(decisions):
+    latencies = [d["latency_s"] for d in decisions]
+    return {
+        "decisions": len(decisions),
+        "latency_mean_s": statistics.mean(latencies) if latencies else 0.0,
+        "latency_p50_s": percentile(latencies, 50),
+        "latency_p95_s": percentile(latencies, 95),
+        "llm_calls_per_decision": statistics.mean(d["llm_calls"] for d in decisions) if decisions else 0.0,
+        "prompt_tokens": sum(d["prompt_tokens"] for d in decisions),
+        "completion_tokens": sum(d["completion_tokens"] for d in decisions),
+    }
+
+
+async def run(args):
+    agent_dir = Path(args.agent_dir)
+    with open(agent_dir / "config.yaml") as f:
+        base_config = yaml.safe_load(f) or {}
+    agent_class = load_agent_class(str(agent_dir), args.module, args.agent_class)
+
+    results = {}
+    for mode in args.pipelines:
+        config = copy.deepcopy(base_config)
+        config["pipeline"] = {"default": mode, **{kind: mode for kind in config.get("pipeline", {})}}
+        decisions = []
+        for path in args.transcripts:
+            model = StubChatModel(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed)
+            agent = create_agent(agent_class, args.player, config, model)
+            game = await replay(agent, load_transcript(path, args.player), args.player, model)
+            for decision in game:
+                decision["transcript"] = path
+            decisions.extend(game)
+        results[mode] = {"summary": summarize(decisions), "decisions": decisions}
+        print(f"{mode:>14}: {json.dumps(results[mode]['summary'])}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare decision pipelines on replayed games")
+    parser.add_argument("transcripts", nargs="+", help="runner transcripts (JSONL) to replay")
+    parser.add_argument("--agent-dir", default="src/werewolf_agents/SuperWolf")
+    parser.add_argument("--module", default="agent/cot_agent.py")
+    parser.add_argument("--agent-class", default="CoTAgent")
+    parser.add_argument("--player", required=True, help="player name to replay the transcript as")
+    parser.add_argument("--pipelines", nargs="+", default=["full", "fast", "fast_critique"], choices=PIPELINES)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="mean simulated LLM latency")
+    parser.add_argument("--jitter-ms", type=float, default=200.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="pipeline_benchmark.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
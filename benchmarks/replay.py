@@ -0,0 +1,350 @@
+########################################################################
+# Replays recorded game transcripts through an agent with a stubbed LLM
+#########################################################################
+
+import asyncio
+import importlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from sentient_campaign.agents.v1.message import (
+    ActivityMessage,
+    ActivityMessageHeader,
+    MessageChannelType,
+    MimeType,
+    TextContent,
+)
+
+from werewolf_answers import plausible_answer
+
+MODERATOR_NAME = "moderator"
+
+# Moderator prompts that expect an answer, from z-moderator-prompts/templates.
+REQUEST_PATTERNS = [
+    r"^\s*Discussion:\s*Hey {name},",
+    r"^\s*Day vote:\s*Hello {name},",
+    r"^\s*Day vote retry:",
+    r"^\s*Seer guess:\s*Hello seer {name},",
+    r"^\s*Seer guess retry:",
+    r"^\s*Doctor save:\s*Hello Doctor {name} ",
+    r"^\s*Doctor save retry:",
+    r"^\s*Wolf vote:\s*Hello wolf {name} ",
+    r"^\s*Wolf vote retry:",
+]
+# Action type of a request, named as the CoT agents name them.
+REQUEST_KINDS = [
+    ("day_vote", re.compile(r"^\s*Day vote( retry)?:", re.IGNORECASE)),
+    ("seer_check", re.compile(r"^\s*Seer guess( retry)?:", re.IGNORECASE)),
+    ("doctor_save", re.compile(r"^\s*Doctor save( retry)?:", re.IGNORECASE)),
+    ("wolf_target", re.compile(r"^\s*Wolf vote( retry)?:", re.IGNORECASE)),
+]
+
+
+@dataclass
+class TranscriptMessage:
+    sender: str
+    channel: str
+    is_direct: bool
+    text: str
+    expects_response: bool
+
+
+def _field(entry: Dict[str, Any], *paths: str, default=None):
+    for path in paths:
+        value = entry
+        for key in path.split("."):
+            if not isinstance(value, dict) or key not in value:
+                value = None
+                break
+            value = value[key]
+        if value is not None:
+            return value
+    return default
+
+
+def load_transcript(path: str, player_name: str) -> List[TranscriptMessage]:
+    """Reads a runner transcript (JSONL) as the messages `player_name` received.
+
+    The runner's record layout is not versioned, so both ActivityMessage-shaped
+    records (header/content) and flat records (sender/channel/text) are accepted.
+    """
+    requests = [re.compile(p.format(name=re.escape(player_name)), re.IGNORECASE) for p in REQUEST_PATTERNS]
+    messages = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            sender = _field(entry, "header.sender", "sender", "from", default="")
+            if sender == player_name:
+                continue
+            text = _field(entry, "content.text", "text", "content", "message", default="")
+            if not isinstance(text, str) or not text:
+                continue
+            channel = _field(entry, "header.channel", "channel", default="play-arena")
+            channel_type = str(_field(entry, "header.channel_type", "channel_type", default="")).lower()
+            is_direct = "direct" in channel_type or channel == "direct"
+            expects_response = _field(entry, "expects_response", "requires_response")
+            if expects_response is None:
+                expects_response = sender == MODERATOR_NAME and any(p.search(text) for p in requests)
+            messages.append(TranscriptMessage(sender, channel, is_direct, text, bool(expects_response)))
+    return messages
+
+
+def to_activity_message(message: TranscriptMessage, message_id: int, player_name: str) -> ActivityMessage:
+    return ActivityMessage(
+        content_type=MimeType.TEXT_PLAIN,
+        header=ActivityMessageHeader(
+            message_id=str(message_id),
+            sender=message.sender,
+            channel=message.channel,
+            channel_type=MessageChannelType.DIRECT if message.is_direct else MessageChannelType.GROUP,
+            target_receivers=[player_name] if message.is_direct else [],
+        ),
+        content=TextContent(text=message.text),
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+class StubChatModel:
+    """Plausible werewolf answers with a configurable latency, and token accounting.
+
+    `latency_ms` is the wait for the first token, `ms_per_token` is added for
+    every completion token, so streamed answers that are cut short cost less.
+    """
+
+    def __init__(self, latency_ms: float = 800.0, jitter_ms: float = 200.0, seed: int = 0, ms_per_token: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.ms_per_token = ms_per_token
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()  # sync agents call from worker threads
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def latency(self) -> float:
+        with self.lock:
+            return max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000.0
+
+    def generation_s(self, completion_tokens: int) -> float:
+        return completion_tokens * self.ms_per_token / 1000.0
+
+    def answer(self, messages: List[Dict[str, Any]]) -> Tuple[str, int]:
+        """The answer text and the prompt's token count."""
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+        with self.lock:
+            return plausible_answer(messages, self.random), prompt_tokens
+
+    def account(self, prompt_tokens: int, completion_tokens: int):
+        with self.lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def complete(self, messages: List[Dict[str, Any]]) -> SimpleNamespace:
+        text, prompt_tokens = self.answer(messages)
+        completion_tokens = estimate_tokens(text)
+        self.account(prompt_tokens, completion_tokens)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text, role="assistant"), finish_reason="stop")],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+
+class _AsyncStubStream:
+    """The answer a word at a time, like the chunks of a streamed chat completion.
+    Only the words read before close() are accounted for."""
+
+    def __init__(self, model: StubChatModel, messages: List[Dict[str, Any]]):
+        self.model = model
+        self.text, self.prompt_tokens = model.answer(messages)
+        self.sent = ""
+        self.closed = False
+
+    async def _chunks(self):
+        for piece in re.findall(r"\s*\S+", self.text):
+            await asyncio.sleep(self.model.generation_s(estimate_tokens(piece)))
+            self.sent += piece
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=None)], usage=None)
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            self.model.account(self.prompt_tokens, estimate_tokens(self.sent))
+
+
+class _AsyncCompletions:
+    def __init__(self, model: StubChatModel):
+        self.model = model
+
+    async def create(self, messages, stream: bool = False, **kwargs):
+        await asyncio.sleep(self.model.latency())
+        if stream:
+            return _AsyncStubStream(self.model, messages)
+        response = self.model.complete(messages)
+        await asyncio.sleep(self.model.generation_s(response.usage.completion_tokens))
+        return response
+
+
+class _SyncCompletions:
+    def __init__(self, model: StubChatModel):
+        self.model = model
+
+    def create(self, messages, **kwargs):
+        time.sleep(self.model.latency())
+        response = self.model.complete(messages)
+        time.sleep(self.model.generation_s(response.usage.completion_tokens))
+        return response
+
+
+class AsyncStubOpenAI:
+    def __init__(self, model: StubChatModel):
+        self.chat = SimpleNamespace(completions=_AsyncCompletions(model))
+
+
+class SyncStubOpenAI:
+    def __init__(self, model: StubChatModel):
+        self.chat = SimpleNamespace(completions=_SyncCompletions(model))
+
+    def with_options(self, **options):
+        return self
+
+
+class AutogenStubClient:
+    """Stands in for autogen's OpenAIWrapper (ConversableAgent.client)."""
+
+    def __init__(self, model: StubChatModel):
+        self.model = model
+
+    def create(self, messages, **kwargs):
+        time.sleep(self.model.latency())
+        response = self.model.complete(messages)
+        time.sleep(self.model.generation_s(response.usage.completion_tokens))
+        return response
+
+    def extract_text_or_completion_object(self, response):
+        return [choice.message.content for choice in response.choices]
+
+
+def _stubbed(client, stub):
+    # keep a record/replay cache (agent/llm_cache.py) in front of the stub
+    cache = getattr(client, "_cache", None)
+    if cache is None:
+        return stub
+    return cache.wrap_async(stub) if isinstance(stub, AsyncStubOpenAI) else cache.wrap(stub)
+
+
+def attach_stub(agent, model: StubChatModel) -> List[str]:
+    """Points every LLM client the agent is known to hold at `model`. Returns
+    the attributes that were replaced."""
+    replaced = []
+    llm = getattr(agent, "llm", None)
+    if llm is not None and hasattr(llm, "client"):  # CoT agents, agent/llm_client.py
+        llm.client = _stubbed(llm.client, AsyncStubOpenAI(model))
+        replaced.append("llm.client")
+        if hasattr(llm, "hedge_client"):  # duplicates of hedged requests
+            llm.hedge_client = llm.client
+            replaced.append("llm.hedge_client")
+    thinking_agent = getattr(agent, "thinking_agent", None)
+    if thinking_agent is not None:  # AutogenCoTAgent, agent/decider_agent.py
+        thinking_agent.openai_client = _stubbed(thinking_agent.openai_client, SyncStubOpenAI(model))
+        replaced.append("thinking_agent.openai_client")
+    if hasattr(agent, "openai_client"):  # SimpleReactiveAgent
+        agent.openai_client = _stubbed(agent.openai_client, SyncStubOpenAI(model))
+        replaced.append("openai_client")
+    conversable_agent = getattr(agent, "conversable_agent", None)
+    if conversable_agent is not None:  # autogen_sample WerewolfAgent
+        conversable_agent.client = AutogenStubClient(model)
+        replaced.append("conversable_agent.client")
+    return replaced
+
+
+def load_agent_class(agent_dir: str, module_path: str, class_name: str):
+    """Imports an agent the way PlayerAgentConfig names it, e.g. agent/cot_agent.py + CoTAgent."""
+    # every sample ships its own top level `agent` package
+    for name in [m for m in sys.modules if m == "agent" or m.startswith("agent.")]:
+        del sys.modules[name]
+    sys.path.insert(0, str(Path(agent_dir).resolve()))
+    try:
+        module = importlib.import_module(module_path.removesuffix(".py").replace("/", "."))
+    finally:
+        sys.path.pop(0)
+    return getattr(module, class_name)
+
+
+def create_agent(agent_class, player_name: str, config: Optional[dict], model: StubChatModel, span_path: Optional[str] = None):
+    """span_path, if given, is where the agent's LLM spans go (agent/tracing.py),
+    otherwise span export is turned off."""
+    config = {**(config or {}), "tracing": {**(config or {}).get("tracing", {}), "path": span_path, "otlp_path": None}}
+    agent = agent_class()
+    agent._sentient_llm_config = {
+        "config_list": [{
+            "llm_model_name": "stub-model",
+            "api_key": "stub",
+            "llm_base_url": "http://localhost:0",
+        }]
+    }
+    agent.__initialize__(player_name, "A werewolf player", config)
+    if not attach_stub(agent, model):
+        raise ValueError(f"No known LLM client on {type(agent).__name__} to replace with the stub")
+    return agent
+
+
+async def replay(
+    agent,
+    messages: List[TranscriptMessage],
+    player_name: str,
+    model: StubChatModel,
+    notify_latencies: Optional[List[float]] = None,
+) -> List[Dict[str, Any]]:
+    """Feeds a transcript to the agent and measures every response. The time
+    spent in async_notify is appended to `notify_latencies` when given."""
+    decisions = []
+    for index, message in enumerate(messages):
+        activity_message = to_activity_message(message, index, player_name)
+        if not message.expects_response:
+            start = time.perf_counter()
+            await agent.async_notify(activity_message)
+            if notify_latencies is not None:
+                notify_latencies.append(time.perf_counter() - start)
+            continue
+        calls, prompt_tokens, completion_tokens = model.calls, model.prompt_tokens, model.completion_tokens
+        start = time.perf_counter()
+        await agent.async_respond(activity_message)
+        decisions.append({
+            "message": message.text.strip().split("\n", 1)[0],
+            "action": next((kind for kind, pattern in REQUEST_KINDS if pattern.search(message.text)), "discussion"),
+            "latency_s": time.perf_counter() - start,
+            "llm_calls": model.calls - calls,
+            "prompt_tokens": model.prompt_tokens - prompt_tokens,
+            "completion_tokens": model.completion_tokens - completion_tokens,
+        })
+    return decisions
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,64 @@
+########################################################################
+# Plausible werewolf answers for stub and mock LLMs
+#########################################################################
+
+import json
+import random
+import re
+from typing import Any, Dict, List
+
+# "alive players ->  ['a', 'b']", "still alive this night :  ['a', 'b']", ...
+_ALIVE_LIST = re.compile(r"(?:alive players?|still alive|alive villager players)[^\n\[]*?(?:->|:)\s*\[?\s*(\[[^\]]*\])")
+_ALL_PLAYERS = re.compile(r"list of your fellow player in the game\.\s*-\s*(\[[^\]]*\])")
+_QUOTED = re.compile(r"'([^'\s]+)'")
+
+SUSPICION_REASONS = [
+    "has been very quiet and keeps agreeing with whoever spoke last",
+    "changed their vote without a good reason",
+    "defended a player who turned out to be a wolf",
+    "is pushing hard to eliminate villagers",
+    "gave an explanation that does not match how they voted",
+]
+
+AFTERTHOUGHTS = [
+    "I am open to changing my mind if someone makes a convincing case before the final count, but right now this is where I stand.",
+    "Let us keep an eye on who defends them, since that could tell us a lot about who else is on the wolf team.",
+    "If I turn out to be wrong, we should look again at everyone who pushed for the last elimination.",
+]
+
+
+def prompt_text(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(str(message.get("content", "")) for message in messages)
+
+
+def candidate_names(prompt: str) -> List[str]:
+    """The most recent alive list in the prompt, else the player list from the rules."""
+    for pattern in (_ALIVE_LIST, _ALL_PLAYERS):
+        lists = pattern.findall(prompt)
+        if lists:
+            names = _QUOTED.findall(lists[-1])
+            if names:
+                return names
+    return _QUOTED.findall(prompt[-4000:]) or ["nobody"]
+
+
+def plausible_answer(messages: List[Dict[str, Any]], rng: random.Random) -> str:
+    prompt = prompt_text(messages)
+    lowered = prompt.lower()
+    name = rng.choice(candidate_names(prompt))
+    reason = rng.choice(SUSPICION_REASONS)
+    if "just output 1" in lowered:  # injection referee
+        return "0"
+    if "what is my role" in lowered or "possible roles are" in lowered:
+        match = re.search(r"role\s*->\s*'(\w+)'", prompt)
+        return match.group(1) if match else "villager"
+    if '"thoughts"' in prompt and '"action"' in prompt:
+        return json.dumps({"thoughts": f"{name} {reason}.", "action": f"I choose {name}."})
+    if '"critique"' in prompt and '"action"' in prompt:
+        return json.dumps({"critique": "The choice is consistent with my role.", "action": f"I choose {name}."})
+    if "summarize" in lowered or "update the notes" in lowered:
+        return f"{name}: {reason}.\nEliminated: none revealed yet."
+    if "reflect on" in lowered or "critici" in lowered:  # not the final action, which quotes "your reflection"
+        return f"My choice of {name} fits my role and does not reveal too much."
+    # models tend to keep talking after naming their choice
+    return f"I think {name} {reason}, so I choose {name}. {rng.choice(AFTERTHOUGHTS)}"
@@ -1,7 +1,7 @@
 from typing import Any, Dict
 import asyncio
 import logging
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 from openai import RateLimitError
 from sentient_campaign.agents.v1.api import IReactiveAgent
@@ -11,15 +11,15 @@ from sentient_campaign.agents.v1.message import (
     TextContent,
     MessageChannelType,
 )
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    retry_if_exception_type,
-    wait_exponential,
-)
 
 from .game_state import GameState
 from .decider_agent import ThinkingAgent
+from .moderator_messages import action_kind, is_day_vote, parse_role
+from .deadline import DeadlineBudget
+from .llm_cache import LLMCache
+from .tracing import Tracer
+from .rate_limiter import RateLimiter
+from .vote_output import VoteOutput
 from ..prompts.base_prompts import *
 from ..prompts.thinking_prompts import *
 
@@ -33,28 +33,48 @@ class AutogenCoTAgent(IReactiveAgent):
     def __init__(self):
         self.game_state = GameState()
         self.thinking_agent = None
+        self.role_detection_stats = Counter()
+        self.deadline_budget = None
+        self.deadline = None
         logger.debug("AutogenCoTAgent initialized.")
 
     def __initialize__(self, name: str, description: str, config: dict = None):
         super().__initialize__(name, description, config)
         self._name = name
+        self.game_state = GameState(name)
         self._description = description
         self.config = config
 
+        # the runner's keys, renamed to the ones autogen and ThinkingAgent expect
+        sentient_llm_config = self.sentient_llm_config["config_list"][0]
         llm_config = {
-            "config_list": [self.sentient_llm_config["config_list"][0]]
+            "config_list": [{
+                "model": sentient_llm_config["llm_model_name"],
+                "api_key": sentient_llm_config["api_key"],
+                "base_url": sentient_llm_config["llm_base_url"],
+            }]
         }
 
+        self.tracer = Tracer.from_config((config or {}).get("tracing"), name)
+        self.rate_limiter = RateLimiter.from_config((config or {}).get("rate_limit"))
         # Initialize the thinking agent with appropriate role prompt once we know the role
         self.thinking_agent = ThinkingAgent(
             name=name,
             role_prompt="Initialized role prompt - will be updated when role is known",
-            llm_config=llm_config
+            llm_config=llm_config,
+            cache=LLMCache.from_config((config or {}).get("llm_cache"), f"/tmp/llm_cache_{name}.jsonl"),
+            tracer=self.tracer,
+            limiter=self.rate_limiter,
         )
+        self.deadline_budget = DeadlineBudget((config or {}).get("deadline"))
+        self.thinking_agent.on_latency = self.deadline_budget.observe
+        self.vote_output = VoteOutput(name)
 
     async def async_notify(self, message: ActivityMessage):
         logger.info(f"ASYNC NOTIFY called with message: {message}")
-        
+        if message.header.sender == MODERATOR_NAME:
+            self.vote_output.observe(message.content.text)
+
         if message.header.channel_type == MessageChannelType.DIRECT:
             self.game_state.add_direct_message(message.header.sender, message.content.text)
             
@@ -74,14 +94,20 @@ class AutogenCoTAgent(IReactiveAgent):
                 not self.game_state.game_intro):
                 self.game_state.game_intro = message.content.text
 
-    @retry(
-        wait=wait_exponential(multiplier=1, min=20, max=300),
-        stop=stop_after_attempt(5),
-        retry=retry_if_exception_type(RateLimitError),
-    )
     def _find_my_role(self, message: ActivityMessage) -> str:
-        response = self.thinking_agent.openai_client.chat.completions.create(
-            model=self.thinking_agent.model,
+        role = parse_role(message.content.text)
+        if role is not None:
+            self.role_detection_stats["template"] += 1
+        else:
+            # the moderator deviated from set_role.txt, let the LLM read it
+            self.role_detection_stats["llm_fallback"] += 1
+            role = self._find_my_role_with_llm(message)
+        logger.info(f"Role detection stats: {dict(self.role_detection_stats)}")
+        return role
+
+    def _find_my_role_with_llm(self, message: ActivityMessage) -> str:
+        role_guess = self.thinking_agent._complete(
+            stage="find_my_role",
             messages=[
                 {
                     "role": "system",
@@ -92,8 +118,7 @@ class AutogenCoTAgent(IReactiveAgent):
                     "content": f"Based on this moderator message, what is my role? Answer with just the role name (wolf, villager, seer, or doctor): {message.content.text}",
                 },
             ],
-        )
-        role_guess = response.choices[0].message.content.lower()
+        ).lower()
         
         if "villager" in role_guess:
             return "villager"
@@ -115,15 +140,37 @@ class AutogenCoTAgent(IReactiveAgent):
 
     async def async_respond(self, message: ActivityMessage) -> ActivityResponse:
         logger.info(f"ASYNC RESPOND called with message: {message}")
+        self.deadline = self.deadline_budget.start(self._message_kind(message))
+        with self.tracer.trace(action_type=self.deadline.kind, deadline=self.deadline):
+            return await self._respond(message)
 
+    async def _respond(self, message: ActivityMessage) -> ActivityResponse:
+        if message.header.sender == MODERATOR_NAME:
+            self.vote_output.observe(message.content.text)
         if message.header.channel_type == MessageChannelType.DIRECT:
             if message.header.sender == MODERATOR_NAME:
                 response_message = await self._handle_moderator_direct_message(message)
         else:
             response_message = await self._handle_group_message(message)
+        response_message = self.vote_output.canonicalize(message.content.text, response_message)
+        self.game_state.tracker.answered(message.content.text, response_message)
 
+        if self.deadline.degraded:
+            logger.info(f"Deadline report: {self.deadline_budget.report()}")
+            logger.info(f"LLM stage report: {self.tracer.report()}")
+            logger.info(f"Rate limiter report: {self.rate_limiter.report()}")
         return ActivityResponse(response=TextContent(text=response_message))
 
+    def _message_kind(self, message: ActivityMessage) -> str:
+        kind = action_kind(message.content.text)
+        if kind is not None:
+            return kind
+        if message.header.channel_type == MessageChannelType.DIRECT:
+            return {"seer": "seer_check", "doctor": "doctor_save"}.get(self.game_state.role, "default")
+        if message.header.channel == WOLFS_CHANNEL:
+            return "wolf_target"
+        return "discussion"
+
     async def _handle_moderator_direct_message(self, message: ActivityMessage) -> str:
         self.game_state.add_direct_message(message.header.sender, message.content.text)
         
@@ -151,63 +198,64 @@ class AutogenCoTAgent(IReactiveAgent):
     # The following methods would be implemented similarly to the original CoT agent
     # but using the thinking_agent for generating responses
     def _get_response_for_seer_guess(self, message: ActivityMessage) -> str:
-        seer_checks_info = "\n".join([f"Checked {player}: {result}" for player, result in self.game_state.seer_checks.items()])
-        game_situation = f"{self.game_state.get_interwoven_history()}\n\nMy past seer checks:\n{seer_checks_info}"
+        game_situation = self.game_state.get_game_situation()
         
         inner_monologue = self.thinking_agent.get_inner_monologue(
             SEER_SYSTEM_PROMPT,
             game_situation,
-            SEER_SPECIFIC_PROMPT
+            SEER_SPECIFIC_PROMPT,
+            deadline=self.deadline,
         )
 
         action = self.thinking_agent.get_final_action(
             SEER_SYSTEM_PROMPT,
             game_situation,
             inner_monologue,
-            "choice of player to investigate"
+            "choice of player to investigate",
+            deadline=self.deadline,
         )
         
         return action
 
     def _get_response_for_doctors_save(self, message: ActivityMessage) -> str:
-        game_situation = self.game_state.get_interwoven_history()
+        game_situation = self.game_state.get_game_situation()
         
         inner_monologue = self.thinking_agent.get_inner_monologue(
             DOCTOR_SYSTEM_PROMPT,
             game_situation,
-            DOCTOR_SPECIFIC_PROMPT
+            DOCTOR_SPECIFIC_PROMPT,
+            deadline=self.deadline,
         )
 
         action = self.thinking_agent.get_final_action(
             DOCTOR_SYSTEM_PROMPT,
             game_situation,
             inner_monologue,
-            "choice of player to protect"
+            "choice of player to protect",
+            deadline=self.deadline,
         )
         
         return action
 
     def _get_discussion_message_or_vote_response_for_common_room(self, message: ActivityMessage) -> str:
         role_prompt = getattr(self, f"{self.game_state.role.upper()}_PROMPT", VILLAGER_SYSTEM_PROMPT)
-        game_situation = self.game_state.get_interwoven_history()
+        game_situation = self.game_state.get_game_situation()
         
         inner_monologue = self.thinking_agent.get_inner_monologue(
             role_prompt,
             game_situation,
-            DISCUSSION_SPECIFIC_PROMPT
+            DISCUSSION_SPECIFIC_PROMPT,
+            deadline=self.deadline,
         )
 
-        # Determine if this is a voting phase by checking the moderator's recent messages
-        recent_mod_messages = [msg for sender, msg in self.game_state.group_channel_messages[GAME_CHANNEL][-5:]
-                             if sender == MODERATOR_NAME]
-        is_voting = any("vote" in msg.lower() for msg in recent_mod_messages)
-        
-        action_type = "vote for elimination" if is_voting else "response to the discussion"
+        # the moderator's request itself says whether this is the day vote
+        action_type = "vote for elimination" if is_day_vote(message.content.text) else "response to the discussion"
         action = self.thinking_agent.get_final_action(
             role_prompt,
             game_situation,
             inner_monologue,
-            action_type
+            action_type,
+            deadline=self.deadline,
         )
         
         return action
@@ -216,19 +264,21 @@ class AutogenCoTAgent(IReactiveAgent):
         if self.game_state.role != "wolf":
             return "I am not a werewolf and cannot participate in this channel."
         
-        game_situation = self.game_state.get_interwoven_history(include_wolf_channel=True)
+        game_situation = self.game_state.get_game_situation(include_wolf_channel=True)
         
         inner_monologue = self.thinking_agent.get_inner_monologue(
             WOLF_SYSTEM_PROMPT,
             game_situation,
-            WOLF_SPECIFIC_PROMPT
+            WOLF_SPECIFIC_PROMPT,
+            deadline=self.deadline,
         )
 
         action = self.thinking_agent.get_final_action(
             WOLF_SYSTEM_PROMPT,
             game_situation,
             inner_monologue,
-            "target for elimination"
+            "target for elimination",
+            deadline=self.deadline,
         )
         
         return action
\ No newline at end of file
@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Outcomes of a call as seen by the breaker. Errors that say nothing about the
+# endpoint's health (bad requests, cancelled calls) are "ignored".
+OK = "ok"
+FAILED = "failed"
+IGNORED = "ignored"
+
+
+class CircuitBreaker:
+    """Health of one endpoint and model.
+
+    Opens after `failure_threshold` consecutive failures, where an answer
+    slower than `latency_threshold_s` counts as a failure. After `open_s` the
+    next call is let through as a probe: its success closes the breaker again,
+    its failure keeps it open for another `open_s`.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        failure_threshold: int = 3,
+        latency_threshold_s: Optional[float] = None,
+        open_s: float = 30.0,
+        on_transition: Optional[Callable[[str, str, str, str], None]] = None,
+    ):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.latency_threshold_s = latency_threshold_s
+        self.open_s = open_s
+        self.on_transition = on_transition
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def _move(self, state: str, reason: str):
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if self.on_transition is not None:
+            self.on_transition(self.endpoint, previous, state, reason)
+
+    def allow(self) -> bool:
+        """Whether the next call may go to this endpoint."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_s:
+            self._move(HALF_OPEN, "probe")
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record(self, outcome: str, seconds: float, reason: str = ""):
+        """Outcome of a call that allow() let through."""
+        if outcome == OK and self.latency_threshold_s is not None and seconds > self.latency_threshold_s:
+            outcome, reason = FAILED, f"slow answer ({seconds:.1f}s)"
+        probe, self.probing = self.probing, False
+        if outcome == OK:
+            self.failures = 0
+            if self.state != CLOSED:
+                self._move(CLOSED, "probe succeeded")
+        elif outcome == FAILED:
+            self.failures += 1
+            if probe or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self._move(OPEN, reason)
+
+
+class CircuitBreakers:
+    """One breaker per endpoint and model, plus where to send calls while a
+    breaker is open. Transitions are logged and, with `path`, appended to a
+    JSONL file."""
+
+    def __init__(
+        self,
+        fallback_model: Optional[str] = None,
+        fallback_base_url: Optional[str] = None,
+        failure_threshold: int = 3,
+        latency_threshold_s: Optional[float] = None,
+        open_s: float = 30.0,
+        path: Optional[str] = None,
+        player_name: str = "",
+    ):
+        self.fallback_model = fallback_model
+        self.fallback_base_url = fallback_base_url
+        self.failure_threshold = failure_threshold
+        self.latency_threshold_s = latency_threshold_s
+        self.open_s = open_s
+        self.path = path
+        self.player_name = player_name
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.transitions: List[Dict[str, Any]] = []
+        self.stats = Counter()
+        directory = os.path.dirname(path or "")
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], player_name: str) -> Optional["CircuitBreakers"]:
+        """None unless enabled with a fallback model or base URL to route to.
+        `path` may contain {name}, the player's name."""
+        config = config or {}
+        if not config.get("enabled", False):
+            return None
+        if not (config.get("fallback_model") or config.get("fallback_base_url")):
+            logger.warning("Circuit breaker enabled without a fallback model or base URL, leaving it off")
+            return None
+        path = config.get("path")
+        return cls(
+            fallback_model=config.get("fallback_model"),
+            fallback_base_url=config.get("fallback_base_url"),
+            failure_threshold=config.get("failure_threshold", 3),
+            latency_threshold_s=config.get("latency_threshold_s"),
+            open_s=config.get("open_s", 30.0),
+            path=path.format(name=player_name) if path else None,
+            player_name=player_name,
+        )
+
+    def get(self, base_url: str, model: str) -> CircuitBreaker:
+        endpoint = f"{base_url} {model}"
+        if endpoint not in self.breakers:
+            self.breakers[endpoint] = CircuitBreaker(
+                endpoint, self.failure_threshold, self.latency_threshold_s, self.open_s, self._transition
+            )
+        return self.breakers[endpoint]
+
+    def _transition(self, endpoint: str, previous: str, state: str, reason: str):
+        self.stats[f"to_{state}"] += 1
+        event = {"time": time.time(), "player": self.player_name, "endpoint": endpoint, "from": previous, "to": state, "reason": reason}
+        self.transitions.append(event)
+        logger.warning(f"Circuit breaker for {endpoint}: {previous} -> {state} ({reason})")
+        if self.path:
+            try:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(event) + "\n")
+            except OSError as e:
+                logger.warning(f"Could not export circuit breaker transition: {e}")
+
+    def report(self) -> Dict[str, Any]:
+        return {**self.stats, "states": {endpoint: breaker.state for endpoint, breaker in self.breakers.items()}}
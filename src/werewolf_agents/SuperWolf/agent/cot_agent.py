@@ -4,10 +4,10 @@ from autogen import ConversableAgent, Agent, runtime_logging
 import os,json,re
 import asyncio
 import logging
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 import openai
-from openai import RateLimitError, OpenAI
+from openai import RateLimitError
 from sentient_campaign.agents.v1.api import IReactiveAgent
 from sentient_campaign.agents.v1.message import (
     ActivityMessage,
@@ -17,12 +17,27 @@ from sentient_campaign.agents.v1.message import (
     ActivityMessageHeader,
     MessageChannelType,
 )
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    retry_if_exception_type,
-    wait_exponential,
-)
+
+from .llm_client import LLMClient
+from .llm_cache import LLMCache
+from .moderator_messages import action_kind, is_day_vote, parse_role, phase_started
+from .game_tracker import GameTracker
+from .vote_matrix import VoteMatrix
+from .role_beliefs import RoleBeliefs
+from .lookahead import Lookahead
+from .history import GameHistory, PRIVATE, estimate_tokens, visibility_of
+from .summarizer import PhaseSummarizer
+from .token_budget import TokenBudget
+from .tracing import Tracer
+from .rate_limiter import RateLimiter
+from .hedging import Hedger
+from .circuit_breaker import CircuitBreakers
+from .streaming import streamed_actions, vote_stop
+from .vote_output import REPLIES, VoteOutput
+from .fast_pipeline import run_fast_pipeline
+from .self_consistency import CONSENSUS_ACTIONS, SelfConsistency
+from .deadline import DeadlineBudget
+
 GAME_CHANNEL = "play-arena"
 WOLFS_CHANNEL = "wolf's-den"
 MODERATOR_NAME = "moderator"
@@ -86,16 +101,46 @@ class CoTAgent(IReactiveAgent):
         self.role = None
         self.direct_messages = defaultdict(list)
         self.group_channel_messages = defaultdict(list)
-        self.seer_checks = {}  # To store the seer's checks and results
-        self.game_history = []  # To store the interwoven game history
+        self.game_history = GameHistory()  # To store the interwoven game history
 
         self.llm_config = self.sentient_llm_config["config_list"][0]
-        self.openai_client = OpenAI(
+        self.model = self.llm_config["llm_model_name"]
+        self.llm_cache = LLMCache.from_config((config or {}).get("llm_cache"), f"/tmp/llm_cache_{name}.jsonl")
+        self.tracer = Tracer.from_config((config or {}).get("tracing"), name)
+        self.rate_limiter = RateLimiter.from_config((config or {}).get("rate_limit"))
+        self.llm = LLMClient(
             api_key=self.llm_config["api_key"],
             base_url=self.llm_config["llm_base_url"],
+            model=self.model,
+            cache=self.llm_cache,
+            tracer=self.tracer,
+            limiter=self.rate_limiter,
+            hedger=Hedger.from_config((config or {}).get("hedging")),
+            breakers=CircuitBreakers.from_config((config or {}).get("circuit_breaker"), name),
         )
-
-        self.model = self.llm_config["llm_model_name"]
+        self.streamed_actions = streamed_actions((config or {}).get("streaming"))
+        self.vote_output = VoteOutput(name)
+        self._role_task = None
+        self.role_detection_stats = Counter()
+        self.summarize_history = (config or {}).get("history_summary", {}).get("enabled", False)
+        self.summarizer = PhaseSummarizer(self.llm, name)
+        self._summary_tasks = set()
+        self.token_budget = TokenBudget((config or {}).get("token_budget"), moderator_name=MODERATOR_NAME)
+        self.pipeline_modes = (config or {}).get("pipeline", {})
+        consistency_config = (config or {}).get("self_consistency", {})
+        self.self_consistency = SelfConsistency(consistency_config.get("samples", 1), early_exit=self.llm_cache is None)
+        self.consensus_actions = set(consistency_config.get("actions", CONSENSUS_ACTIONS))
+        self.game_tracker = GameTracker(name, MODERATOR_NAME, WOLFS_CHANNEL)
+        self.vote_matrix = VoteMatrix(self.game_tracker)
+        state_config = (config or {}).get("game_state", {})
+        self.state_table = state_config.get("table", False)
+        self.suspicion_table = state_config.get("suspicion", False)
+        self.role_beliefs = RoleBeliefs.from_config((config or {}).get("role_beliefs"), self.game_tracker)
+        self.beliefs_table = (config or {}).get("role_beliefs", {}).get("table", False)
+        self.lookahead = Lookahead.from_config((config or {}).get("lookahead"), self.role_beliefs)
+        self.deadline_budget = DeadlineBudget((config or {}).get("deadline"))
+        self.llm.on_latency = self.deadline_budget.observe
+        self.deadline = None
         logger.info(
             f"WerewolfAgent initialized with name: {name}, description: {description}, and config: {config}"
         )
@@ -103,38 +148,54 @@ class CoTAgent(IReactiveAgent):
 
     async def async_notify(self, message: ActivityMessage):
         logger.info(f"ASYNC NOTIFY called with message: {message}")
+        self._track_players(message)
         if message.header.channel_type == MessageChannelType.DIRECT:
             user_messages = self.direct_messages.get(message.header.sender, [])
             user_messages.append(message.content.text)
             self.direct_messages[message.header.sender] = user_messages
-            self.game_history.append(f"[From - {message.header.sender}| To - {self._name} (me)| Direct Message]: {message.content.text}")
+            self.game_history.append(f"[From - {message.header.sender}| To - {self._name} (me)| Direct Message]: {message.content.text}", PRIVATE)
             if not len(user_messages) > 1 and message.header.sender == self.MODERATOR_NAME:
-                self.role = self.find_my_role(message)
-                logger.info(f"Role found for user {self._name}: {self.role}")
+                # resolve the role in the background so notifications keep flowing
+                self._role_task = asyncio.create_task(self._detect_role(message))
         else:
+            self._track_phase(message)
             group_messages = self.group_channel_messages.get(message.header.channel, [])
             group_messages.append((message.header.sender, message.content.text))
             self.group_channel_messages[message.header.channel] = group_messages
-            self.game_history.append(f"[From - {message.header.sender}| To - Everyone| Group Message in {message.header.channel}]: {message.content.text}")
+            self.game_history.append(f"[From - {message.header.sender}| To - Everyone| Group Message in {message.header.channel}]: {message.content.text}", visibility_of(message.header.channel, False, self.WOLFS_CHANNEL))
             # if this is the first message in the game channel, the moderator is sending the rules, store them
             if message.header.channel == self.GAME_CHANNEL and message.header.sender == self.MODERATOR_NAME and not self.game_intro:
                 self.game_intro = message.content.text
         logger.info(f"message stored in messages {message}")
 
+    async def _detect_role(self, message):
+        self.role = await self.find_my_role(message)
+        logger.info(f"Role found for user {self._name}: {self.role}")
+
+    async def _ensure_role(self):
+        if self._role_task is not None:
+            await self._role_task
+
     def get_interwoven_history(self, include_wolf_channel=False):
-        return "\n".join([
-            event for event in self.game_history
-            if include_wolf_channel or not event.startswith(f"[{self.WOLFS_CHANNEL}]")
-        ])
-
-    @retry(
-        wait=wait_exponential(multiplier=1, min=20, max=300),
-        stop=stop_after_attempt(5),
-        retry=retry_if_exception_type(openai.RateLimitError),
-    )
-    def find_my_role(self, message):
-        response = self.openai_client.chat.completions.create(
-            model=self.model,
+        view = "full" if include_wolf_channel else "player"
+        if self.summarize_history:
+            return self.summarizer.situation(self.game_history, view)
+        return self.game_history.view(view)
+
+    async def find_my_role(self, message):
+        role = parse_role(message.content.text)
+        if role is not None:
+            self.role_detection_stats["template"] += 1
+        else:
+            # the moderator deviated from set_role.txt, let the LLM read it
+            self.role_detection_stats["llm_fallback"] += 1
+            role = await self._find_my_role_with_llm(message)
+        logger.info(f"Role detection stats: {dict(self.role_detection_stats)}")
+        return role
+
+    async def _find_my_role_with_llm(self, message):
+        my_role_guess = await self.llm.chat(
+            stage="find_my_role",
             messages=[
                 {
                     "role": "system",
@@ -147,7 +208,6 @@ class CoTAgent(IReactiveAgent):
                 },
             ],
         )
-        my_role_guess = response.choices[0].message.content
         logger.info(f"my_role_guess: {my_role_guess}")
         if "villager" in my_role_guess.lower():
             role = "villager"
@@ -162,31 +222,105 @@ class CoTAgent(IReactiveAgent):
 
     async def async_respond(self, message: ActivityMessage):
         logger.info(f"ASYNC RESPOND called with message: {message}")
+        await self._ensure_role()  # the message kind depends on the role
+        self.deadline = self.deadline_budget.start(self._message_kind(message))
+        phase = self.game_history.phase_labels[-1]
+        with self.tracer.trace(action_type=self.deadline.kind, phase=phase, deadline=self.deadline):
+            return await self._respond(message)
+
+    async def _respond(self, message: ActivityMessage):
+        self._track_players(message)
+        if self.llm_cache is not None and self._summary_tasks:
+            # recorded and replayed runs must build the same prompts, whatever the timing
+            await asyncio.gather(*self._summary_tasks)
 
         if message.header.channel_type == MessageChannelType.DIRECT and message.header.sender == self.MODERATOR_NAME:
             self.direct_messages[message.header.sender].append(message.content.text)
             if self.role == "seer":
-                response_message = self._get_response_for_seer_guess(message)
+                response_message = await self._get_response_for_seer_guess(message)
             elif self.role == "doctor":
-                response_message = self._get_response_for_doctors_save(message)
-            
-            response = ActivityResponse(response=response_message)
-            self.game_history.append(f"[From - {message.header.sender}| To - {self._name} (me)| Direct Message]: {message.content.text}")
-            self.game_history.append(f"[From - {self._name} (me)| To - {message.header.sender}| Direct Message]: {response_message}")    
+                response_message = await self._get_response_for_doctors_save(message)
+            response_message = self.vote_output.canonicalize(message.content.text, response_message)
+            self.game_tracker.answered(message.content.text, response_message)
+            self.game_history.append(f"[From - {message.header.sender}| To - {self._name} (me)| Direct Message]: {message.content.text}", PRIVATE)
+            self.game_history.append(f"[From - {self._name} (me)| To - {message.header.sender}| Direct Message]: {response_message}", PRIVATE)    
         elif message.header.channel_type == MessageChannelType.GROUP:
             self.group_channel_messages[message.header.channel].append(
                 (message.header.sender, message.content.text)
             )
+            self._track_phase(message)
             if message.header.channel == self.GAME_CHANNEL:
-                response_message = self._get_discussion_message_or_vote_response_for_common_room(message)
+                response_message = await self._get_discussion_message_or_vote_response_for_common_room(message)
             elif message.header.channel == self.WOLFS_CHANNEL:
-                response_message = self._get_response_for_wolf_channel_to_kill_villagers(message)
-            self.game_history.append(f"[From - {message.header.sender}| To - {self._name} (me)| Group Message in {message.header.channel}]: {message.content.text}")
-            self.game_history.append(f"[From - {self._name} (me)| To - {message.header.sender}| Group Message in {message.header.channel}]: {response_message}")
+                response_message = await self._get_response_for_wolf_channel_to_kill_villagers(message)
+            response_message = self.vote_output.canonicalize(message.content.text, response_message)
+            self.game_tracker.answered(message.content.text, response_message)
+            visibility = visibility_of(message.header.channel, False, self.WOLFS_CHANNEL)
+            self.game_history.append(f"[From - {message.header.sender}| To - {self._name} (me)| Group Message in {message.header.channel}]: {message.content.text}", visibility)
+            self.game_history.append(f"[From - {self._name} (me)| To - {message.header.sender}| Group Message in {message.header.channel}]: {response_message}", visibility)
         
+        if self.deadline.degraded:
+            logger.info(f"Deadline report: {self.deadline_budget.report()}")
+            logger.info(f"LLM stage report: {self.tracer.report()}")
+            logger.info(f"Rate limiter report: {self.rate_limiter.report()}")
+            if self.llm.hedger is not None:
+                logger.info(f"Hedging report: {self.llm.hedger.report()}")
+            if self.llm.breakers is not None:
+                logger.info(f"Circuit breaker report: {self.llm.breakers.report()}")
+            if self.role_beliefs is not None:
+                logger.info(f"Role beliefs report: {self.role_beliefs.report()}")
+            if self.lookahead is not None:
+                logger.info(f"Lookahead report: {self.lookahead.report()}")
         return ActivityResponse(response=response_message)
 
-    def _get_inner_monologue(self, role_prompt, game_situation, specific_prompt):
+    def _message_kind(self, message):
+        kind = action_kind(message.content.text)
+        if kind is not None:
+            return kind
+        if message.header.channel_type == MessageChannelType.DIRECT:
+            return {"seer": "seer_check", "doctor": "doctor_save"}.get(self.role, "default")
+        if message.header.channel == self.WOLFS_CHANNEL:
+            return "wolf_target"
+        return "discussion"
+
+    async def _decide(self, action_kind, role_prompt, game_situation, specific_prompt, action_type):
+        mode = self.pipeline_modes.get(action_kind, self.pipeline_modes.get("default", "full"))
+        # fall back to a cheaper pipeline when the chain of calls no longer fits the deadline
+        if mode == "fast_critique" and not self.deadline.allows("critique", calls=2):
+            mode = "fast"
+        logger.info(f"Deciding {action_kind} with the {mode} pipeline")
+        if mode in ("fast", "fast_critique"):
+            return await run_fast_pipeline(
+                self.llm,
+                self.token_budget,
+                self.role,
+                role_prompt,
+                game_situation,
+                specific_prompt,
+                action_type,
+                critique=mode == "fast_critique",
+                sample_output=lambda call: self._consensus(action_kind, call),
+            )
+        if self.deadline.allows("monologue", calls=2):
+            inner_monologue = await self._get_inner_monologue(role_prompt, game_situation, specific_prompt)
+        else:
+            inner_monologue = "(No time to think it through, answer directly.)"
+        # only the call that names the player is sampled, not the whole chain
+        return await self._get_final_action(
+            role_prompt, game_situation, inner_monologue, action_type,
+            sample_output=lambda call: self._consensus(action_kind, call),
+        )
+
+    async def _consensus(self, action_kind, sample):
+        # high-stakes single-name answers are sampled in parallel and settled by majority
+        if action_kind not in self.consensus_actions or self.self_consistency.samples < 2 or not self.game_tracker.alive:
+            return await sample()
+        consensus = await self.self_consistency.decide(action_kind, sample, self.game_tracker.alive)
+        logger.info(f"Self-consistency report: {self.self_consistency.report()}")
+        return consensus.action
+
+    async def _get_inner_monologue(self, role_prompt, game_situation, specific_prompt):
+        game_situation = self.token_budget.fit("monologue", game_situation, estimate_tokens(role_prompt + specific_prompt))
         prompt = f"""{role_prompt}
 
 Current game situation (including your past thoughts and actions): 
@@ -194,52 +328,58 @@ Current game situation (including your past thoughts and actions):
 
 {specific_prompt}"""
 
-        response = self.openai_client.chat.completions.create(
-            model=self.model,
+        inner_monologue = await self.llm.chat(
+            stage="inner_monologue",
             messages=[
                 {"role": "system", "content": f"You are a {self.role} in a Werewolf game."},
                 {"role": "user", "content": prompt}
             ]
         )
-        inner_monologue = response.choices[0].message.content
         # self.game_history.append(f"\n [My Thoughts]: {inner_monologue}")
 
         logger.info(f"My Thoughts: {inner_monologue}")
         
         return inner_monologue
 
-    def _get_final_action(self, role_prompt, game_situation, inner_monologue, action_type):
+    async def _get_final_action(self, role_prompt, game_situation, inner_monologue, action_type, sample_output=None):
+        situation = self.token_budget.fit("action", game_situation, estimate_tokens(role_prompt + inner_monologue))
         prompt = f"""{role_prompt}
 
 Current game situation (including past thoughts and actions): 
-{game_situation}
+{situation}
 
 Your thoughts:
 {inner_monologue}
 
 Based on your thoughts and the current situation, what is your {action_type}? Respond with only the {action_type} and no other sentences/thoughts. If it is a dialogue response, you can provide the full response that adds to the discussions so far. For all other cases a single sentence response is expected. If you are in the wolf-group channel, the sentence must contain the name of a person you wish to eliminate, and feel free to change your mind so that there is consensus. If you are in the game-room channel, the sentence must contain your response or vote, and it must be a vote to eliminate someone if the game moderator has recently messaged you asking for a vote, and also feel free to justify your vote, and later change your mind when the final vote count happens. You can justify any change of mind too. If the moderator for the reason behind the vote, you must provide the reason in the response."""
 
-        response = self.openai_client.chat.completions.create(
-            model=self.model,
+        response = await self.llm.chat(
+            stage="initial_action",
+            hedge=True,
+            stop_when=vote_stop(self.deadline.kind, self.streamed_actions, self.game_tracker.alive, self.game_tracker.player_name),
             messages=[
                 {"role": "system", "content": f"You are a {self.role} in a Werewolf game. Provide your final {action_type}."},
                 {"role": "user", "content": prompt}
             ]
         )
         
-        logger.info(f"My initial {action_type}: {response.choices[0].message.content}")
-        initial_action = response.choices[0].message.content
+        logger.info(f"My initial {action_type}: {response}")
+        initial_action = response
+        if not self.deadline.allows("reflection", calls=2):
+            # no time for reflection and refinement, the initial action is the best answer so far
+            return initial_action.strip("\n ")
         # do another run to reflect on the final action and do a sanity check, modify the response if need be
+        situation = self.token_budget.fit("reflection", game_situation, estimate_tokens(role_prompt + inner_monologue + initial_action))
         prompt = f"""{role_prompt}
 
 Current game situation (including past thoughts and actions):
-{game_situation}
+{situation}
 
 Your thoughts:
 {inner_monologue}
 
 Your initial action:
-{response.choices[0].message.content}
+{response}
 
 Reflect on your final action given the situation and provide any criticisms. Answer the folling questions:
 1. What is my name and my role ? 
@@ -247,21 +387,23 @@ Reflect on your final action given the situation and provide any criticisms. Ans
 3. Is my action going against what my objective is in the game?
 3. How can I improve my action to better help the agents on my team and help me survive?"""
         
-        response = self.openai_client.chat.completions.create(
-            model=self.model,
+        response = await self.llm.chat(
+            stage="reflection",
+            hedge=True,
             messages=[
                 {"role": "system", "content": f"You are a {self.role} in a Werewolf game. Reflect on your final action."},
                 {"role": "user", "content": prompt}
             ]
         )
 
-        logger.info(f"My reflection: {response.choices[0].message.content}")
+        logger.info(f"My reflection: {response}")
 
          # do another run to reflect on the final action and do a sanity check, modify the response if need be
+        situation = self.token_budget.fit("final", game_situation, estimate_tokens(role_prompt + inner_monologue + initial_action + response))
         prompt = f"""{role_prompt}
 
 Current game situation (including past thoughts and actions):
-{game_situation}
+{situation}
 
 Your thoughts:
 {inner_monologue}
@@ -270,34 +412,83 @@ Your initial action:
 {initial_action}
 
 Your reflection:
-{response.choices[0].message.content}
+{response}
 
 Based on your thoughts, the current situation, and your reflection on the initial action, what is your absolute final {action_type}? Respond with only the {action_type} and no other sentences/thoughts. If it is a dialogue response, you can provide the full response that adds to the discussions so far. For all other cases a single sentence response is expected. If you are in the wolf-group channel, the sentence must contain the name of a person you wish to eliminate, and feel free to change your mind so that there is consensus. If you are in the game-room channel, the sentence must contain your response or vote, and it must be a vote to eliminate someone if the game moderator has recently messaged you asking for a vote, and also feel free to justify your vote, and later change your mind when the final vote count happens. You can justify any change of mind too. If the moderator for the reason behind the vote, you must provide the reason in the response. If the moderator asked for the vote, you must mention at least one name to eliminate. If the moderator asked for a final vote, you must answer in a single sentence the name of the person you are voting to eliminate even if you are not sure."""
         
-        response = self.openai_client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": f"You are a {self.role} in a Werewolf game. Provide your final {action_type}."},
-                {"role": "user", "content": prompt}
-            ]
-        )
+        def final_action():
+            return self.llm.chat(
+                stage="final_action",
+                hedge=True,
+                stop_when=vote_stop(self.deadline.kind, self.streamed_actions, self.game_tracker.alive, self.game_tracker.player_name),
+                messages=[
+                    {"role": "system", "content": f"You are a {self.role} in a Werewolf game. Provide your final {action_type}."},
+                    {"role": "user", "content": prompt}
+                ]
+            )
+
+        response = await (sample_output(final_action) if sample_output is not None else final_action())
         
-        return response.choices[0].message.content.strip("\n ")
+        return response.strip("\n ")
     
-    def _summarize_game_history(self):
-
-        self.detailed_history = "\n".join(self.game_history)
-
-        # send the llm the previous summary of each of the other players and suspiciona nd information, the detailed chats of this day or night
-        # llm will summarize the game history and provide a summary of the game so far
-        # summarized game history is used for current situation
-
-        pass
-
-
-    def _get_response_for_seer_guess(self, message):
-        seer_checks_info = "\n".join([f"Checked {player}: {result}" for player, result in self.seer_checks.items()])
-        game_situation = f"{self.get_interwoven_history()}\n\nMy past seer checks:\n{seer_checks_info}"
+    async def _summarize_game_history(self):
+        # fold every finished phase into the running per-player digest, the
+        # phase in progress keeps being sent verbatim
+        finished = self.game_history.current_phase
+        views = ["player", "full"] if self.role == "wolf" else ["player"]
+        for view in views:
+            try:
+                await self.summarizer.fold(self.game_history, view, finished)
+            except Exception as e:
+                logger.warning(f"Could not summarize the {view} history: {e}")
+        logger.info(f"History summary stats: {self.summarizer.stats()}")
+
+    def _track_phase(self, message):
+        if message.header.sender != self.MODERATOR_NAME:
+            return
+        phase = phase_started(message.content.text)
+        if phase is None:
+            return
+        self.game_history.start_phase(phase)
+        self.tracer.flush()  # the spans of the phase that ended
+        if self.summarize_history:
+            task = asyncio.create_task(self._summarize_game_history())
+            self._summary_tasks.add(task)
+            task.add_done_callback(self._summary_tasks.discard)
+
+    def _track_players(self, message):
+        self.game_tracker.observe(message.header.sender, message.header.channel, message.content.text)
+        if message.header.sender == self.MODERATOR_NAME:
+            self.vote_output.observe(message.content.text)
+
+    def _fast_choice(self, action_kind):
+        # the role probabilities settle some choices without asking the LLM
+        if self.role_beliefs is None:
+            return None
+        target = self.role_beliefs.best_target(action_kind)
+        if target is not None:
+            logger.info(f"Role beliefs picked {target} for {action_kind}")
+            return REPLIES[action_kind].format(player=target)
+        target = self.lookahead.best(action_kind) if self.lookahead is not None else None
+        if target is not None:
+            logger.info(f"Lookahead picked {target} for {action_kind}")
+            return REPLIES[action_kind].format(player=target)
+        return None
+
+    def _game_situation(self, include_wolf_channel=False, action_kind=None):
+        tables = [
+            self.game_tracker.table() if self.state_table else "",
+            self.vote_matrix.table(exclude=[self._name]) if self.suspicion_table else "",
+            self.role_beliefs.table() if self.role_beliefs is not None and self.beliefs_table else "",
+            self.lookahead.shortlist(action_kind) if self.lookahead is not None and action_kind else "",
+        ]
+        return "\n\n".join([self.get_interwoven_history(include_wolf_channel)] + [table for table in tables if table])
+
+    async def _get_response_for_seer_guess(self, message):
+        fast = self._fast_choice("seer_check")
+        if fast is not None:
+            return fast
+        game_situation = self._game_situation()
         
         specific_prompt = """think through your response by answering the following step-by-step:
 1. What new information has been revealed in recent conversations?
@@ -306,14 +497,15 @@ Based on your thoughts, the current situation, and your reflection on the initia
 4. What information would be most valuable for the village at this point in the game?
 5. How can I guide the discussion during the day subtly to help the village? Should I reveal my role at this point?"""
 
-        inner_monologue = self._get_inner_monologue(self.SEER_PROMPT, game_situation, specific_prompt)
-
-        action = self._get_final_action(self.SEER_PROMPT, game_situation, inner_monologue, "choice of player to investigate")
+        action = await self._decide("seer_check", self.SEER_PROMPT, game_situation, specific_prompt, "choice of player to investigate")
 
         return action
 
-    def _get_response_for_doctors_save(self, message):
-        game_situation = self.get_interwoven_history()
+    async def _get_response_for_doctors_save(self, message):
+        fast = self._fast_choice("doctor_save")
+        if fast is not None:
+            return fast
+        game_situation = self._game_situation()
         
         specific_prompt = """think through your response by answering the following step-by-step:
 1. Based on recent discussions, who seems to be in the most danger?
@@ -322,14 +514,16 @@ Based on your thoughts, the current situation, and your reflection on the initia
 4. How can I vary my protection pattern to avoid being predictable to the werewolves?
 5. How can I contribute to the village discussions with or without revealing my role? Should I reveal my role at this point?"""
 
-        inner_monologue = self._get_inner_monologue(self.DOCTOR_PROMPT, game_situation, specific_prompt)
-
-        action = self._get_final_action(self.DOCTOR_PROMPT, game_situation, inner_monologue, "choice of player to protect")        
+        action = await self._decide("doctor_save", self.DOCTOR_PROMPT, game_situation, specific_prompt, "choice of player to protect")
         return action
 
-    def _get_discussion_message_or_vote_response_for_common_room(self, message):
+    async def _get_discussion_message_or_vote_response_for_common_room(self, message):
         role_prompt = getattr(self, f"{self.role.upper()}_PROMPT", self.VILLAGER_PROMPT)
-        game_situation = self.get_interwoven_history()
+        action_kind = "day_vote" if is_day_vote(message.content.text) else "discussion"
+        fast = self._fast_choice(action_kind) if action_kind == "day_vote" else None
+        if fast is not None:
+            return fast
+        game_situation = self._game_situation(action_kind=action_kind)
         
         specific_prompt = """think through your response by answering the following step-by-step:
 1. What important information has been shared in the recent discussions?
@@ -339,16 +533,17 @@ Based on your thoughts, the current situation, and your reflection on the initia
 5. If it's time to vote, who should I vote for and why, considering all the information available?
 6. How do I respond if accused during the day without revealing my role?"""
 
-        inner_monologue = self._get_inner_monologue(role_prompt, game_situation, specific_prompt)
-
-        action = self._get_final_action(role_prompt, game_situation, inner_monologue, "vote and discussion point which includes reasoning behind your vote")        
+        action = await self._decide(action_kind, role_prompt, game_situation, specific_prompt, "vote and discussion point which includes reasoning behind your vote")
         return action
 
-    def _get_response_for_wolf_channel_to_kill_villagers(self, message):
+    async def _get_response_for_wolf_channel_to_kill_villagers(self, message):
         if self.role != "wolf":
             return "I am not a werewolf and cannot participate in this channel."
+        fast = self._fast_choice("wolf_target")
+        if fast is not None:
+            return fast
         
-        game_situation = self.get_interwoven_history(include_wolf_channel=True)
+        game_situation = self._game_situation(include_wolf_channel=True, action_kind="wolf_target")
         
         specific_prompt = """think through your response by answering the following step-by-step:
 1. Based on the game history, who are the most dangerous villagers to our werewolf team?
@@ -358,7 +553,5 @@ Based on your thoughts, the current situation, and your reflection on the initia
 5. Arrive at a consensus for the target and suggest it to the group. Always make suggestions to eliminate at least one person.
 6. How can we defend ourselves if accused during the day without revealing our roles?"""
 
-        inner_monologue = self._get_inner_monologue(self.WOLF_PROMPT, game_situation, specific_prompt)
-
-        action = self._get_final_action(self.WOLF_PROMPT, game_situation, inner_monologue, "suggestion for target")        
+        action = await self._decide("wolf_target", self.WOLF_PROMPT, game_situation, specific_prompt, "suggestion for target")
         return action
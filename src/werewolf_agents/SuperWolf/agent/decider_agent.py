@@ -1,14 +1,28 @@
 from autogen import ConversableAgent
 import logging
-from typing import Any, Dict
+import time
+from typing import Any, Callable, Dict, Optional
 from openai import OpenAI
 
 from werewolf_agents.cot_sample.prompts.final_action_prompts import get_initial_action_prompt, get_reflection_prompt
 
+from .llm_cache import LLMCache
+from .llm_client import complete
+from .rate_limiter import RateLimiter
+from .tracing import Tracer
+
 logger = logging.getLogger(__name__)
 
 class ThinkingAgent(ConversableAgent):
-    def __init__(self, name: str, role_prompt: str, llm_config: Dict[str, Any]):
+    def __init__(
+        self,
+        name: str,
+        role_prompt: str,
+        llm_config: Dict[str, Any],
+        cache: Optional[LLMCache] = None,
+        tracer: Optional[Tracer] = None,
+        limiter: Optional[RateLimiter] = None,
+    ):
         super().__init__(
             name=name,
             system_message=role_prompt,
@@ -18,10 +32,25 @@ class ThinkingAgent(ConversableAgent):
         self.openai_client = OpenAI(
             api_key=llm_config["config_list"][0]["api_key"],
             base_url=llm_config["config_list"][0]["base_url"],
+            max_retries=0,  # retried by complete() so retries show up in the spans
         )
+        if cache is not None:
+            self.openai_client = cache.wrap(self.openai_client)
         self.model = llm_config["config_list"][0]["model"]
+        self.tracer = tracer or Tracer()
+        self.limiter = limiter or RateLimiter()
+        self.on_latency: Optional[Callable[[float], None]] = None
+
+    def _complete(self, messages, stage: str) -> str:
+        start = time.perf_counter()
+        response = complete(self.openai_client, self.tracer, self.limiter, stage, self.model, messages)
+        if self.on_latency is not None:
+            self.on_latency(time.perf_counter() - start)
+        return response.choices[0].message.content
 
-    def get_inner_monologue(self, role_prompt: str, game_situation: str, specific_prompt: str) -> str:
+    def get_inner_monologue(self, role_prompt: str, game_situation: str, specific_prompt: str, deadline=None) -> str:
+        if deadline is not None and not deadline.allows("monologue", calls=2):
+            return "(No time to think it through, answer directly.)"
         prompt = f"""{role_prompt}
 
 Current game situation (including your past thoughts and actions): 
@@ -29,38 +58,29 @@ Current game situation (including your past thoughts and actions):
 
 {specific_prompt}"""
 
-        response = self.openai_client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": f"You are a {self.name} in a Werewolf game."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        return response.choices[0].message.content
+        return self._complete([
+            {"role": "system", "content": f"You are a {self.name} in a Werewolf game."},
+            {"role": "user", "content": prompt}
+        ], stage="inner_monologue")
 
-    def get_final_action(self, role_prompt: str, game_situation: str, inner_monologue: str, action_type: str) -> str:
+    def get_final_action(self, role_prompt: str, game_situation: str, inner_monologue: str, action_type: str, deadline=None) -> str:
         # Initial action prompt
         prompt = get_initial_action_prompt(role_prompt, game_situation, inner_monologue, action_type)
-        response = self.openai_client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": f"You are a {self.name} in a Werewolf game."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        initial_action = response.choices[0].message.content
+        initial_action = self._complete([
+            {"role": "system", "content": f"You are a {self.name} in a Werewolf game."},
+            {"role": "user", "content": prompt}
+        ], stage="initial_action")
+        if deadline is not None and not deadline.allows("reflection", calls=2):
+            # no time for reflection and refinement, the initial action is the best answer so far
+            return initial_action.strip()
 
         # Reflection prompt
         reflection_prompt = get_reflection_prompt(role_prompt, game_situation, inner_monologue, initial_action)
 
-        reflection_response = self.openai_client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": f"You are a {self.name} in a Werewolf game."},
-                {"role": "user", "content": reflection_prompt}
-            ]
-        )
-        reflection = reflection_response.choices[0].message.content
+        reflection = self._complete([
+            {"role": "system", "content": f"You are a {self.name} in a Werewolf game."},
+            {"role": "user", "content": reflection_prompt}
+        ], stage="reflection")
 
         # Final action prompt
         final_prompt = f"""{role_prompt}
@@ -79,12 +99,9 @@ Your reflection:
 
 Based on your thoughts, the current situation, and your reflection, what is your absolute final {action_type}? Provide only the final action, ensuring it includes a specific player name if voting or targeting is involved."""
 
-        final_response = self.openai_client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": f"You are a {self.name} in a Werewolf game."},
-                {"role": "user", "content": final_prompt}
-            ]
-        )
+        final_action = self._complete([
+            {"role": "system", "content": f"You are a {self.name} in a Werewolf game."},
+            {"role": "user", "content": final_prompt}
+        ], stage="final_action")
         
-        return final_response.choices[0].message.content.strip()
\ No newline at end of file
+        return final_action.strip()
\ No newline at end of file
@@ -2,27 +2,36 @@ from collections import defaultdict
 from typing import List, Dict, Tuple
 import logging
 
+from .game_tracker import GameTracker
+from .history import GameHistory, PRIVATE, visibility_of
+from .vote_matrix import VoteMatrix
+
 logger = logging.getLogger(__name__)
 
 class GameState:
-    def __init__(self):
+    def __init__(self, player_name: str = ""):
         self.direct_messages: Dict[str, List[str]] = defaultdict(list)
         self.group_channel_messages: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
-        self.game_history: List[str] = []
-        self.seer_checks: Dict[str, str] = {}
+        self.game_history: GameHistory = GameHistory()
+        self.tracker: GameTracker = GameTracker(player_name)
+        self.vote_matrix: VoteMatrix = VoteMatrix(self.tracker)
         self.game_intro: str = None
         self.role: str = None
 
     def add_direct_message(self, sender: str, message: str):
         self.direct_messages[sender].append(message)
-        self.game_history.append(f"[From - {sender}| Direct Message]: {message}")
+        self.tracker.observe(sender, None, message)
+        self.game_history.append(f"[From - {sender}| Direct Message]: {message}", PRIVATE)
 
     def add_group_message(self, channel: str, sender: str, message: str):
         self.group_channel_messages[channel].append((sender, message))
-        self.game_history.append(f"[From - {sender}| Group Message in {channel}]: {message}")
+        self.tracker.observe(sender, channel, message)
+        self.game_history.append(f"[From - {sender}| Group Message in {channel}]: {message}", visibility_of(channel, False))
 
     def get_interwoven_history(self, include_wolf_channel: bool = False) -> str:
-        return "\n".join([
-            event for event in self.game_history
-            if include_wolf_channel or "wolf's-den" not in event.lower()
-        ]) 
\ No newline at end of file
+        return self.game_history.view("full" if include_wolf_channel else "player")
+
+    def get_game_situation(self, include_wolf_channel: bool = False) -> str:
+        """The history followed by the tracked facts and the suspicion ranking."""
+        tables = [self.tracker.table(), self.vote_matrix.table(exclude=[self.tracker.player_name])]
+        return "\n\n".join([self.get_interwoven_history(include_wolf_channel)] + [table for table in tables if table])
@@ -0,0 +1,287 @@
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .moderator_messages import (
+    ModeratorMessage,
+    classify,
+    parse_alive_players,
+    parse_eliminated,
+    parse_players,
+    parse_role,
+)
+from .moderator_templates import (
+    DAY_END,
+    DAY_START,
+    DAY_VOTE,
+    DAY_VOTE_RETRY,
+    DOCTOR_SAVE,
+    DOCTOR_SAVE_RETRY,
+    INTRODUCTION,
+    NIGHT_START,
+    ROLE_SETTING,
+    SEER_GUESS,
+    SEER_GUESS_RETRY,
+    SEER_RESULT,
+    WOLF_NIGHT,
+    WOLF_VOTE,
+    WOLF_VOTE_RETRY,
+)
+from .vote_output import NameIndex, pick
+
+logger = logging.getLogger(__name__)
+
+WOLF = "wolf"
+# all a night kill or a negative seer check tells about a player
+NOT_WOLF = "not wolf"
+# "I am the seer", "I'm a doctor"; a claim, not proof, wolves claim roles too
+CLAIM = re.compile(r"\bI(?:'m| am)\s+(?:the\s+|a\s+)?(seer|doctor)\b", re.IGNORECASE)
+# requests whose answer is recorded, the seer's choice shows in the result instead
+OWN_ANSWERS = (DAY_VOTE, DAY_VOTE_RETRY, WOLF_VOTE, WOLF_VOTE_RETRY, DOCTOR_SAVE, DOCTOR_SAVE_RETRY)
+# requests whose player list holds every alive player; the wolves' night lists
+# (wolf_night, wolf_vote_retry) may leave the wolves out and are not trusted
+ALIVE_LISTS = (SEER_GUESS, SEER_GUESS_RETRY, DOCTOR_SAVE, DOCTOR_SAVE_RETRY, DAY_VOTE_RETRY)
+
+
+@dataclass
+class PlayerState:
+    name: str
+    alive: bool = True
+    role: Optional[str] = None  # one of VALID_ROLES or NOT_WOLF, None while unknown
+    role_source: str = ""  # how the role is known: "me", "revealed", "seer check" or "fellow wolf"
+    eliminated: str = ""  # e.g. "night 1" or "day 2"
+
+
+class GameTracker:
+    """What the moderator's messages have established about the game.
+
+    Tracks the players, who died when and with which revealed role, every
+    round's day and wolf votes, the seer's results, the doctor's saves and
+    the roles players claim in public.
+    observe() takes every message the agent sees and answered() the agent's
+    own answers to the moderator; each is a constant number of dict updates.
+    table() renders the state compactly for prompts, so the LLM does not have
+    to re-derive these facts from the transcript.
+    """
+
+    def __init__(self, player_name: str, moderator_name: str = "moderator", wolfs_channel: str = "wolf's-den"):
+        self.player_name = player_name
+        self.moderator_name = moderator_name
+        self.wolfs_channel = wolfs_channel
+        self.role: Optional[str] = None
+        self.players: Dict[str, PlayerState] = {}
+        self.round = 0  # the game starts with night 1, followed by day 1
+        self.phase: Optional[str] = None
+        self.day_votes: Dict[int, Dict[str, str]] = defaultdict(dict)  # round -> voter -> target
+        self.wolf_votes: Dict[int, Dict[str, str]] = defaultdict(dict)
+        self.seer_results: Dict[str, bool] = {}  # checked player -> is a wolf
+        self.saves: Dict[int, Optional[str]] = {}  # round -> protected player, None when only known someone was
+        self.night_kills: Dict[int, Optional[str]] = {}  # round -> killed player, None when nobody died
+        self.claims: Dict[str, str] = {}  # player -> role they publicly claimed
+        self._awaiting: Dict[str, str] = {}  # channel -> player whose next message there is their vote
+        self._index: Optional[NameIndex] = None
+        self._table: Optional[str] = None
+        self.revision = 0  # counts changes, for views derived from the state
+        self._handlers = {
+            INTRODUCTION: self._introduction,
+            ROLE_SETTING: self._role_setting,
+            NIGHT_START: self._night_start,
+            WOLF_NIGHT: self._wolf_night,
+            WOLF_VOTE: self._vote_request,
+            WOLF_VOTE_RETRY: self._vote_request,
+            DAY_VOTE: self._vote_request,
+            DAY_VOTE_RETRY: self._vote_request,
+            SEER_RESULT: self._seer_result,
+            DAY_START: self._day_start,
+            DAY_END: self._day_end,
+        }
+
+    @property
+    def alive(self) -> List[str]:
+        return [name for name, player in self.players.items() if player.alive]
+
+    def observe(self, sender: str, channel: Optional[str], text: str):
+        """Updates the state from a message in any channel, None for direct messages."""
+        if sender != self.moderator_name:
+            if self._awaiting.get(channel) == sender:
+                del self._awaiting[channel]
+                self._record_vote(channel, sender, text)
+            claim = CLAIM.search(text) if channel != self.wolfs_channel else None
+            if claim and self.claims.get(sender) != claim.group(1).lower():
+                self.claims[sender] = claim.group(1).lower()
+                self._updated()
+            return
+        message = classify(text)
+        if message is None:
+            return
+        handler = self._handlers.get(message.label)
+        if handler is not None:
+            handler(message, channel, text)
+        if message.label in ALIVE_LISTS:
+            alive = message.players() if message.exact else parse_alive_players(text)
+            if alive:
+                self._sync_alive(alive)
+
+    def answered(self, request: str, answer: str):
+        """Records the agent's own vote, kill vote or save, as the moderator will read it."""
+        message = classify(request)
+        label = message.label if message is not None else None
+        if label not in OWN_ANSWERS:
+            return
+        # the doctor may protect themself, a vote for oneself is a misread answer
+        target = self._target(answer, voter=None if label in (DOCTOR_SAVE, DOCTOR_SAVE_RETRY) else self.player_name)
+        if target is None:
+            return
+        if label in (DAY_VOTE, DAY_VOTE_RETRY):
+            self.day_votes[self.round][self.player_name] = target
+        elif label in (WOLF_VOTE, WOLF_VOTE_RETRY):
+            self.wolf_votes[self.round][self.player_name] = target
+        else:
+            self.saves[self.round] = target
+        self._updated()
+
+    def _introduction(self, message: ModeratorMessage, channel: str, text: str):
+        names = message.players("players") if message.exact else parse_players(text)
+        if names:
+            self.players = {name: PlayerState(name) for name in names}
+            self._set_role(self.player_name, self.role, "me")
+            self._changed()
+
+    def _role_setting(self, message: ModeratorMessage, channel: str, text: str):
+        self.role = parse_role(text)
+        self._set_role(self.player_name, self.role, "me")
+
+    def _night_start(self, message: ModeratorMessage, channel: str, text: str):
+        self.round += 1
+        self.phase = "night"
+        self._awaiting.clear()
+        self._updated()
+
+    def _wolf_night(self, message: ModeratorMessage, channel: str, text: str):
+        # only wolves get this message, and it lists the alive players who are not wolves
+        villagers = set(message.players("players"))
+        if villagers:
+            for name in self.alive:
+                if name not in villagers:
+                    self._set_role(name, WOLF, "me" if name == self.player_name else "fellow wolf")
+
+    def _vote_request(self, message: ModeratorMessage, channel: str, text: str):
+        # the retry templates misspell the variable
+        voter = message.variables.get("delegate_player") or message.variables.get("delegatte_player")
+        if voter and voter != self.player_name:
+            self._awaiting[channel] = voter
+
+    def _seer_result(self, message: ModeratorMessage, channel: str, text: str):
+        checked = message.variables.get("selected_player")
+        if not checked:
+            return
+        # the template's two branches differ only in their wording
+        is_wolf = "is not a wolf" not in text.lower()
+        self.seer_results[checked] = is_wolf
+        self._set_role(checked, WOLF if is_wolf else NOT_WOLF, "seer check")
+
+    def _day_start(self, message: ModeratorMessage, channel: str, text: str):
+        self.round = max(self.round, 1)
+        self.phase = "day"
+        eliminated = message.variables.get("eliminated_villager") if message.exact else parse_eliminated(text)
+        if eliminated:
+            self.night_kills[self.round] = eliminated
+            self._eliminate(eliminated, NOT_WOLF, f"night {self.round}")
+        elif message.exact:
+            # nobody died, so the doctor protected the wolves' target
+            self.night_kills[self.round] = None
+            self.saves.setdefault(self.round, None)
+            self._updated()
+
+    def _day_end(self, message: ModeratorMessage, channel: str, text: str):
+        eliminated = message.variables.get("eliminated_player") if message.exact else parse_eliminated(text)
+        if eliminated:
+            role = message.variables.get("eliminated_player_role", "").lower() or None
+            self._eliminate(eliminated, role, f"day {self.round}")
+
+    def _record_vote(self, channel: str, voter: str, text: str):
+        target = self._target(text, voter)
+        if target is None:
+            logger.info(f"Could not read {voter}'s vote: {text!r}")
+            return
+        votes = self.wolf_votes if channel == self.wolfs_channel else self.day_votes
+        votes[self.round][voter] = target
+        self._updated()
+
+    def _target(self, text: str, voter: Optional[str] = None) -> Optional[str]:
+        """The player an answer names, never `voter` themself."""
+        if self._index is None:
+            self._index = NameIndex(self.alive)
+        mentions, _ = self._index.mentions(text)
+        return pick(text, [mention for mention in mentions if mention[1] != voter])
+
+    def _sync_alive(self, names: List[str]):
+        """The moderator's own list of alive players overrides what was inferred."""
+        for name in names:
+            if name not in self.players:
+                self.players[name] = PlayerState(name)
+        alive = set(names)
+        for player in self.players.values():
+            if player.alive != (player.name in alive):
+                player.alive = player.name in alive
+                self._changed()
+
+    def _eliminate(self, name: str, role: Optional[str], when: str):
+        player = self.players.setdefault(name, PlayerState(name))
+        player.alive = False
+        player.eliminated = when
+        if role:
+            self._set_role(name, role, "revealed")
+        self._changed()
+
+    def _set_role(self, name: str, role: Optional[str], source: str):
+        player = self.players.get(name)
+        # a revealed role is final, a night kill only says "not wolf"
+        if player is None or role is None or (player.role_source in ("revealed", "me") and source != "me"):
+            return
+        player.role, player.role_source = role, source
+        self._updated()
+
+    def _changed(self):
+        self._index = None
+        self._updated()
+
+    def _updated(self):
+        self.revision += 1
+        self._table = None
+
+    def table(self) -> str:
+        """The known state in a few lines, cached until something changes."""
+        if self._table is None:
+            self._table = self._render()
+        return self._table
+
+    def _render(self) -> str:
+        if not self.players:
+            return ""
+        lines = [f"Game state ({self.phase or 'start'} {self.round}):"]
+        lines.append("Alive: " + ", ".join(self.alive))
+        dead = []
+        for player in self.players.values():
+            if not player.alive:
+                how = "voted out" if player.eliminated.startswith("day") else "killed"
+                dead.append(f"{player.name} ({player.role or 'role unknown'}, {how} {player.eliminated})" if player.eliminated else player.name)
+        if dead:
+            lines.append("Dead: " + ", ".join(dead))
+        known = [f"{p.name}: {p.role} ({p.role_source})" for p in self.players.values() if p.alive and p.role]
+        if known:
+            lines.append("Known roles: " + "; ".join(known))
+        for number, votes in sorted(self.wolf_votes.items()):
+            if votes:
+                lines.append(f"Wolf votes night {number}: " + ", ".join(f"{voter} -> {target}" for voter, target in votes.items()))
+        for number, votes in sorted(self.day_votes.items()):
+            if votes:
+                lines.append(f"Votes day {number}: " + ", ".join(f"{voter} -> {target}" for voter, target in votes.items()))
+        if self.claims:
+            lines.append("Claims: " + ", ".join(f"{name} {role}" for name, role in self.claims.items()))
+        if self.saves:
+            saves = ", ".join(f"night {number} {saved or 'someone'}" for number, saved in sorted(self.saves.items()))
+            lines.append(f"Doctor saves: {saves}")
+        return "\n".join(lines)
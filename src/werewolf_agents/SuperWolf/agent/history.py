@@ -0,0 +1,104 @@
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple
+
+PUBLIC = "public"
+WOLF = "wolf"
+PRIVATE = "private"
+
+# Views are rendered on append, so reading one never re-joins the history.
+VIEWS: Dict[str, Tuple[str, ...]] = {
+    "public": (PUBLIC,),
+    "wolf": (WOLF,),
+    "private": (PRIVATE,),
+    "player": (PUBLIC, PRIVATE),  # everything except the wolf den
+    "full": (PUBLIC, PRIVATE, WOLF),
+}
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate, close enough for Llama-style BPE vocabularies."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def visibility_of(channel: str, is_direct: bool, wolfs_channel: str = "wolf's-den") -> str:
+    if is_direct:
+        return PRIVATE
+    if channel == wolfs_channel:
+        return WOLF
+    return PUBLIC
+
+
+@dataclass
+class HistoryEntry:
+    text: str
+    visibility: str
+    tokens: int
+    phase: int
+
+
+class GameHistory:
+    """Append-only game transcript with pre-rendered views per visibility.
+
+    The transcript is split into phases (pre-game, night 1, day 1, ...) and the
+    offset of every phase in every rendered view is recorded, so the text of a
+    range of phases is a slice rather than a re-join.
+    """
+
+    def __init__(self):
+        self.entries: List[HistoryEntry] = []
+        self.phase_labels: List[str] = ["pre-game"]
+        self._rendered: Dict[str, str] = {name: "" for name in VIEWS}
+        self._chars: Dict[str, int] = {name: 0 for name in VIEWS}
+        self._tokens: Dict[str, int] = {name: 0 for name in VIEWS}
+        self._phase_offsets: Dict[str, List[int]] = {name: [0] for name in VIEWS}
+
+    @property
+    def current_phase(self) -> int:
+        return len(self.phase_labels) - 1
+
+    def start_phase(self, kind: str):
+        number = sum(1 for label in self.phase_labels if label.startswith(kind)) + 1
+        self.phase_labels.append(f"{kind} {number}")
+        for name in VIEWS:
+            self._phase_offsets[name].append(len(self._rendered[name]))
+
+    def append(self, text: str, visibility: str = PUBLIC):
+        entry = HistoryEntry(text=text, visibility=visibility, tokens=estimate_tokens(text), phase=self.current_phase)
+        self.entries.append(entry)
+        for name, visibilities in VIEWS.items():
+            if visibility not in visibilities:
+                continue
+            if self._rendered[name]:
+                self._rendered[name] += "\n" + text
+                self._chars[name] += 1 + len(text)
+            else:
+                self._rendered[name] = text
+                self._chars[name] = len(text)
+            self._tokens[name] += entry.tokens
+
+    def view(self, name: str = "player") -> str:
+        return self._rendered[name]
+
+    def phase_range_view(self, name: str, start: int, end: int) -> str:
+        """Rendered text of phases start..end-1 for a view."""
+        offsets = self._phase_offsets[name]
+        stop = offsets[end] if end < len(offsets) else len(self._rendered[name])
+        return self._rendered[name][offsets[start]:stop].strip("\n")
+
+    def view_since_phase(self, name: str, start: int) -> str:
+        return self.phase_range_view(name, start, len(self.phase_labels))
+
+    def chars(self, name: str = "player") -> int:
+        return self._chars[name]
+
+    def tokens(self, name: str = "player") -> int:
+        return self._tokens[name]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return (entry.text for entry in self.entries)
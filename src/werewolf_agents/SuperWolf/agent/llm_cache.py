@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import os
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# off:           every call goes to llm_base_url
+# record:        every call goes to llm_base_url and is stored
+# replay:        stored calls are served from disk, misses go live and are stored
+# replay_strict: stored calls are served from disk, a miss raises CacheMiss
+CACHE_MODES = ("off", "record", "replay", "replay_strict")
+
+# Request options that change the answer and so belong in the key. Transport
+# options such as timeout do not.
+KEYED_OPTIONS = ("temperature", "top_p", "max_tokens", "stop", "seed", "response_format", "n")
+
+
+class CacheMiss(KeyError):
+    pass
+
+
+def canonical_key(model: str, messages: List[Dict[str, Any]], options: Optional[Dict[str, Any]] = None) -> str:
+    request = {
+        "model": model,
+        "messages": [{"role": m.get("role"), "content": m.get("content")} for m in messages],
+        "options": {k: v for k, v in sorted((options or {}).items()) if k in KEYED_OPTIONS},
+    }
+    encoded = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _response(content: str, usage: Optional[Dict[str, int]]) -> SimpleNamespace:
+    """Just enough of a ChatCompletion for the agents: choices[0].message.content and usage."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content), finish_reason="stop", index=0)],
+        usage=SimpleNamespace(**usage) if usage else None,
+    )
+
+
+def _usage(response) -> Optional[Dict[str, int]]:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+class LLMCache:
+    """Chat completions keyed by a hash of model, messages and sampling options.
+
+    The store is an append-only JSONL file with one short record per call. The
+    n-th identical request of a run gets its own entry, so repeated samples of
+    the same prompt replay in the order they were made.
+    """
+
+    def __init__(self, path: str, mode: str = "record"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode {mode!r}, expected one of {CACHE_MODES}")
+        self.path = path
+        self.mode = mode
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.occurrences = Counter()
+        self.released: Dict[str, Set[int]] = defaultdict(set)  # occurrence numbers of failed calls
+        self.stats = Counter()
+        if mode.startswith("replay") and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["k"]] = entry
+            logger.info(f"Loaded {len(self.entries)} cached LLM responses from {path}")
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], default_path: str) -> Optional["LLMCache"]:
+        """LLM_CACHE_MODE and LLM_CACHE_PATH in the environment override config.yaml."""
+        config = config or {}
+        mode = os.getenv("LLM_CACHE_MODE", config.get("mode") or "off")
+        if mode == "off":
+            return None
+        return cls(os.getenv("LLM_CACHE_PATH", config.get("path", default_path)), mode)
+
+    def _key(self, model: str, messages: List[Dict[str, Any]], options: Dict[str, Any]) -> str:
+        digest = canonical_key(model, messages, options)
+        released = self.released[digest]
+        if released:
+            # the retry of a failed call takes its place, so a recorded run replays with the same numbers
+            number = min(released)
+            released.remove(number)
+        else:
+            self.occurrences[digest] += 1
+            number = self.occurrences[digest]
+        return f"{digest}:{number}"
+
+    def release(self, key: str):
+        """Gives back the occurrence number of a call that got no response."""
+        digest, number = key.rsplit(":", 1)
+        self.released[digest].add(int(number))
+
+    def lookup(self, key: str) -> Optional[SimpleNamespace]:
+        if not self.mode.startswith("replay"):
+            return None
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.stats["hits"] += 1
+            return _response(entry["r"], entry.get("u"))
+        self.stats["misses"] += 1
+        if self.mode == "replay_strict":
+            raise CacheMiss(f"No cached LLM response for request {key} in {self.path}")
+        return None
+
+    def store(self, key: str, response):
+        entry = {"k": key, "r": response.choices[0].message.content}
+        usage = _usage(response)
+        if usage:
+            entry["u"] = usage
+        self.entries[key] = entry
+        self.stats["stored"] += 1
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n")
+
+    def wrap(self, client) -> "CachedOpenAI":
+        return CachedOpenAI(client, self)
+
+    def wrap_async(self, client) -> "CachedAsyncOpenAI":
+        return CachedAsyncOpenAI(client, self)
+
+
+class _Completions:
+    def __init__(self, completions, cache: LLMCache):
+        self._completions = completions
+        self._cache = cache
+
+    def create(self, model: str, messages: List[Dict[str, Any]], **kwargs):
+        key = self._cache._key(model, messages, kwargs)
+        cached = self._cache.lookup(key)
+        if cached is not None:
+            return cached
+        try:
+            response = self._completions.create(model=model, messages=messages, **kwargs)
+        except Exception:
+            self._cache.release(key)
+            raise
+        self._cache.store(key, response)
+        return response
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, model: str, messages: List[Dict[str, Any]], **kwargs):
+        key = self._cache._key(model, messages, kwargs)
+        cached = self._cache.lookup(key)
+        if cached is not None:
+            return cached
+        try:
+            response = await self._completions.create(model=model, messages=messages, **kwargs)
+        except BaseException:  # cancelled calls too, e.g. a hedge or a sample that lost the race
+            self._cache.release(key)
+            raise
+        self._cache.store(key, response)
+        return response
+
+
+class CachedOpenAI:
+    """Drop-in for OpenAI where only chat.completions.create is cached."""
+
+    _completions_class = _Completions
+
+    def __init__(self, client, cache: LLMCache):
+        self._client = client
+        self._cache = cache
+        self.chat = SimpleNamespace(completions=self._completions_class(client.chat.completions, cache))
+
+    def with_options(self, **options):
+        return type(self)(self._client.with_options(**options), self._cache)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class CachedAsyncOpenAI(CachedOpenAI):
+    """Drop-in for AsyncOpenAI where only chat.completions.create is cached."""
+
+    _completions_class = _AsyncCompletions
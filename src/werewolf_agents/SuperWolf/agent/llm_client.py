@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import openai
+from openai import AsyncOpenAI
+
+from .circuit_breaker import FAILED, IGNORED, OK, CircuitBreakers
+from .hedging import Hedger
+from .history import estimate_tokens
+from .llm_cache import LLMCache
+from .rate_limiter import RateLimiter, backoff_delay, priority_for, retry_after
+from .streaming import streamed_response
+from .tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+# The openai client's built-in retries are turned off: they sleep without
+# regard for the other calls of the agent, and every attempt should show up in
+# the call's span.
+MAX_RETRIES = 3
+RETRY_STATUS_CODES = (408, 409, 429)
+COMPLETION_TOKENS_ESTIMATE = 300  # budgeted per call until the real usage is known
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, openai.APIConnectionError):  # includes timeouts
+        return True
+    return isinstance(error, openai.APIStatusError) and (error.status_code in RETRY_STATUS_CODES or error.status_code >= 500)
+
+
+def request_tokens(messages: List[Dict[str, Any]], max_tokens: Optional[int] = None) -> int:
+    prompt = sum(estimate_tokens(str(message.get("content") or "")) for message in messages)
+    return prompt + (max_tokens or COMPLETION_TOKENS_ESTIMATE)
+
+
+def used_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return usage.total_tokens if usage is not None else None
+
+
+def retry_delay(error: Exception, attempt: int, limiter: RateLimiter, deadline=None) -> Optional[float]:
+    """Seconds to back off before retry number `attempt` (from 0), or None when
+    the call should not be retried. A Retry-After pauses the whole limiter
+    instead, so the wait happens in the next acquire."""
+    if not is_retryable(error):
+        return None
+    server_wait = retry_after(error)
+    delay = 0.0 if server_wait is not None else backoff_delay(attempt)
+    if deadline is not None and deadline.remaining() < (server_wait or 0.0) + delay:
+        logger.warning(f"Not retrying {type(error).__name__}, the deadline would pass first")
+        return None
+    if server_wait is not None:
+        limiter.pause(server_wait)
+    return delay
+
+
+def complete(
+    client,
+    tracer: Tracer,
+    limiter: RateLimiter,
+    stage: str,
+    model: str,
+    messages: List[Dict[str, Any]],
+    max_retries: int = MAX_RETRIES,
+):
+    """Blocking counterpart of LLMClient.chat for a sync OpenAI client created
+    with max_retries=0. Returns the response and records its span."""
+    span = tracer.start(stage, model)
+    priority = priority_for(stage, tracer.context().get("action_type"))
+    estimated = request_tokens(messages)
+    response = None
+    try:
+        for attempt in range(max_retries + 1):
+            span.queue_wait_s += limiter.acquire_blocking(estimated, priority)
+            start = time.perf_counter()
+            try:
+                response = client.chat.completions.create(model=model, messages=messages)
+                break
+            except Exception as e:
+                delay = retry_delay(e, attempt, limiter, tracer.context().get("deadline"))
+                if attempt == max_retries or delay is None:
+                    raise
+                logger.warning(f"LLM call for {stage} failed ({type(e).__name__}), retrying in {delay:.2f}s")
+            finally:
+                span.network_s = time.perf_counter() - start
+                limiter.release(estimated, used_tokens(response))
+            span.retries += 1
+            span.queue_wait_s += span.network_s + delay
+            time.sleep(delay)
+    except BaseException as e:
+        tracer.finish(span, error=e)
+        raise
+    tracer.finish(span, response)
+    return response
+
+
+class LLMClient:
+    """Non-blocking chat completion client shared by every LLM stage of an agent.
+
+    Awaiting a completion yields to the event loop, so the agent keeps receiving
+    `async_notify` traffic while a round trip is in flight and independent calls
+    can be scheduled concurrently. Calls wait their turn at the rate limiter,
+    most urgent first. Calls made with hedge=True for an action the hedger
+    covers get a duplicate request when they are slow. While the circuit
+    breaker of the endpoint and model is open, calls go to the fallback.
+    Calls given a stop_when condition are streamed and stop as soon as the
+    text so far satisfies it.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        model: str,
+        cache: Optional[LLMCache] = None,
+        tracer: Optional[Tracer] = None,
+        limiter: Optional[RateLimiter] = None,
+        max_retries: int = MAX_RETRIES,
+        hedger: Optional[Hedger] = None,
+        breakers: Optional[CircuitBreakers] = None,
+    ):
+        self.model = model
+        self.base_url = base_url
+        self.cached = cache is not None  # the cache stores whole completions, so no streaming
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.breakers = breakers
+        self.fallback_client = self.client
+        if breakers is not None and breakers.fallback_base_url:
+            self.fallback_client = AsyncOpenAI(api_key=api_key, base_url=breakers.fallback_base_url, max_retries=0)
+        if cache is not None:
+            self.client = cache.wrap_async(self.client)
+            self.fallback_client = cache.wrap_async(self.fallback_client)
+            hedger = None  # duplicate requests would break the recorded call order
+        self.hedger = hedger
+        self.hedge_client = self.client
+        if hedger is not None and hedger.base_url:
+            self.hedge_client = AsyncOpenAI(api_key=api_key, base_url=hedger.base_url, max_retries=0)
+        self.tracer = tracer or Tracer()
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.on_latency: Optional[Callable[[float], None]] = None  # called with the seconds of every completed call
+
+    async def _duplicate(self, send: Callable[..., Awaitable[Any]], model: str, estimated: int, priority: int):
+        """The hedge request, which needs a rate limiter slot of its own."""
+        await self.limiter.acquire(estimated, priority)
+        response = None
+        try:
+            response = await send(self.hedge_client, self.hedger.model or model)
+            return response
+        finally:
+            self.limiter.release(estimated, used_tokens(response))
+
+    async def _stream(self, client, model: str, messages: List[Dict[str, Any]], stop_when: Callable[[str], bool], span, **kwargs):
+        """Reads the completion as it is generated. Once stop_when holds for
+        the text so far, the stream is closed, which ends generation upstream."""
+        stream = await client.chat.completions.create(model=model, messages=messages, stream=True, **kwargs)
+        parts, usage = [], None
+        try:
+            async for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    if stop_when("".join(parts)):
+                        span.early_stop = True
+                        break
+        finally:
+            await stream.close()
+        return streamed_response("".join(parts), messages, usage)
+
+    def _route(self, model: str):
+        """Client and model for the next attempt, and the breaker to report its outcome to."""
+        if self.breakers is None:
+            return self.client, model, None
+        breaker = self.breakers.get(self.base_url, model)
+        if breaker.allow():
+            return self.client, model, breaker
+        self.breakers.stats["fallback_calls"] += 1
+        return self.fallback_client, self.breakers.fallback_model or model, None
+
+    async def chat(
+        self,
+        messages: List[Dict[str, Any]],
+        stage: str = "chat",
+        priority: Optional[int] = None,
+        hedge: bool = False,
+        stop_when: Optional[Callable[[str], bool]] = None,
+        **kwargs,
+    ) -> str:
+        model = kwargs.pop("model", self.model)
+        span = self.tracer.start(stage, model)
+        context = self.tracer.context()
+        if priority is None:
+            priority = priority_for(stage, context.get("action_type"))
+        estimated = request_tokens(messages, kwargs.get("max_tokens"))
+        hedge = hedge and self.hedger is not None and self.hedger.applies(context.get("action_type"))
+        if stop_when is not None and not self.cached:
+            send = lambda client, model: self._stream(client, model, messages, stop_when, span, **kwargs)
+        else:
+            send = lambda client, model: client.chat.completions.create(model=model, messages=messages, **kwargs)
+        response = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                span.queue_wait_s += await self.limiter.acquire(estimated, priority)
+                client, span.model, breaker = self._route(model)
+                outcome, reason = IGNORED, ""  # e.g. cancelled
+                start = time.perf_counter()
+                try:
+                    if hedge:
+                        response, span.hedge = await self.hedger.run(
+                            stage,
+                            lambda: send(client, span.model),
+                            lambda: self._duplicate(send, span.model, estimated, priority),
+                            estimated,
+                        )
+                    else:
+                        response = await send(client, span.model)
+                    outcome = OK
+                    break
+                except Exception as e:
+                    outcome, reason = (FAILED if is_retryable(e) else IGNORED), type(e).__name__
+                    delay = retry_delay(e, attempt, self.limiter, context.get("deadline"))
+                    if attempt == self.max_retries or delay is None:
+                        raise
+                    logger.warning(f"LLM call for {stage} failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                finally:
+                    span.network_s = time.perf_counter() - start
+                    self.limiter.release(estimated, used_tokens(response))
+                    if breaker is not None:
+                        breaker.record(outcome, span.network_s, reason)
+                span.retries += 1
+                span.queue_wait_s += span.network_s + delay
+                await asyncio.sleep(delay)
+        except BaseException as e:
+            self.tracer.finish(span, error=e)
+            raise
+        self.tracer.finish(span, response)
+        if self.on_latency is not None:
+            self.on_latency(span.duration_s)
+        return response.choices[0].message.content
@@ -0,0 +1,199 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lower goes first. Answers the moderator is waiting on beat other answers,
+# which beat notification-time work and background summaries.
+PRIORITY_DECISION = 0
+PRIORITY_RESPONSE = 1
+PRIORITY_NOTIFY = 2
+PRIORITY_BACKGROUND = 3
+
+DECISION_ACTIONS = ("day_vote", "wolf_target", "seer_check", "doctor_save")
+BACKGROUND_STAGES = ("summary",)
+
+BACKOFF_BASE_S = 0.25
+BACKOFF_MAX_S = 4.0
+MAX_PAUSE_S = 60.0  # longest Retry-After honoured as given
+
+
+def priority_for(stage: str, action_type: Optional[str]) -> int:
+    if stage in BACKGROUND_STAGES:
+        return PRIORITY_BACKGROUND
+    if action_type is None:
+        return PRIORITY_NOTIFY
+    return PRIORITY_DECISION if action_type in DECISION_ACTIONS else PRIORITY_RESPONSE
+
+
+def backoff_delay(attempt: int) -> float:
+    """Short exponential backoff with full jitter, `attempt` counts from 0."""
+    return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** attempt))
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds from the Retry-After (or retry-after-ms) header of a failed call, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        return None
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass  # an HTTP date, fall back to backoff
+    return None
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` can be taken."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+
+class RateLimiter:
+    """Client-side request and token budgets shared by every LLM call of an agent.
+
+    Callers wait in priority order for budget and a concurrency slot. A
+    Retry-After from the server pauses every caller for that long.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrent: Optional[int] = None,
+    ):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._waiters = []  # heap of (priority, arrival)
+        self._arrivals = itertools.count()
+        self._changed: Optional[asyncio.Event] = None
+        self.stats = Counter()
+        self.wait_seconds: Dict[int, float] = Counter()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "RateLimiter":
+        config = config or {}
+        return cls(config.get("requests_per_minute"), config.get("tokens_per_minute"), config.get("max_concurrent"))
+
+    def _delay(self, tokens: float) -> float:
+        delays = [self.paused_until - time.monotonic()]
+        if self.requests is not None:
+            delays.append(self.requests.delay(1))
+        if self.tokens is not None:
+            delays.append(self.tokens.delay(tokens))
+        return max(delays)
+
+    def _full(self) -> bool:
+        return bool(self.max_concurrent) and self.in_flight >= self.max_concurrent
+
+    def _take(self, tokens: float, priority: int, waited: float):
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+        self.in_flight += 1
+        self.stats["granted"] += 1
+        self.stats[f"waited_p{priority}"] += waited >= 0.001
+        self.wait_seconds[priority] += waited
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    async def _wait_for_change(self, timeout: Optional[float]):
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def acquire(self, tokens: float, priority: int = PRIORITY_RESPONSE) -> float:
+        """Waits for budget and a slot, returns the seconds waited. Every
+        acquire must be followed by release()."""
+        started = time.monotonic()
+        entry = (priority, next(self._arrivals))
+        heapq.heappush(self._waiters, entry)
+        self._notify()  # a more urgent caller may have arrived
+        try:
+            while True:
+                if self._waiters[0] == entry and not self._full():
+                    delay = self._delay(tokens)
+                    if delay <= 0:
+                        heapq.heappop(self._waiters)
+                        waited = time.monotonic() - started
+                        self._take(tokens, priority, waited)
+                        self._notify()
+                        return waited
+                    await self._wait_for_change(delay)
+                else:
+                    await self._wait_for_change(None)
+        except BaseException:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._notify()
+            raise
+
+    def acquire_blocking(self, tokens: float, priority: int = PRIORITY_RESPONSE) -> float:
+        """acquire() for the synchronous clients, which never call concurrently
+        and so only wait for budget."""
+        started = time.monotonic()
+        delay = self._delay(tokens)
+        while delay > 0:
+            time.sleep(delay)
+            delay = self._delay(tokens)
+        waited = time.monotonic() - started
+        self._take(tokens, priority, waited)
+        return waited
+
+    def release(self, estimated_tokens: float = 0, used_tokens: Optional[float] = None):
+        """Frees the slot and corrects the token budget by what the call really used."""
+        self.in_flight -= 1
+        if self.tokens is not None and used_tokens is not None:
+            self.tokens.take(used_tokens - estimated_tokens)
+        self._notify()
+
+    def pause(self, seconds: float):
+        """Holds every caller back, e.g. for a server's Retry-After."""
+        seconds = min(seconds, MAX_PAUSE_S)
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.stats["pauses"] += 1
+        logger.warning(f"Rate limited, holding LLM calls for {seconds:.1f}s")
+
+    def report(self) -> Dict[str, Any]:
+        report = dict(self.stats)
+        for priority, seconds in self.wait_seconds.items():
+            report[f"wait_s_p{priority}"] = seconds
+        return report
@@ -0,0 +1,213 @@
+import itertools
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .game_tracker import NOT_WOLF, WOLF, GameTracker
+
+logger = logging.getLogger(__name__)
+
+ROLES = ("villager", "wolf", "seer", "doctor")  # role codes are indices into this
+_CODES = {role: code for code, role in enumerate(ROLES)}
+
+# Relative weight of a day vote by a voter of each role (rows) for a target of
+# each role (columns): wolves rarely vote out a fellow wolf, the others lean
+# somewhat towards wolves.
+VOTE_WEIGHTS = np.array([
+    [1.0, 2.0, 1.0, 1.0],
+    [1.0, 0.2, 1.0, 1.0],
+    [1.0, 2.0, 1.0, 1.0],
+    [1.0, 2.0, 1.0, 1.0],
+])
+# Chance that a player of each role publicly claims the seer or doctor role.
+CLAIM_LIKELIHOODS = {
+    "seer": np.array([0.05, 0.3, 0.9, 0.02]),
+    "doctor": np.array([0.05, 0.3, 0.02, 0.9]),
+}
+
+
+def assignments(players: int, wolves: int = 2, seers: int = 1, doctors: int = 1) -> np.ndarray:
+    """Every assignment of the roles to the players, assignments x players role codes."""
+    picks = []  # (wolf indices, seer indices, doctor indices) of each assignment
+    everyone = range(players)
+    for wolf in itertools.combinations(everyone, wolves):
+        rest = [i for i in everyone if i not in wolf]
+        for seer in itertools.combinations(rest, seers):
+            others = [i for i in rest if i not in seer]
+            picks.extend((wolf, seer, doctor) for doctor in itertools.combinations(others, doctors))
+    roles = np.zeros((len(picks), players), dtype=np.int8)
+    if not picks:
+        return roles
+    rows = np.arange(len(picks))[:, None]
+    for position, role in enumerate(("wolf", "seer", "doctor")):
+        columns = np.array([pick[position] for pick in picks], dtype=int).reshape(len(picks), -1)
+        roles[rows, columns] = _CODES[role]
+    return roles
+
+
+class RoleBeliefs:
+    """Exact probabilities of each player's role, from the GameTracker's facts.
+
+    Keeps a log-probability per role assignment (840 for 8 players). Known
+    roles, seer results, eliminations and fellow wolves rule assignments out;
+    day votes and role claims reweight them. Facts are applied once each as
+    they are tracked, so every update is a single vectorized pass over the
+    assignments.
+    """
+
+    def __init__(self, tracker: GameTracker, wolves: int = 2, seers: int = 1, doctors: int = 1, fast_margin: Optional[float] = None):
+        self.tracker = tracker
+        self.counts = (wolves, seers, doctors)
+        self.fast_margin = fast_margin
+        self.names: List[str] = []
+        self.roles = np.zeros((0, 0), dtype=np.int8)
+        self.log_prob = np.zeros(0)
+        self._onehot = np.zeros((0, 0, len(ROLES)))
+        self._applied: Set[Tuple] = set()
+        self._revision = -1
+        self._marginals: Optional[np.ndarray] = None
+        self.stats = Counter()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], tracker: GameTracker) -> Optional["RoleBeliefs"]:
+        config = config or {}
+        if not config.get("enabled", False):
+            return None
+        return cls(
+            tracker,
+            wolves=config.get("wolves", 2),
+            seers=config.get("seers", 1),
+            doctors=config.get("doctors", 1),
+            fast_margin=config.get("fast_margin"),
+        )
+
+    def _reset(self):
+        self.names = list(self.tracker.players)
+        self.roles = assignments(len(self.names), *self.counts)
+        self.log_prob = np.zeros(len(self.roles))
+        self._onehot = (self.roles[:, :, None] == np.arange(len(ROLES))).astype(float)
+        self._applied = set()
+
+    def _sync(self):
+        if self._revision == self.tracker.revision:
+            return
+        self._revision = self.tracker.revision
+        self._marginals = None
+        if list(self.tracker.players) != self.names:
+            self._reset()
+        if not len(self.roles):
+            return
+        index = {name: i for i, name in enumerate(self.names)}
+        for player in self.tracker.players.values():
+            if player.role in _CODES or player.role == NOT_WOLF:
+                self._apply(("role", player.name, player.role), self._role_mask(index[player.name], player.role))
+        for number, saved in self.tracker.saves.items():
+            # nobody died although the doctor protected `saved`: the wolves' target, never a wolf
+            if saved in index and number in self.tracker.night_kills and self.tracker.night_kills[number] is None:
+                self._apply(("saved", number), self._role_mask(index[saved], NOT_WOLF))
+        for number, votes in self.tracker.day_votes.items():
+            for voter, target in votes.items():
+                # the agent's own votes say nothing about roles it does not already know,
+                # and a self-vote is most likely a misread answer
+                if voter in index and target in index and voter not in (self.tracker.player_name, target):
+                    self._apply(("vote", number, voter), weights=self._vote_log_likelihood(index[voter], index[target]))
+        for name, role in self.tracker.claims.items():
+            if name in index and name != self.tracker.player_name:
+                self._apply(("claim", name, role), weights=np.log(CLAIM_LIKELIHOODS[role][self.roles[:, index[name]]]))
+
+    def _role_mask(self, i: int, role: str) -> np.ndarray:
+        if role == NOT_WOLF:
+            return self.roles[:, i] != _CODES[WOLF]
+        return self.roles[:, i] == _CODES[role]
+
+    def _vote_log_likelihood(self, voter: int, target: int) -> np.ndarray:
+        weights = VOTE_WEIGHTS[self.roles[:, voter][:, None], self.roles]  # assignments x candidates
+        weights[:, voter] = 0.0
+        return np.log(weights[:, target] / weights.sum(axis=1))
+
+    def _apply(self, key: Tuple, mask: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None):
+        if key in self._applied:
+            return
+        self._applied.add(key)
+        if mask is not None:
+            if not mask[np.isfinite(self.log_prob)].any():
+                # contradicts what is known, most likely a misread message
+                self.stats["contradictions"] += 1
+                logger.warning(f"Ignoring {key}, it contradicts every remaining role assignment")
+                return
+            self.log_prob = np.where(mask, self.log_prob, -np.inf)
+        if weights is not None:
+            updated = self.log_prob + weights
+            if not np.isfinite(updated).any():
+                self.stats["contradictions"] += 1
+                logger.warning(f"Ignoring {key}, it leaves no role assignment possible")
+                return
+            self.log_prob = updated
+        self.stats["facts"] += 1
+
+    def marginals(self) -> np.ndarray:
+        """players x ROLES probabilities, in the order of `names`."""
+        self._sync()
+        if self._marginals is None:
+            if not len(self.roles):
+                return np.zeros((0, len(ROLES)))
+            prob = np.exp(self.log_prob - self.log_prob.max())
+            self._marginals = np.tensordot(prob / prob.sum(), self._onehot, axes=1)
+        return self._marginals
+
+    def probabilities(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: dict(zip(ROLES, row.tolist())) for name, row in zip(self.names, self.marginals())
+        }
+
+    def best_target(self, action_kind: str) -> Optional[str]:
+        """The target of a seer check, doctor save or wolf kill when the role
+        probabilities clearly favour one, None to leave the choice to the LLM."""
+        if self.fast_margin is None:
+            return None
+        marginals = self.marginals()
+        players = self.tracker.players
+        candidates = [
+            i for i, name in enumerate(self.names)
+            if players[name].alive and name != self.tracker.player_name
+        ]
+        if action_kind == "seer_check":
+            # the most likely wolf among players whose role is not known yet
+            candidates = [i for i in candidates if players[self.names[i]].role is None]
+            scores = marginals[:, _CODES["wolf"]]
+        elif action_kind == "doctor_save":
+            scores = marginals[:, _CODES["seer"]]
+        elif action_kind == "wolf_target":
+            candidates = [i for i in candidates if marginals[i, _CODES["wolf"]] < 0.5]
+            scores = marginals[:, _CODES["seer"]] + marginals[:, _CODES["doctor"]]
+        else:
+            return None
+        if not candidates:
+            return None
+        ranked = sorted(candidates, key=lambda i: -scores[i])
+        lead = scores[ranked[0]] - (scores[ranked[1]] if len(ranked) > 1 else 0.0)
+        if lead < self.fast_margin:
+            return None
+        self.stats[f"fast_{action_kind}"] += 1
+        return self.names[ranked[0]]
+
+    def table(self) -> str:
+        """Alive players' wolf, seer and doctor probabilities, most likely wolf first."""
+        marginals = self.marginals()
+        players = self.tracker.players
+        rows = [
+            (name, marginals[i]) for i, name in enumerate(self.names)
+            if players[name].alive and name != self.tracker.player_name
+        ]
+        if not rows:
+            return ""
+        rows.sort(key=lambda row: -row[1][_CODES["wolf"]])
+        cells = ", ".join(
+            f"{name} {row[_CODES['wolf']]:.2f}/{row[_CODES['seer']]:.2f}/{row[_CODES['doctor']]:.2f}" for name, row in rows
+        )
+        return f"Role probabilities (wolf/seer/doctor): {cells}"
+
+    def report(self) -> Dict[str, int]:
+        return dict(self.stats)
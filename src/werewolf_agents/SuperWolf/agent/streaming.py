@@ -0,0 +1,54 @@
+import re
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .history import estimate_tokens
+from .rate_limiter import DECISION_ACTIONS
+from .vote_output import CHOICE_WORD, extract_player
+
+# "." "!" or "?" before whitespace or the end of what has arrived so far, or a line break
+_SENTENCE_END = re.compile(r"[.!?](?=\s|$)|\n")
+
+
+def streamed_actions(config: Optional[Dict[str, Any]]) -> Sequence[str]:
+    """Action types whose answers are streamed and cut short, none unless enabled."""
+    config = config or {}
+    return tuple(config.get("actions", DECISION_ACTIONS)) if config.get("enabled", False) else ()
+
+
+def vote_decided(text: str, candidates: Sequence[str]) -> bool:
+    """Whether a partial answer holds a finished sentence that picks one of
+    the candidates, e.g. "I vote for Alice because she defended a wolf." """
+    start = 0
+    for end in _SENTENCE_END.finditer(text):
+        sentence = text[start:end.end()]
+        if CHOICE_WORD.search(sentence) and extract_player(sentence, candidates):
+            return True
+        start = end.end()
+    return False
+
+
+def vote_stop(action_type: Optional[str], actions: Sequence[str], candidates: Sequence[str], player_name: str = "") -> Optional[Callable[[str], bool]]:
+    """Stop condition for LLMClient.chat, or None to wait for the full completion.
+    The agent's own name ("As Alice I think...") only counts for the doctor's save."""
+    if action_type != "doctor_save":
+        candidates = [name for name in candidates if name != player_name]
+    if action_type not in actions or not candidates:
+        return None
+    candidates = list(candidates)
+    return lambda text: vote_decided(text, candidates)
+
+
+def streamed_response(text: str, messages: List[Dict[str, Any]], usage=None) -> SimpleNamespace:
+    """A chat completion built from streamed text. Servers only report usage
+    for streams that run to the end, otherwise it is estimated."""
+    if usage is None:
+        prompt_tokens = sum(estimate_tokens(str(message.get("content") or "")) for message in messages)
+        completion_tokens = estimate_tokens(text)
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, total_tokens=prompt_tokens + completion_tokens
+        )
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=text))],
+        usage=usage,
+    )
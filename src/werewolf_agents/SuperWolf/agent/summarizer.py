@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Dict
+
+from .history import GameHistory, estimate_tokens
+from .llm_client import LLMClient
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """You are keeping notes for {name}, a player in a game of Werewolf.
+
+Notes so far:
+{digest}
+
+Transcript of {phases}:
+{transcript}
+
+Update the notes with what happened in this transcript. Keep exactly one short line per player covering their role claims, who they voted for or targeted, who they accused or defended, and whether they are dead (with their revealed role). Finish with one line listing eliminated players and revealed roles. Do not add advice or commentary."""
+
+
+class PhaseSummarizer:
+    """Folds finished day/night phases into a running per-player digest.
+
+    A prompt then carries the digest plus the raw text of the phases that are
+    not folded yet, instead of the whole transcript.
+    """
+
+    def __init__(self, llm: LLMClient, player_name: str):
+        self.llm = llm
+        self.player_name = player_name
+        self.digests: Dict[str, str] = {}
+        self.covered: Dict[str, int] = {}  # view -> number of phases folded into its digest
+        self.summaries = 0
+        self.situations = 0
+        self.tokens_saved = 0
+        self._lock = asyncio.Lock()
+
+    async def fold(self, history: GameHistory, view: str, upto_phase: int):
+        # phases are folded in order, one summary call at a time
+        async with self._lock:
+            start = self.covered.get(view, 0)
+            if upto_phase <= start:
+                return
+            transcript = history.phase_range_view(view, start, upto_phase)
+            if transcript:
+                phases = ", ".join(history.phase_labels[start:upto_phase])
+                digest = await self.llm.chat(
+                    stage="summary",
+                    messages=[
+                        {"role": "system", "content": "You summarize Werewolf game transcripts into compact notes."},
+                        {"role": "user", "content": SUMMARY_PROMPT.format(
+                            name=self.player_name,
+                            digest=self.digests.get(view, "(none yet)"),
+                            phases=phases,
+                            transcript=transcript,
+                        )},
+                    ]
+                )
+                self.digests[view] = digest.strip()
+                self.summaries += 1
+            self.covered[view] = upto_phase
+
+    def situation(self, history: GameHistory, view: str) -> str:
+        if view not in self.digests:
+            return history.view(view)
+        recent = history.view_since_phase(view, self.covered[view])
+        situation = f"Summary of earlier phases:\n{self.digests[view]}\n\nSince then:\n{recent}"
+        self.situations += 1
+        self.tokens_saved += max(0, history.tokens(view) - estimate_tokens(situation))
+        return situation
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "summaries": self.summaries,
+            "summarized_situations": self.situations,
+            "prompt_tokens_saved": self.tokens_saved,
+        }
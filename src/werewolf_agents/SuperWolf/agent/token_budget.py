@@ -0,0 +1,135 @@
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .history import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Prompt token budget per LLM stage, including the role prompt and the other
+# fixed parts of the prompt.
+DEFAULT_STAGE_BUDGETS = {
+    "monologue": 6000,
+    "action": 6000,
+    "reflection": 6000,
+    "final": 6000,
+}
+
+COMPACT_MESSAGE_TOKENS = 120  # long messages are cut to this before anything is dropped
+KEEP_RECENT = 4  # the most recent entries are never trimmed
+
+_ENTRY_START = re.compile(r"^\[From - ")
+_SENDER = re.compile(r"^\[From - ([^|\]]+)")
+_PLAYER_LIST = re.compile(r"list of your fellow player in the game\.\s*-\s*(\[.*?\])", re.DOTALL)
+
+
+@dataclass
+class Segment:
+    text: str
+    value: float
+    tokens: int
+    protected: bool = False
+    dropped: bool = False
+
+
+class TokenBudget:
+    """Trims a game situation to a per-stage token budget.
+
+    Segments are scored by who wrote them and how recent they are. The
+    moderator's rules intro is compacted first, then long low-value messages
+    are cut, then the lowest-value messages are dropped until the prompt fits.
+    """
+
+    def __init__(self, stage_budgets: Optional[Dict[str, int]] = None, moderator_name: str = "moderator"):
+        self.stage_budgets = {**DEFAULT_STAGE_BUDGETS, **(stage_budgets or {})}
+        self.moderator_name = moderator_name
+        self.stats = Counter()
+
+    def fit(self, stage: str, game_situation: str, reserved_tokens: int = 0) -> str:
+        budget = self.stage_budgets.get(stage, DEFAULT_STAGE_BUDGETS["final"]) - reserved_tokens
+        total = estimate_tokens(game_situation)
+        self.stats["fits"] += 1
+        if total <= budget:
+            return game_situation
+
+        segments = self._segments(game_situation)
+        total = sum(segment.tokens for segment in segments)
+        by_value = sorted((s for s in segments if not s.protected), key=lambda s: s.value)
+
+        # the rules intro goes first, the rest in order of increasing value
+        for segment in sorted(by_value, key=lambda s: "Game Instructions:" not in s.text):
+            if total <= budget:
+                break
+            compacted = self._compact(segment.text)
+            if compacted is None:
+                continue
+            saved = segment.tokens - estimate_tokens(compacted)
+            if saved <= 0:
+                continue
+            logger.info(f"Token budget [{stage}]: compacted message saving {saved} tokens: {segment.text[:60]!r}")
+            segment.text, segment.tokens = compacted, segment.tokens - saved
+            total -= saved
+            self.stats["compacted"] += 1
+            self.stats["tokens_trimmed"] += saved
+
+        for segment in by_value:
+            if total <= budget:
+                break
+            logger.info(f"Token budget [{stage}]: dropped message of {segment.tokens} tokens (value {segment.value:.2f}): {segment.text[:60]!r}")
+            segment.dropped = True
+            total -= segment.tokens
+            self.stats["dropped"] += 1
+            self.stats["tokens_trimmed"] += segment.tokens
+
+        if total > budget:
+            logger.info(f"Token budget [{stage}]: {total} tokens still over the budget of {budget}, only protected text is left")
+        return self._render(segments)
+
+    def _segments(self, game_situation: str) -> List[Segment]:
+        blocks: List[List[str]] = []
+        for line in game_situation.split("\n"):
+            if _ENTRY_START.match(line) or not blocks:
+                blocks.append([line])
+            else:
+                blocks[-1].append(line)
+
+        segments = []
+        for index, block in enumerate(blocks):
+            text = "\n".join(block)
+            sender = _SENDER.match(text)
+            if sender is None:
+                # digest or other preamble assembled by the agent
+                value, protected = 100.0, True
+            elif sender.group(1).strip() == self.moderator_name:
+                value, protected = 3.0, False
+            elif "(me)" in sender.group(1):
+                value, protected = 2.0, False
+            else:
+                value, protected = 1.0, False
+            value += index / len(blocks)  # newer is worth more
+            protected = protected or index >= len(blocks) - KEEP_RECENT
+            segments.append(Segment(text=text, value=value, tokens=estimate_tokens(text), protected=protected))
+        return segments
+
+    def _compact(self, text: str) -> Optional[str]:
+        if "Game Instructions:" in text:
+            players = _PLAYER_LIST.search(text)
+            header = text.split("]:", 1)[0] + "]"
+            return f"{header}: Introduction and game rules (omitted). Players: {players.group(1) if players else 'unknown'}"
+        if estimate_tokens(text) > COMPACT_MESSAGE_TOKENS:
+            return text[: COMPACT_MESSAGE_TOKENS * 4].rstrip() + " [...]"
+        return None
+
+    def _render(self, segments: List[Segment]) -> str:
+        lines, omitted = [], 0
+        for segment in segments:
+            if segment.dropped:
+                omitted += 1
+                continue
+            if omitted:
+                lines.append(f"[... {omitted} earlier messages omitted to fit the prompt budget ...]")
+                omitted = 0
+            lines.append(segment.text)
+        return "\n".join(lines)
@@ -0,0 +1,192 @@
+import logging
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .moderator_messages import action_kind, classify, parse_alive_players, parse_eliminated, parse_players
+
+logger = logging.getLogger(__name__)
+
+# Replies that name nobody but the target.
+REPLIES = {
+    "seer_check": "I want to check {player}.",
+    "doctor_save": "I want to save {player}.",
+    "wolf_target": "I vote to eliminate {player}.",
+    "day_vote": "I vote to eliminate {player}.",
+}
+
+CHOICE_WORD = re.compile(r"\b(?:vote|voting|eliminate|choose|choice|pick|investigate|check|protect|save|target|kill)\w*", re.IGNORECASE)
+_WORD = re.compile(r"[^\W\d_][\w'-]*")
+
+
+def vote_kind(text: str) -> Optional[str]:
+    """Action type of a moderator request for a player name, None for anything else."""
+    kind = action_kind(text)
+    return kind if kind in REPLIES else None
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance where swapping two neighbouring letters counts as one edit."""
+    rows = [list(range(len(b) + 1))]
+    for i in range(1, len(a) + 1):
+        row = [i]
+        for j in range(1, len(b) + 1):
+            row.append(min(rows[i - 1][j] + 1, row[j - 1] + 1, rows[i - 1][j - 1] + (a[i - 1] != b[j - 1])))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], rows[i - 2][j - 2] + 1)
+        rows.append(row)
+    return rows[-1][-1]
+
+
+def _deletes(word: str, depth: int) -> Set[str]:
+    variants, frontier = {word}, {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+class NameIndex:
+    """Player names by every spelling within a small edit distance.
+
+    Misspellings are looked up symmetric-delete style: the index holds the
+    names with up to `max_distance` characters deleted, a word is reduced the
+    same way, and shared variants are confirmed with the real edit distance.
+    Names of up to 5 letters tolerate one edit, longer names two.
+    """
+
+    def __init__(self, names: Sequence[str], max_distance: int = 2):
+        self.names = list(names)
+        self.exact = {name.lower(): name for name in self.names}
+        self.max_distance = max_distance
+        self.variants: Dict[str, Set[str]] = defaultdict(set)
+        for name in self.names:
+            for variant in _deletes(name.lower(), self._allowed(name)):
+                self.variants[variant].add(name)
+
+    def _allowed(self, name: str) -> int:
+        return min(self.max_distance, 1 if len(name) <= 5 else 2)
+
+    def lookup(self, word: str) -> Optional[str]:
+        """The one name `word` is a spelling of, None if none or several are as close."""
+        word = word.lower()
+        if word in self.exact:
+            return self.exact[word]
+        if len(word) < 3:
+            return None
+        candidates = set()
+        for variant in _deletes(word, self.max_distance):
+            candidates |= self.variants.get(variant, set())
+        scored = sorted((edit_distance(word, name.lower()), name) for name in candidates)
+        scored = [(distance, name) for distance, name in scored if distance <= self._allowed(name)]
+        if not scored or (len(scored) > 1 and scored[0][0] == scored[1][0]):
+            return None
+        return scored[0][1]
+
+    def mentions(self, text: str) -> Tuple[List[Tuple[int, str]], bool]:
+        """(position, name) of every name mentioned and whether any was misspelled.
+        Misspellings only count for capitalized words, so common words close to
+        a name ("else" and Elise) are not read as votes."""
+        exact = exact_mentions(text, self.names)
+        if exact:
+            return exact, False
+        fuzzy = []
+        for match in _WORD.finditer(text):
+            if match.group()[0].isupper():
+                name = self.lookup(match.group())
+                if name is not None:
+                    fuzzy.append((match.start(), name))
+        return fuzzy, bool(fuzzy)
+
+
+def exact_mentions(text: str, names: Sequence[str]) -> List[Tuple[int, str]]:
+    """(position, name) of every whole-word, case-insensitive mention, in order."""
+    mentions = []
+    for name in names:
+        for match in re.finditer(rf"(?<!\w){re.escape(name)}(?!\w)", text, re.IGNORECASE):
+            mentions.append((match.start(), name))
+    return sorted(mentions)
+
+
+def pick(text: str, mentions: List[Tuple[int, str]]) -> Optional[str]:
+    """The chosen name: the only one mentioned, else the first after a word
+    such as "vote" or "protect", else the first one mentioned."""
+    if not mentions:
+        return None
+    if len({name for _, name in mentions}) == 1:
+        return mentions[0][1]
+    for word in CHOICE_WORD.finditer(text):
+        after = [mention for mention in mentions if mention[0] >= word.end()]
+        if after:
+            return min(after)[1]
+    return min(mentions)[1]
+
+
+def extract_player(text: str, candidates: Sequence[str]) -> Optional[str]:
+    """The candidate an answer names, spelled exactly; see pick()."""
+    text = text or ""
+    return pick(text, exact_mentions(text, candidates))
+
+
+class VoteOutput:
+    """Turns answers to vote-style requests into replies the moderator cannot misread.
+
+    An answer that names exactly one alive player is sent as it is. One that
+    misspells the player or names several is rewritten to a short sentence
+    naming only the chosen player, which saves the moderator's retry round
+    (the *_local_retry.txt templates) and its LLM selection step.
+    """
+
+    def __init__(self, player_name: str):
+        self.player_name = player_name
+        self.alive: List[str] = []
+        self._index: Optional[NameIndex] = None
+        self._index_names: Tuple[str, ...] = ()
+        self.stats = Counter()
+
+    def observe(self, text: str):
+        """Keeps the alive list current, call with every moderator message."""
+        players = parse_players(text) or parse_alive_players(text)
+        if players:
+            self.alive = players
+        eliminated = parse_eliminated(text)
+        if eliminated in self.alive:
+            self.alive.remove(eliminated)
+        message = classify(text)
+        if message is not None and message.is_retry:
+            # the *_local_retry.txt templates, sent when the moderator could not read an answer
+            self.stats["retries_received"] += 1
+
+    def _candidates(self, kind: str) -> NameIndex:
+        # only the doctor may sensibly name themselves
+        names = tuple(name for name in self.alive if kind == "doctor_save" or name.lower() != self.player_name.lower())
+        if self._index is None or names != self._index_names:
+            self._index, self._index_names = NameIndex(names), names
+        return self._index
+
+    def canonicalize(self, request: str, answer: str) -> str:
+        """The reply to send for `answer` to the moderator's `request`."""
+        kind = vote_kind(request)
+        if kind is None or not self.alive or not answer:
+            return answer
+        self.stats["votes"] += 1
+        mentions, misspelled = self._candidates(kind).mentions(answer)
+        player = pick(answer, mentions)
+        if player is None:
+            self.stats["unresolved"] += 1
+            logger.warning(f"No alive player found in the {kind} answer: {answer!r}")
+            return answer
+        if not misspelled and len({name for _, name in mentions}) == 1:
+            self.stats["clean"] += 1
+            return answer
+        self.stats["misspelled" if misspelled else "ambiguous"] += 1
+        self.stats["retries_avoided"] += 1
+        reply = REPLIES[kind].format(player=player)
+        logger.info(
+            f"Rewrote {'misspelled' if misspelled else 'ambiguous'} {kind} answer {answer!r} as {reply!r}, "
+            f"{self.stats['retries_avoided']} moderator retries avoided this game"
+        )
+        return reply
+
+    def report(self) -> Dict[str, int]:
+        return dict(self.stats)
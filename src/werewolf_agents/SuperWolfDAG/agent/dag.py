@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .history import estimate_tokens
+from .llm_client import LLMClient
+from .token_budget import TokenBudget
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Node:
+    """One LLM stage. The prompt is formatted with the decision context
+    (role_prompt, game_situation, specific_prompt, action_type, name, role)
+    and the outputs of the nodes it depends on, by node name."""
+
+    name: str
+    prompt: str
+    system: str
+    stage: str = "monologue"  # token budget stage
+    deps: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class Pipeline:
+    name: str
+    nodes: Tuple[Node, ...]
+    output: str
+
+    def __post_init__(self):
+        names = [node.name for node in self.nodes]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Pipeline {self.name} has duplicate node names: {names}")
+        if self.output not in names:
+            raise ValueError(f"Pipeline {self.name} output {self.output!r} is not one of its nodes")
+        # declaration order must already be a topological order, which also rules out cycles
+        seen = set()
+        for node in self.nodes:
+            missing = [dep for dep in node.deps if dep not in seen]
+            if missing:
+                raise ValueError(f"Pipeline {self.name}: node {node.name!r} depends on {missing} declared after it or not at all")
+            seen.add(node.name)
+
+    @property
+    def depth(self) -> int:
+        """Number of sequential LLM calls on the longest chain."""
+        depths: Dict[str, int] = {}
+        for node in self.nodes:
+            depths[node.name] = 1 + max((depths[dep] for dep in node.deps), default=0)
+        return depths[self.output]
+
+
+@dataclass
+class NodeTiming:
+    start_s: float
+    end_s: float
+
+    @property
+    def duration_s(self) -> float:
+        return self.end_s - self.start_s
+
+
+@dataclass
+class DAGResult:
+    output: str
+    outputs: Dict[str, str]
+    timings: Dict[str, NodeTiming]
+    wall_s: float
+
+    @property
+    def sequential_s(self) -> float:
+        """What the same calls would have taken one after the other."""
+        return sum(timing.duration_s for timing in self.timings.values())
+
+
+########################################################################
+# Stages
+#########################################################################
+
+SITUATION = """{role_prompt}
+
+Current game situation (including your past thoughts and actions):
+{game_situation}
+
+"""
+
+SUSPICION = Node(
+    name="suspicion",
+    system="You are a {role} in a Werewolf game. Assess the other players.",
+    prompt=SITUATION + """For every player still alive other than you ({name}), give a score from 1 to 7 for how likely they are to be a wolf (1 very unlikely, 7 very likely) and one short reason based on what they said and how they voted. One line per player.""",
+)
+
+THREATS = Node(
+    name="threats",
+    system="You are a {role} in a Werewolf game. Assess the other players.",
+    prompt=SITUATION + """For every player still alive other than you ({name}) and your wolf teammate, say how likely they are to be the seer or the doctor, and whether they suspect you or your teammate. One short line per player.""",
+)
+
+SEER_CLAIMS = Node(
+    name="seer_claims",
+    system="You are a {role} in a Werewolf game. Analyse role claims.",
+    prompt=SITUATION + """List every player who has claimed to be the seer or the doctor, and what they claimed to have found or saved. For each claim, say whether it is consistent with the roles revealed when players were eliminated. If nobody has claimed a role, say so in one line.""",
+)
+
+VOTE_TALLY = Node(
+    name="vote_tally",
+    system="You are a {role} in a Werewolf game. Keep track of the votes.",
+    prompt=SITUATION + """Tally the day votes so far: for each round, who voted for whom, and who was eliminated with their revealed role. Then point out voting patterns such as players who always vote together or who avoided voting for revealed wolves. Be brief.""",
+)
+
+ANALYSIS = {
+    "suspicion": "Suspicion scores",
+    "threats": "Threat assessment",
+    "seer_claims": "Role claims",
+    "vote_tally": "Vote tally",
+}
+
+
+def draft_node(deps: Tuple[str, ...]) -> Node:
+    notes = "\n\n".join(f"{ANALYSIS[dep]}:\n{{{dep}}}" for dep in deps)
+    return Node(
+        name="draft",
+        system="You are a {role} in a Werewolf game. Provide your {action_type}.",
+        stage="action",
+        deps=deps,
+        prompt=SITUATION + notes + """
+
+{specific_prompt}
+
+Based on the analysis above, what is your {action_type}? Respond with only the {action_type} and no other sentences/thoughts. If it is a dialogue response, you can provide the full response that adds to the discussions so far. For all other cases a single sentence response is expected, and it must contain the name of the player you choose.""",
+    )
+
+
+CRITIQUE = Node(
+    name="critique",
+    system="You are a {role} in a Werewolf game. Reflect on your proposed action.",
+    stage="reflection",
+    deps=("draft",),
+    prompt=SITUATION + """Your proposed {action_type}:
+{draft}
+
+Criticise the proposed action briefly: Does it align with your role ({role}) and objective? Does it reveal too much about you in a public channel? Does it name a player who is alive if a name is required? How could it better help your team and help you survive?""",
+)
+
+FINAL = Node(
+    name="final",
+    system="You are a {role} in a Werewolf game. Provide your final {action_type}.",
+    stage="final",
+    deps=("draft", "critique"),
+    prompt=SITUATION + """Your proposed {action_type}:
+{draft}
+
+Your critique of it:
+{critique}
+
+What is your absolute final {action_type}? Respond with only the {action_type} and no other sentences/thoughts. If it is a dialogue response, you can provide the full response that adds to the discussions so far. If the moderator asked for a vote, you must name the person you are voting to eliminate even if you are not sure.""",
+)
+
+
+def _pipeline(name: str, analysis: Tuple[str, ...], critique: bool) -> Pipeline:
+    nodes = [{"suspicion": SUSPICION, "threats": THREATS, "seer_claims": SEER_CLAIMS, "vote_tally": VOTE_TALLY}[n] for n in analysis]
+    nodes.append(draft_node(analysis))
+    if critique:
+        nodes += [CRITIQUE, FINAL]
+    return Pipeline(name=name, nodes=tuple(nodes), output="final" if critique else "draft")
+
+
+# (role, action kind) -> pipeline; "*" matches any role. Public answers get a
+# critique pass, private night actions go straight from the draft.
+PIPELINES: Dict[Tuple[str, str], Pipeline] = {
+    ("*", "day_vote"): _pipeline("day_vote", ("suspicion", "seer_claims", "vote_tally"), critique=True),
+    ("*", "discussion"): _pipeline("discussion", ("suspicion", "seer_claims", "vote_tally"), critique=True),
+    ("wolf", "day_vote"): _pipeline("wolf_day_vote", ("threats", "seer_claims", "vote_tally"), critique=True),
+    ("wolf", "discussion"): _pipeline("wolf_discussion", ("threats", "seer_claims", "vote_tally"), critique=True),
+    ("*", "seer_check"): _pipeline("seer_check", ("suspicion", "vote_tally"), critique=False),
+    ("*", "doctor_save"): _pipeline("doctor_save", ("seer_claims", "suspicion"), critique=False),
+    ("*", "wolf_target"): _pipeline("wolf_target", ("threats", "seer_claims"), critique=False),
+}
+
+
+def pipeline_for(role: Optional[str], action_kind: str) -> Pipeline:
+    pipeline = PIPELINES.get((role, action_kind)) or PIPELINES.get(("*", action_kind))
+    if pipeline is None:
+        raise KeyError(f"No DAG pipeline for role {role!r} and action {action_kind!r}")
+    return pipeline
+
+
+class DAGExecutor:
+    """Runs a pipeline, starting every node as soon as its dependencies are done.
+
+    Nodes without a path between them run concurrently, so a decision takes as
+    long as its longest chain of calls rather than the sum of all of them.
+    """
+
+    def __init__(self, llm: LLMClient, token_budget: TokenBudget):
+        self.llm = llm
+        self.token_budget = token_budget
+        self.history: List[Tuple[str, DAGResult]] = []
+
+    async def run(
+        self,
+        pipeline: Pipeline,
+        context: Dict[str, str],
+        sample_output: Optional[Callable[[Callable[[], Awaitable[str]]], Awaitable[str]]] = None,
+    ) -> DAGResult:
+        """sample_output, if given, makes the output node's LLM call, e.g. to sample it several times."""
+        outputs: Dict[str, str] = {}
+        timings: Dict[str, NodeTiming] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        started = time.perf_counter()
+
+        async def run_node(node: Node) -> str:
+            if node.deps:
+                await asyncio.gather(*(tasks[dep] for dep in node.deps))
+            start = time.perf_counter() - started
+            values = {**context, **{dep: outputs[dep] for dep in node.deps}}
+            fixed = node.prompt.replace("{game_situation}", "").format(**values)
+            values["game_situation"] = self.token_budget.fit(node.stage, context["game_situation"], estimate_tokens(fixed))
+            messages = [
+                {"role": "system", "content": node.system.format(**values)},
+                {"role": "user", "content": node.prompt.format(**values)},
+            ]
+            if sample_output is not None and node.name == pipeline.output:
+                response = await sample_output(lambda: self.llm.chat(messages=messages, stage=node.name))
+            else:
+                response = await self.llm.chat(messages=messages, stage=node.name)
+            outputs[node.name] = response.strip("\n ")
+            timings[node.name] = NodeTiming(start, time.perf_counter() - started)
+            logger.info(f"DAG {pipeline.name} [{node.name}] {timings[node.name].duration_s:.2f}s: {outputs[node.name]}")
+            return outputs[node.name]
+
+        for node in pipeline.nodes:
+            tasks[node.name] = asyncio.create_task(run_node(node))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+        result = DAGResult(output=outputs[pipeline.output], outputs=outputs, timings=timings, wall_s=time.perf_counter() - started)
+        self.history.append((pipeline.name, result))
+        logger.info(f"DAG {pipeline.name} took {result.wall_s:.2f}s, {result.sequential_s:.2f}s if run sequentially")
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        """Mean duration per node and mean wall/sequential time per pipeline."""
+        totals: Dict[str, List[float]] = {}
+        for name, result in self.history:
+            totals.setdefault(f"{name}.wall_s", []).append(result.wall_s)
+            totals.setdefault(f"{name}.sequential_s", []).append(result.sequential_s)
+            for node, timing in result.timings.items():
+                totals.setdefault(f"{name}.{node}_s", []).append(timing.duration_s)
+        return {key: sum(values) / len(values) for key, values in totals.items()}
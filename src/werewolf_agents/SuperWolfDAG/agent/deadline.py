@@ -0,0 +1,80 @@
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds the agent allows itself per message type before it must answer. The
+# moderator marks a player unresponsive after its own timeout, keep these below it.
+DEFAULT_DEADLINES = {
+    "default": 60.0,
+    "seer_check": 60.0,
+    "doctor_save": 60.0,
+    "wolf_target": 60.0,
+    "day_vote": 60.0,
+    "discussion": 60.0,
+}
+DEFAULT_CALL_SECONDS = 8.0  # expected LLM call latency until calls have been observed
+LATENCY_SMOOTHING = 0.3  # weight of the newest call in the moving average
+
+
+class Deadline:
+    """Time left to answer one message."""
+
+    def __init__(self, kind: str, seconds: float, budget: "DeadlineBudget"):
+        self.kind = kind
+        self.seconds = seconds
+        self.budget = budget
+        self.started = time.monotonic()
+        self.degraded: List[str] = []
+
+    def remaining(self) -> float:
+        return self.seconds - (time.monotonic() - self.started)
+
+    def allows(self, stage: str, calls: int = 1) -> bool:
+        """Whether `calls` more LLM calls fit before the deadline. A refusal
+        means the caller skips `stage`, and is recorded as a degraded response."""
+        if self.remaining() >= calls * self.budget.call_seconds + self.budget.margin_seconds:
+            return True
+        self.skip(stage)
+        return False
+
+    def skip(self, stage: str):
+        self.degraded.append(stage)
+        self.budget.record_degraded(self, stage)
+
+
+class DeadlineBudget:
+    """Per-message-type deadlines and the metrics of responses cut short by them."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.deadlines = {**DEFAULT_DEADLINES, **(config.get("seconds") or {})}
+        self.margin_seconds = config.get("margin_s", 2.0)
+        self.call_seconds = config.get("call_estimate_s", DEFAULT_CALL_SECONDS)
+        self.metrics = Counter()
+
+    def start(self, kind: str) -> Deadline:
+        self.metrics["responses"] += 1
+        return Deadline(kind, self.deadlines.get(kind, self.deadlines["default"]), self)
+
+    def observe(self, seconds: float):
+        """Feeds an observed LLM call latency into the per-call estimate."""
+        self.call_seconds += LATENCY_SMOOTHING * (seconds - self.call_seconds)
+
+    def record_degraded(self, deadline: Deadline, stage: str):
+        if len(deadline.degraded) == 1:
+            self.metrics["degraded_responses"] += 1
+            self.metrics[f"degraded_{deadline.kind}"] += 1
+        self.metrics[f"skipped_{stage}"] += 1
+        logger.warning(
+            f"Deadline: skipping {stage} for {deadline.kind} with {deadline.remaining():.1f}s of "
+            f"{deadline.seconds:.0f}s left (expected {self.call_seconds:.1f}s per call)"
+        )
+
+    def report(self) -> Dict[str, Any]:
+        report = dict(self.metrics)
+        report["degraded_rate"] = self.metrics["degraded_responses"] / self.metrics["responses"] if self.metrics["responses"] else 0.0
+        report["call_estimate_s"] = self.call_seconds
+        return report
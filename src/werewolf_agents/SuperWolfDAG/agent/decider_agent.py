@@ -1,14 +1,27 @@
 from autogen import ConversableAgent
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from openai import OpenAI
 
 from werewolf_agents.cot_sample.prompts.final_action_prompts import get_initial_action_prompt, get_reflection_prompt
 
+from .llm_cache import LLMCache
+from .llm_client import complete
+from .rate_limiter import RateLimiter
+from .tracing import Tracer
+
 logger = logging.getLogger(__name__)
 
 class DeciderAgent(ConversableAgent):
-    def __init__(self, name: str, role_prompt: str, llm_config: Dict[str, Any]):
+    def __init__(
+        self,
+        name: str,
+        role_prompt: str,
+        llm_config: Dict[str, Any],
+        cache: Optional[LLMCache] = None,
+        tracer: Optional[Tracer] = None,
+        limiter: Optional[RateLimiter] = None,
+    ):
         super().__init__(
             name=name,
             system_message=role_prompt,
@@ -18,8 +31,16 @@ class DeciderAgent(ConversableAgent):
         self.openai_client = OpenAI(
             api_key=llm_config["config_list"][0]["api_key"],
             base_url=llm_config["config_list"][0]["base_url"],
+            max_retries=0,  # retried by complete() so retries show up in the spans
         )
+        if cache is not None:
+            self.openai_client = cache.wrap(self.openai_client)
         self.model = llm_config["config_list"][0]["model"]
+        self.tracer = tracer or Tracer()
+        self.limiter = limiter or RateLimiter()
+
+    def _complete(self, messages, stage: str):
+        return complete(self.openai_client, self.tracer, self.limiter, stage, self.model, messages)
 
     def get_inner_monologue(self, role_prompt: str, game_situation: str, specific_prompt: str) -> str:
         prompt = f"""{role_prompt}
@@ -29,8 +50,8 @@ Current game situation (including your past thoughts and actions):
 
 {specific_prompt}"""
 
-        response = self.openai_client.chat.completions.create(
-            model=self.model,
+        response = self._complete(
+            stage="inner_monologue",
             messages=[
                 {"role": "system", "content": f"You are a {self.name} in a Werewolf game."},
                 {"role": "user", "content": prompt}
@@ -41,8 +62,8 @@ Current game situation (including your past thoughts and actions):
     def get_final_action(self, role_prompt: str, game_situation: str, inner_monologue: str, action_type: str) -> str:
         # Initial action prompt
         prompt = get_initial_action_prompt(role_prompt, game_situation, inner_monologue, action_type)
-        response = self.openai_client.chat.completions.create(
-            model=self.model,
+        response = self._complete(
+            stage="initial_action",
             messages=[
                 {"role": "system", "content": f"You are a {self.name} in a Werewolf game."},
                 {"role": "user", "content": prompt}
@@ -53,8 +74,8 @@ Current game situation (including your past thoughts and actions):
         # Reflection prompt
         reflection_prompt = get_reflection_prompt(role_prompt, game_situation, inner_monologue, initial_action)
 
-        reflection_response = self.openai_client.chat.completions.create(
-            model=self.model,
+        reflection_response = self._complete(
+            stage="reflection",
             messages=[
                 {"role": "system", "content": f"You are a {self.name} in a Werewolf game."},
                 {"role": "user", "content": reflection_prompt}
@@ -79,8 +100,8 @@ Your reflection:
 
 Based on your thoughts, the current situation, and your reflection, what is your absolute final {action_type}? Provide only the final action, ensuring it includes a specific player name if voting or targeting is involved."""
 
-        final_response = self.openai_client.chat.completions.create(
-            model=self.model,
+        final_response = self._complete(
+            stage="final_action",
             messages=[
                 {"role": "system", "content": f"You are a {self.name} in a Werewolf game."},
                 {"role": "user", "content": final_prompt}
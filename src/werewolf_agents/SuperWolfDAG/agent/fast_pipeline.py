@@ -0,0 +1,125 @@
+import json
+import logging
+import re
+from typing import Awaitable, Callable, Optional, Tuple
+
+from .history import estimate_tokens
+from .llm_client import LLMClient
+from .token_budget import TokenBudget
+
+logger = logging.getLogger(__name__)
+
+# Decision kinds that can be routed to a pipeline through config.yaml.
+ACTION_KINDS = ("seer_check", "doctor_save", "wolf_target", "day_vote", "discussion")
+
+# full:          inner monologue -> initial action -> reflection -> final action
+# fast:          thoughts and action in one structured response
+# fast_critique: fast, followed by one critique-and-revise pass
+PIPELINE_MODES = ("full", "fast", "fast_critique")
+
+FAST_ACTION_PROMPT = """{role_prompt}
+
+Current game situation (including past thoughts and actions):
+{game_situation}
+
+{specific_prompt}
+
+Think it through, then decide your {action_type}. If it is a dialogue response, the action can be the full response that adds to the discussion. Otherwise the action is a single sentence, and it must name the player you choose if you are voting, targeting, investigating or protecting someone.
+
+Respond in JSON only, with no text before or after it:
+{{"thoughts": "<your step-by-step reasoning>", "action": "<your {action_type}>"}}"""
+
+CRITIQUE_PROMPT = """{role_prompt}
+
+Current game situation (including past thoughts and actions):
+{game_situation}
+
+Your thoughts:
+{thoughts}
+
+Your proposed {action_type}:
+{action}
+
+Critique the proposed action: does it align with your role and objective, does it reveal too much about you in a public channel, and does it name a valid player if one is required? Then give your final {action_type}, revised if needed.
+
+Respond in JSON only, with no text before or after it:
+{{"critique": "<short critique>", "action": "<your final {action_type}>"}}"""
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def parse_structured_response(text: str) -> Tuple[Optional[str], str]:
+    """Returns (thoughts or critique, action). Falls back to the raw text as the action."""
+    match = _JSON_OBJECT.search(text or "")
+    if match:
+        try:
+            data = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict) and data.get("action"):
+            return data.get("thoughts") or data.get("critique"), str(data["action"]).strip()
+    logger.warning(f"Structured response could not be parsed, using it verbatim: {text!r}")
+    return None, (text or "").strip("\n ")
+
+
+async def run_fast_pipeline(
+    llm: LLMClient,
+    token_budget: TokenBudget,
+    role: str,
+    role_prompt: str,
+    game_situation: str,
+    specific_prompt: str,
+    action_type: str,
+    critique: bool = False,
+    sample_output: Optional[Callable[[Callable[[], Awaitable[str]]], Awaitable[str]]] = None,
+) -> str:
+    """sample_output, if given, makes the call that settles the answer (the
+    critique, else the action), e.g. to sample it several times."""
+    sample = sample_output or (lambda call: call())
+    situation = token_budget.fit("action", game_situation, estimate_tokens(role_prompt + specific_prompt))
+
+    async def act() -> Tuple[Optional[str], str]:
+        response = await llm.chat(
+            stage="fast_action",
+            messages=[
+                {"role": "system", "content": f"You are a {role} in a Werewolf game. Provide your {action_type}."},
+                {"role": "user", "content": FAST_ACTION_PROMPT.format(
+                    role_prompt=role_prompt,
+                    game_situation=situation,
+                    specific_prompt=specific_prompt,
+                    action_type=action_type,
+                )},
+            ]
+        )
+        thoughts, action = parse_structured_response(response)
+        logger.info(f"My thoughts: {thoughts}")
+        logger.info(f"My {action_type}: {action}")
+        return thoughts, action
+
+    if not critique:
+        async def action_only() -> str:
+            return (await act())[1]
+        return await sample(action_only)
+
+    thoughts, action = await act()
+    situation = token_budget.fit("reflection", game_situation, estimate_tokens(role_prompt + (thoughts or "") + action))
+
+    async def revise() -> str:
+        response = await llm.chat(
+            stage="fast_critique",
+            messages=[
+                {"role": "system", "content": f"You are a {role} in a Werewolf game. Review and finalize your {action_type}."},
+                {"role": "user", "content": CRITIQUE_PROMPT.format(
+                    role_prompt=role_prompt,
+                    game_situation=situation,
+                    thoughts=thoughts or "(not given)",
+                    action_type=action_type,
+                    action=action,
+                )},
+            ]
+        )
+        critique_text, revised = parse_structured_response(response)
+        logger.info(f"My critique: {critique_text}")
+        return revised
+
+    return await sample(revise)
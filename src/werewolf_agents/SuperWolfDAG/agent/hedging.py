@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from .rate_limiter import DECISION_ACTIONS
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class Hedger:
+    """Sends a duplicate of a slow request and takes whichever answer comes
+    first. A request counts as slow once it has been out longer than the
+    `percentile` of recent latencies of the same stage; until `min_samples`
+    are known, `initial_delay_s` is used."""
+
+    def __init__(
+        self,
+        actions=DECISION_ACTIONS,
+        percentile: float = 90.0,
+        initial_delay_s: float = 10.0,
+        min_delay_s: float = 1.0,
+        min_samples: int = 5,
+        window: int = 50,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+    ):
+        self.actions = set(actions)
+        self.percentile = percentile
+        self.initial_delay_s = initial_delay_s
+        self.min_delay_s = min_delay_s
+        self.min_samples = min_samples
+        self.base_url = base_url  # secondary endpoint for duplicates, the primary one if None
+        self.model = model
+        self.latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self.stats = Counter()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional["Hedger"]:
+        config = config or {}
+        if not config.get("enabled", False):
+            return None
+        return cls(
+            actions=config.get("actions", DECISION_ACTIONS),
+            percentile=config.get("percentile", 90.0),
+            initial_delay_s=config.get("initial_delay_s", 10.0),
+            min_delay_s=config.get("min_delay_s", 1.0),
+            min_samples=config.get("min_samples", 5),
+            window=config.get("window", 50),
+            base_url=config.get("base_url"),
+            model=config.get("model"),
+        )
+
+    def applies(self, action_type: Optional[str]) -> bool:
+        return action_type in self.actions
+
+    def delay(self, stage: str) -> float:
+        """How long the first request gets before the duplicate is sent."""
+        recent = self.latencies[stage]
+        if len(recent) < self.min_samples:
+            return self.initial_delay_s
+        return max(self.min_delay_s, percentile(recent, self.percentile))
+
+    async def run(
+        self,
+        stage: str,
+        primary: Callable[[], Awaitable[Any]],
+        duplicate: Callable[[], Awaitable[Any]],
+        request_tokens: int,
+    ) -> Tuple[Any, Optional[str]]:
+        """Returns the first successful result and which request gave it,
+        "primary" or "duplicate", or None when no duplicate was sent."""
+        started = {asyncio.ensure_future(primary()): time.perf_counter()}
+        tasks = {task: "primary" for task in started}
+        self.stats["calls"] += 1
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.delay(stage))
+            if not done:
+                self.stats["hedged"] += 1
+                # estimated, the duplicate's prompt is paid for whichever request wins
+                self.stats["extra_tokens"] += request_tokens
+                logger.info(f"Hedging {stage}, no answer after {self.delay(stage):.2f}s")
+                task = asyncio.ensure_future(duplicate())
+                started[task] = time.perf_counter()
+                tasks[task] = "duplicate"
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        # the round trip of the answering request, so hedged calls do not skew the trigger
+                        self.latencies[stage].append(time.perf_counter() - started[task])
+                        if len(tasks) == 1:
+                            return task.result(), None
+                        self.stats[f"{tasks[task]}_wins"] += 1
+                        return task.result(), tasks[task]
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def report(self) -> Dict[str, float]:
+        report = dict(self.stats)
+        report["hedge_rate"] = self.stats["hedged"] / self.stats["calls"] if self.stats["calls"] else 0.0
+        return report
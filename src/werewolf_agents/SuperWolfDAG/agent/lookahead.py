@@ -0,0 +1,163 @@
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .role_beliefs import ROLES, RoleBeliefs
+
+logger = logging.getLogger(__name__)
+
+WOLF, SEER, DOCTOR = ROLES.index("wolf"), ROLES.index("seer"), ROLES.index("doctor")
+LOOKAHEAD_ACTIONS = ("wolf_target", "day_vote")
+
+# Policy models of the other players.
+# Relative chance of being voted out during the day, by role: the village
+# finds wolves somewhat more often than chance, more so while the seer lives.
+DAY_WEIGHTS = np.array([1.0, 2.0, 1.0, 1.0])
+SEER_ALIVE_WOLF_FACTOR = 1.5
+# At night the wolves kill an alive non-wolf and the doctor protects an alive
+# player, both uniformly at random.
+
+
+def _choose(eligible: np.ndarray, rng: np.random.Generator, weights: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """One pick per row among its eligible columns, uniform or weighted
+    (exponential race), and whether the row had any eligible column at all."""
+    keys = rng.random(eligible.shape) if weights is None else weights / rng.exponential(size=eligible.shape)
+    return np.where(eligible, keys, -1.0).argmax(axis=1), eligible.any(axis=1)
+
+
+class Lookahead:
+    """Monte-Carlo estimate of how an elimination now changes the chance to win.
+
+    Role assignments are sampled from RoleBeliefs and the rest of the game is
+    played out for every rollout at once, night kill and doctor save, then
+    day vote, until one side has won. The other players follow the simple
+    policies above, so the estimate ranks targets rather than predicting the
+    game.
+    """
+
+    def __init__(self, beliefs: RoleBeliefs, rollouts: int = 20000, shortlist: int = 3, fast: bool = False, seed: Optional[int] = None):
+        self.beliefs = beliefs
+        self.rollouts = rollouts
+        self.shortlist_size = shortlist
+        self.fast = fast
+        self.rng = np.random.default_rng(seed)
+        self._cache: Dict[Tuple[int, str], List[Tuple[str, float]]] = {}
+        self.stats = Counter()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], beliefs: Optional[RoleBeliefs]) -> Optional["Lookahead"]:
+        """None unless enabled; needs the role beliefs to sample from."""
+        config = config or {}
+        if not config.get("enabled", False) or beliefs is None:
+            return None
+        return cls(
+            beliefs,
+            rollouts=config.get("rollouts", 20000),
+            shortlist=config.get("shortlist", 3),
+            fast=config.get("fast", False),
+            seed=config.get("seed"),
+        )
+
+    def rank(self, action_kind: str) -> List[Tuple[str, float]]:
+        """(player, chance that the agent's side wins if the player is eliminated
+        now) for every candidate, best first. Empty when there is nothing to rank."""
+        if action_kind not in LOOKAHEAD_ACTIONS:
+            return []
+        marginals = self.beliefs.marginals()  # also brings the beliefs up to date
+        key = (self.beliefs.tracker.revision, action_kind)
+        if key in self._cache:
+            return self._cache[key]
+        tracker, names = self.beliefs.tracker, self.beliefs.names
+        if not len(self.beliefs.roles) or tracker.player_name not in names:
+            return []
+        me = names.index(tracker.player_name)
+        alive = np.array([tracker.players[name].alive for name in names])
+        candidates = [i for i in np.flatnonzero(alive) if i != me]
+        if action_kind == "wolf_target":
+            candidates = [i for i in candidates if marginals[i, WOLF] < 0.5]
+        if len(candidates) < 2:
+            return []
+        start = time.perf_counter()
+        # the rollouts are shared out between the candidates and played out together
+        per_candidate = max(1, self.rollouts // len(candidates))
+        log_prob = self.beliefs.log_prob
+        if not np.isfinite(log_prob).any():
+            # the beliefs ruled out every assignment, there is nothing to sample from
+            return []
+        prob = np.exp(log_prob - log_prob.max())
+        sampled = self.rng.choice(len(prob), size=per_candidate * len(candidates), p=prob / prob.sum())
+        targets = np.repeat(candidates, per_candidate)
+        wolves_win = self._play_out(self.beliefs.roles[sampled], alive, targets, night=action_kind == "wolf_target")
+        wins = wolves_win.reshape(len(candidates), per_candidate).mean(axis=1)
+        if marginals[me, WOLF] < 0.5:
+            wins = 1.0 - wins
+        ranking = sorted(zip((names[i] for i in candidates), wins.tolist()), key=lambda entry: -entry[1])
+        self.stats["rankings"] += 1
+        logger.info(
+            f"Lookahead for {action_kind}: {len(candidates)} targets x {per_candidate} rollouts "
+            f"in {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+        self._cache = {key: ranking}
+        return ranking
+
+    def _play_out(self, roles: np.ndarray, alive: np.ndarray, targets: np.ndarray, night: bool) -> np.ndarray:
+        """Whether the wolves win each rollout, with its target eliminated first,
+        by the wolves' kill if `night` (unless the doctor saves them) else by the day vote."""
+        rollouts, players = roles.shape
+        rows = np.arange(rollouts)
+        alive = np.repeat(alive[None, :], rollouts, axis=0)
+        wolf, doctor = roles == WOLF, roles == DOCTOR
+        seer = roles == SEER
+        outcome = np.full(rollouts, -1)  # 1 wolves won, 0 village won, -1 still playing
+        forced = True
+        for _ in range(2 * players):
+            if night:
+                if forced:
+                    kill, has_victim = targets, ~wolf[rows, targets]
+                else:
+                    kill, has_victim = _choose(alive & ~wolf, self.rng)
+                save, has_doctor = _choose(alive, self.rng)
+                saved = has_doctor & (alive & doctor).any(axis=1) & (save == kill)
+                dies = has_victim & ~saved
+                alive[rows[dies], kill[dies]] = False
+            else:
+                if forced:
+                    voted_out, any_alive = targets, alive[rows, targets]
+                else:
+                    seer_alive = (alive & seer).any(axis=1)
+                    weights = DAY_WEIGHTS[roles] * np.where(seer_alive[:, None] & wolf, SEER_ALIVE_WOLF_FACTOR, 1.0)
+                    voted_out, any_alive = _choose(alive, self.rng, weights)
+                alive[rows[any_alive], voted_out[any_alive]] = False
+            forced, night = False, not night
+            wolves = (alive & wolf).sum(axis=1)
+            others = alive.sum(axis=1) - wolves
+            playing = outcome < 0
+            outcome[playing & (wolves == 0)] = 0
+            outcome[playing & (wolves > 0) & (wolves >= others)] = 1
+            if (outcome >= 0).all():
+                break
+        return outcome == 1
+
+    def shortlist(self, action_kind: str) -> str:
+        """The best few targets for the decision prompt, empty when there is no ranking."""
+        ranking = self.rank(action_kind)[:self.shortlist_size]
+        if not ranking:
+            return ""
+        targets = ", ".join(f"{name} {chance:.2f}" for name, chance in ranking)
+        return f"Simulated games, chance my side wins if this player is eliminated now: {targets}"
+
+    def best(self, action_kind: str) -> Optional[str]:
+        """The top-ranked target in fast mode, None to leave the choice to the LLM."""
+        if not self.fast:
+            return None
+        ranking = self.rank(action_kind)
+        if not ranking:
+            return None
+        self.stats[f"fast_{action_kind}"] += 1
+        return ranking[0][0]
+
+    def report(self) -> Dict[str, int]:
+        return dict(self.stats)
@@ -0,0 +1,188 @@
+# Moderator messages sent to players, copied verbatim from
+# z-moderator-prompts/templates so the agent wheel does not depend on the
+# moderator's template directory at runtime. Keep in sync when the templates change.
+
+INTRODUCTION = "introduction"
+ROLE_SETTING = "role_setting"
+NIGHT_START = "night_start"
+WOLF_NIGHT = "wolf_night"
+WOLF_VOTE = "wolf_vote"
+WOLF_VOTE_RETRY = "wolf_vote_retry"
+SEER_GUESS = "seer_guess"
+SEER_GUESS_RETRY = "seer_guess_retry"
+SEER_RESULT = "seer_result"
+DOCTOR_SAVE = "doctor_save"
+DOCTOR_SAVE_RETRY = "doctor_save_retry"
+DAY_START = "day_start"
+DISCUSSION = "discussion"
+DAY_VOTE = "day_vote"
+DAY_VOTE_RETRY = "day_vote_retry"
+DAY_CONSENSUS = "day_consensus"
+DAY_END = "day_end"
+
+TEMPLATES = {
+    # introduction.txt
+    INTRODUCTION: """Introduction:
+
+Hello players, welcome to the Werewolf game hosted by Sentient! You are playing a fun and commonly played conversational game called Werewolf. 
+
+I am your moderator, my name is "{{ moderator_name }}". 
+
+You are now part of a game communication group called '{{ game_room }}', where all players can interact. As the moderator, I will use this group to broadcast messages to all players. All players can see messages in this group. 
+
+
+
+Here are the general instructions of this game: 
+
+Game Instructions:
+
+1. Roles:
+   At the start of each game you will be asigned one of the following roles:
+   - Villagers : The majority of players. Their goal is to identify and eliminate the werewolves.
+   - Werewolves : A small group of players who aim to eliminate the villagers.
+   - Seer  :  A "special villager" who can learn the true identity of one player each night with help of moderator.
+   - Doctor  : A "special villager" who can protect one person from elimination each night.
+
+2. Gameplay:
+   The game alternates between night and day phases. 
+
+   Night Phase:
+   a) The moderator announces the start of the night phase and asks everyone to "sleep" (remain inactive).
+   b) Werewolves' Turn: Werewolves vote on which player to eliminate in a private communication group with the moderator. 
+   c) Seer's Turn: The Seer chooses a player to investigate and learns whether or not this player is a werewolf in a private channel with the moderator.
+   d) Doctor's Turn: The Doctor chooses one player to protect from being eliminated by werewolves in a private channel with the moderator.
+
+   Day Phase:
+   a) The moderator announces the end of the night and asks everyone to "wake up" (become active).
+   b) The moderator reveals if anyone was eliminated during the night.
+   c) Players discuss and debate who they suspect to be werewolves.
+   d) Players vote on who to eliminate. The player with the most votes is eliminated and their role is revealed.
+
+3. Winning the Game:
+   - Villagers win if they eliminate all werewolves.
+   - Werewolves win if they equal or outnumber the villagers.
+
+4. Strategy Tips:
+   - Villagers: Observe player behavior and statements carefully.
+   - Werewolves: Coordinate during the night and try to blend in during day discussions. 
+   - Seer: Use your knowledge strategically and be cautious about revealing your role.
+   - Doctor: Protect players wisely and consider keeping your role secret.
+
+5. Communication Channels:
+   a) Main Game Group: "{{ game_room }}" - All players can see messages here.
+   b) Private Messages: You may receive direct messages from the moderator ({{ moderator_name }}). These are private messages that only you have access to. 
+   c) Werewolf Group: If you're a werewolf, you'll have access to a private group  wolf's-den for night discussions.
+
+Here is the list of your fellow player in the game. - {{players}}
+
+Remember to engage actively, think strategically, and enjoy the game!
+""",
+    # set_role.txt
+    ROLE_SETTING: """Role setting: 
+Hello {{player}} you are now playing the game werewolf with the role -> '{{role}}' in the game. Please keep this information discreet.""",
+    # night_start.txt
+    NIGHT_START: """ Night Start: 
+ Hello players night has started. Please go to sleep.
+
+""",
+    # wolf_night_introduction.txt
+    WOLF_NIGHT: """Wolf night: 
+{% if is_first_night %}
+Hello wolfs I have created this new private group between wolfs called "wolfs-group" . 
+
+I will use this group to ask you to vote a player to eliminate every night
+
+{%else%}
+
+Hello wolfs another day has passed and night has started. Lets start the process of voting to eliminate a player.
+
+{% endif %}
+
+Here are the alive villager players for this night ->  {{players}}
+
+
+""",
+    # wolf_vote.txt
+    WOLF_VOTE: """Wolf vote:
+Hello wolf {{ delegate_player }} please vote a player to eliminate. 
+""",
+    # wolf_vote_local_retry.txt
+    WOLF_VOTE_RETRY: """Wolf vote retry:
+hello {{ delegatte_player }} I was not able to unerstand which vilager you tried to eliminate. please vote again 
+You have to select one player. if today is first day , take random guess but please vote to eliminate one player. 
+
+here are the alive players for this night ->  {{ alive_players }} , anwser the choice in few words.
+""",
+    # seer_guess.txt
+    SEER_GUESS: """Seer guess: 
+Hello seer {{ player }}, please guess which fellow player in the game is a wolf.here is the list of alive players ->  {{ alive_players }} . Just take a wild guess and pick a player if you can't reason for now. """,
+    # seer_guess_local_retry.txt
+    SEER_GUESS_RETRY: """Seer guess retry:
+Hello Seer, I was not able to understand whom you guessed to be a wolf. 
+
+You need to guess one player as the wolf. Even if it's the first day or you don't have enough information yet, please make a random guess. 
+
+Please guess again. Here are the alive players for this night -> {{ alive_players }}
+
+Respond with your guess in a few words.""",
+    # seer_guess_result.txt
+    SEER_RESULT: """Seer guess result:
+{% if is_wolf %}
+    Nice! : {{player}} you guessed it right player -> '{{selected_player}}' is a wolf.
+{% else %}
+    Hmm! '{{player}}' you are off the mark by bit. player -> '{{selected_player}}' is not a wolf.
+{% endif %}
+""",
+    # doctor_save.txt
+    DOCTOR_SAVE: """Doctor save: 
+Hello Doctor {{ player }} please wake up and select one player to protect from being eliminated by werewolves in the night. here are the list of alive player for to night -> [ {{ alive_players }} ]
+
+""",
+    # doctor_save_local_retry.txt
+    DOCTOR_SAVE_RETRY: """Doctor save retry: 
+Hello {{ player }} I was not able to understand who you choose to save. Please tell me which player you would like to try to save. 
+Here are the players who are still alive this night :  {{  alive_players }}
+""",
+    # day_start.txt
+    DAY_START: """Day start:
+
+Hello players, Good Morning. Please wake up.
+
+{% if eliminated_villager == "" %}
+    Every one from yesterday has made it to today.  looks like the doctor has saved a player from elimination.
+{% else %}
+    villager dead : Alas!,A villager player has been eliminated by the wolves. his name is -> '{{eliminated_villager}}'
+
+   {% if is_game_ended  %}
+       The Game has ended because {{ game_end_reason }}     
+   {% else %}
+       Let me ask one by one about who are the wolfs among overselves. 
+   {% endif %}  
+{% endif %}
+
+""",
+    # day_discussion_initiation.txt
+    DISCUSSION: """
+Discussion:
+Hey {{delegate_player}}, who do you think is or is not a 'wolf' in the group and what is your reason? 
+""",
+    # day_wolf_elimination_vote_casting.txt
+    DAY_VOTE: """Day vote:
+
+Hello {{ delegate_player }}, please cast your final vote on who you think the wolf is. "Please respond in few words".""",
+    # day_wolf_elimination_vote_local_retry.txt
+    DAY_VOTE_RETRY: """Day vote retry:
+Hello {{ delegatte_player }} I was not able to understand who you are choosing to vote out of the game. Could you please vote again? Remember to respond with only one player's name who you wish to vote for elimination.
+here are the players who are still alive in game today ->  {{ alive_players }}""",
+    # wolf_elimination_consens.txt
+    DAY_CONSENSUS: """Day consensus:
+Okay lets come to a consensus and lets vote on the elimination of a wolf.
+""",
+    # day_end_message.txt
+    DAY_END: """Day End:
+day elimination : Player -> '{{eliminated_player}}' was eliminated by the vote today. Their role was -> '{{eliminated_player_role}}'.
+{% if is_game_ended %}
+    The game has ended.
+    Reason: {{ game_end_reason }}
+{% endif %}""",
+}
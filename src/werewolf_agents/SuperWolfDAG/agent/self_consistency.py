@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .vote_output import extract_player
+
+logger = logging.getLogger(__name__)
+
+# Decisions that name exactly one player and can be settled by a vote among samples.
+CONSENSUS_ACTIONS = ("day_vote", "wolf_target", "seer_check", "doctor_save")
+
+@dataclass
+class Consensus:
+    action: str
+    player: Optional[str]
+    votes: int
+    completed: int  # samples that finished before the decision was made
+    majority: bool
+    seconds: float
+    first_sample_seconds: float
+
+    @property
+    def agreement(self) -> float:
+        return self.votes / self.completed if self.completed else 0.0
+
+
+class SelfConsistency:
+    """Samples an action several times in parallel and returns as soon as a
+    majority of the samples name the same player.
+
+    Without a majority once every sample is in, the most named player wins
+    (ties go to the player named by the earliest sample).
+    """
+
+    def __init__(self, samples: int = 5, early_exit: bool = True):
+        self.samples = samples
+        # without early exit every sample is awaited and the result does not
+        # depend on the order the samples finish in (needed for replayed runs)
+        self.early_exit = early_exit
+        self.decisions: Dict[str, List[Consensus]] = {}
+
+    async def decide(self, action_kind: str, sample: Callable[[], Awaitable[str]], candidates: Sequence[str]) -> Consensus:
+        started = time.perf_counter()
+        needed = self.samples // 2 + 1
+
+        async def numbered(index: int):
+            return index, await sample()
+
+        tasks = [asyncio.create_task(numbered(index)) for index in range(self.samples)]
+        votes = Counter()
+        answers: Dict[str, Tuple[int, str]] = {}  # player -> (sample index, answer)
+        responses: Dict[int, str] = {}
+        first_sample_seconds = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    index, response = await next_done
+                except Exception as e:
+                    logger.warning(f"Self-consistency sample for {action_kind} failed: {e}")
+                    continue
+                if first_sample_seconds is None:
+                    first_sample_seconds = time.perf_counter() - started
+                responses[index] = response
+                player = extract_player(response, candidates)
+                if player is None:
+                    continue
+                votes[player] += 1
+                answers[player] = min(answers.get(player, (index, response)), (index, response))
+                if self.early_exit and votes[player] >= needed:
+                    return self._record(action_kind, Consensus(
+                        answers[player][1], player, votes[player], len(responses), True,
+                        time.perf_counter() - started, first_sample_seconds,
+                    ))
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if not responses:
+            raise RuntimeError(f"Every self-consistency sample for {action_kind} failed")
+        if votes:
+            # most votes, ties go to the player named by the earliest sample
+            player = max(votes, key=lambda name: (votes[name], -answers[name][0]))
+            count, action = votes[player], answers[player][1]
+        else:
+            player, count, action = None, 0, responses[min(responses)]
+        return self._record(action_kind, Consensus(
+            action, player, count, len(responses), count >= needed,
+            time.perf_counter() - started, first_sample_seconds,
+        ))
+
+    def _record(self, action_kind: str, consensus: Consensus) -> Consensus:
+        self.decisions.setdefault(action_kind, []).append(consensus)
+        logger.info(
+            f"Self-consistency {action_kind}: {consensus.player} with {consensus.votes}/{consensus.completed} samples "
+            f"({'majority' if consensus.majority else 'plurality'}) after {consensus.seconds:.2f}s, "
+            f"first sample after {consensus.first_sample_seconds:.2f}s"
+        )
+        return consensus
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Agreement rate and time-to-majority per action kind."""
+        report = {}
+        for action_kind, decisions in self.decisions.items():
+            majorities = [d for d in decisions if d.majority]
+            report[action_kind] = {
+                "decisions": len(decisions),
+                "majority_rate": len(majorities) / len(decisions),
+                "agreement_rate": sum(d.agreement for d in decisions) / len(decisions),
+                "time_to_majority_s": sum(d.seconds for d in majorities) / len(majorities) if majorities else 0.0,
+                "first_sample_s": sum(d.first_sample_seconds for d in decisions) / len(decisions),
+            }
+        return report
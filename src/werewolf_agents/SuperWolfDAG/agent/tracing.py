@@ -0,0 +1,235 @@
+import asyncio
+import atexit
+import contextvars
+import json
+import logging
+import os
+import secrets
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Attributes of the response being worked on (trace id, action type, phase,
+# deadline). Tasks started while answering, such as self-consistency samples or
+# DAG nodes, inherit them.
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("llm_trace_context", default={})
+
+SERVICE_NAME = "werewolf-agent"
+FLUSH_EVERY = 64  # spans buffered before they are written without waiting for the next phase
+
+
+def new_id(n_bytes: int) -> str:
+    return secrets.token_hex(n_bytes)
+
+
+@dataclass
+class Span:
+    """One LLM call."""
+
+    stage: str
+    trace_id: str
+    span_id: str
+    model: str
+    action_type: Optional[str]
+    phase: Optional[str]  # e.g. "night 1"
+    start: float  # unix seconds
+    end: float = 0.0
+    queue_wait_s: float = 0.0  # time spent before the request that answered was sent, e.g. retry backoff
+    network_s: float = 0.0  # round trip of the request that answered
+    retries: int = 0
+    hedge: Optional[str] = None  # request that answered when a duplicate was sent, "primary" or "duplicate"
+    early_stop: bool = False  # streamed and cut short once the answer was complete
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    deadline_remaining_s: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+
+    @property
+    def duration_s(self) -> float:
+        return self.end - self.start
+
+
+class Tracer:
+    """Records a span per LLM call, keeps per-stage totals and optionally
+    appends every span to a JSONL file and/or an OTLP/JSON file (one
+    ExportTraceServiceRequest per line, as the OpenTelemetry collector's file
+    exporter writes them).
+
+    Spans are buffered and written off the event loop: flush() hands them to a
+    writer thread, the agent calls it when a phase starts, and whatever is left
+    is written when the process exits.
+    """
+
+    def __init__(self, path: Optional[str] = None, otlp_path: Optional[str] = None, player_name: str = ""):
+        self.path = path
+        self.otlp_path = otlp_path
+        self.player_name = player_name
+        self.stages: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._buffer: Dict[str, List[str]] = defaultdict(list)  # path -> lines not written yet
+        self._writer: Optional[ThreadPoolExecutor] = None
+        for file_path in (path, otlp_path):
+            directory = os.path.dirname(file_path or "")
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        if path or otlp_path:
+            # one thread, so the batches land in order
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-spans")
+            atexit.register(self.close)
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], player_name: str) -> "Tracer":
+        """LLM_TRACE_PATH and LLM_TRACE_OTLP_PATH in the environment override config.yaml.
+        Paths may contain {name}, the player's name."""
+        config = config or {}
+        if not config.get("enabled", True):
+            return cls(player_name=player_name)
+        path = os.getenv("LLM_TRACE_PATH", config.get("path"))
+        otlp_path = os.getenv("LLM_TRACE_OTLP_PATH", config.get("otlp_path"))
+        return cls(
+            path.format(name=player_name) if path else None,
+            otlp_path.format(name=player_name) if otlp_path else None,
+            player_name,
+        )
+
+    @contextmanager
+    def trace(self, **attributes):
+        """Groups the LLM calls made while answering one message under one trace id."""
+        token = _context.set({**_context.get(), "trace_id": new_id(16), **attributes})
+        try:
+            yield
+        finally:
+            _context.reset(token)
+
+    def context(self) -> Dict[str, Any]:
+        """Attributes bound by the innermost trace()."""
+        return _context.get()
+
+    def start(self, stage: str, model: str) -> Span:
+        context = _context.get()
+        return Span(
+            stage=stage,
+            trace_id=context.get("trace_id") or new_id(16),
+            span_id=new_id(8),
+            model=model,
+            action_type=context.get("action_type"),
+            phase=context.get("phase"),
+            start=time.time(),
+        )
+
+    def finish(self, span: Span, response=None, error: Optional[BaseException] = None):
+        span.end = time.time()
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            span.prompt_tokens = usage.prompt_tokens
+            span.completion_tokens = usage.completion_tokens
+        if isinstance(error, asyncio.CancelledError):
+            # e.g. a self-consistency sample that was no longer needed
+            span.status = "cancelled"
+        elif error is not None:
+            span.status = "error"
+            span.error = f"{type(error).__name__}: {error}"
+        deadline = _context.get().get("deadline")
+        if deadline is not None:
+            span.deadline_remaining_s = deadline.remaining()
+
+        totals = self.stages[span.stage]
+        totals["calls"] += 1
+        totals["seconds"] += span.duration_s
+        totals["max_s"] = max(totals["max_s"], span.duration_s)
+        totals["queue_wait_s"] += span.queue_wait_s
+        totals["retries"] += span.retries
+        totals["hedged"] += span.hedge is not None
+        totals["early_stops"] += span.early_stop
+        totals["errors"] += span.status == "error"
+        totals["prompt_tokens"] += span.prompt_tokens or 0
+        totals["completion_tokens"] += span.completion_tokens or 0
+        self._export(span)
+
+    def _export(self, span: Span):
+        if self._writer is None:
+            return
+        if self.path:
+            self._buffer[self.path].append(json.dumps({**asdict(span), "player": self.player_name, "duration_s": span.duration_s}) + "\n")
+        if self.otlp_path:
+            self._buffer[self.otlp_path].append(json.dumps(self._otlp(span)) + "\n")
+        if len(self._buffer[self.path or self.otlp_path]) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered spans in the writer thread."""
+        if self._buffer and self._writer is not None:
+            buffer, self._buffer = self._buffer, defaultdict(list)
+            self._writer.submit(self._write, buffer)
+
+    def close(self):
+        """Waits for the writer and writes what is still buffered."""
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+        buffer, self._buffer = self._buffer, defaultdict(list)
+        self._write(buffer)
+
+    def _write(self, buffer: Dict[str, List[str]]):
+        for path, lines in buffer.items():
+            try:
+                with open(path, "a") as f:
+                    f.writelines(lines)
+            except OSError as e:
+                logger.warning(f"Could not export {len(lines)} LLM spans: {e}")
+
+    def _otlp(self, span: Span) -> Dict[str, Any]:
+        def attribute(key, value):
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        attributes = {
+            "gen_ai.request.model": span.model,
+            "gen_ai.usage.input_tokens": span.prompt_tokens,
+            "gen_ai.usage.output_tokens": span.completion_tokens,
+            "werewolf.stage": span.stage,
+            "werewolf.action_type": span.action_type,
+            "werewolf.phase": span.phase,
+            "llm.queue_wait_s": span.queue_wait_s,
+            "llm.network_s": span.network_s,
+            "llm.retries": span.retries,
+            "llm.hedge": span.hedge,
+            "llm.early_stop": span.early_stop,
+            "llm.deadline_remaining_s": span.deadline_remaining_s,
+        }
+        return {"resourceSpans": [{
+            "resource": {"attributes": [
+                attribute("service.name", SERVICE_NAME),
+                attribute("werewolf.player", self.player_name),
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    "name": span.stage,
+                    "kind": 3,  # SPAN_KIND_CLIENT
+                    "startTimeUnixNano": str(int(span.start * 1e9)),
+                    "endTimeUnixNano": str(int(span.end * 1e9)),
+                    "attributes": [attribute(k, v) for k, v in attributes.items() if v is not None],
+                    # STATUS_CODE_OK, STATUS_CODE_ERROR, or unset for cancelled calls
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1 if span.status == "ok" else 0},
+                }],
+            }],
+        }]}
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Calls, mean and max seconds, queue wait, retries, hedges, early stops, errors and tokens per stage."""
+        report = {}
+        for stage, totals in self.stages.items():
+            report[stage] = {**totals, "mean_s": totals["seconds"] / totals["calls"]}
+        return report
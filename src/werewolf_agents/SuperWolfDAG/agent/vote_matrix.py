@@ -0,0 +1,114 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .game_tracker import WOLF, GameTracker
+
+# Suspicion features per player, each computed from the day votes:
+#   wolf_affinity       share of the player's votes cast for the same target as a known wolf
+#   votes_for_villagers share of the player's votes against players known not to be wolves
+#   votes_for_wolves    share of the player's votes against known wolves
+#   bandwagon           how late the player joined the leading target of a round, 0 first to 1 last
+#   targeted_by_wolves  votes known wolves cast against the player, per round
+FEATURES = ("wolf_affinity", "votes_for_villagers", "votes_for_wolves", "bandwagon", "targeted_by_wolves")
+# Weight of each feature in the suspicion score, positive for wolf-like behaviour:
+# wolves rarely vote each other out and whoever wanted a wolf out is most likely not one.
+WEIGHTS = (1.0, 1.0, -1.0, 0.5, -0.5)
+
+_LABELS = {
+    "wolf_affinity": "voted with wolves",
+    "votes_for_villagers": "voted against villagers",
+    "votes_for_wolves": "voted against wolves",
+    "bandwagon": "late bandwagon",
+    "targeted_by_wolves": "targeted by wolves",
+}
+
+
+class VoteMatrix:
+    """The tracked day votes as a voter x target x round array, scored for suspicion.
+
+    Rebuilt from the GameTracker only when the tracker changed; the features
+    are a few array operations over at most a handful of players and rounds.
+    """
+
+    def __init__(self, tracker: GameTracker, weights: Sequence[float] = WEIGHTS):
+        self.tracker = tracker
+        self.weights = np.asarray(weights, dtype=float)
+        self.names: List[str] = []
+        self.votes = np.zeros((0, 0, 0))
+        self.order = np.zeros((0, 0))  # voter x round: position among the round's votes, 0 to 1
+        self.wolf = np.zeros(0)  # players known to be wolves
+        self.cleared = np.zeros(0)  # players known not to be wolves
+        self._revision = -1
+        self._features: Optional[np.ndarray] = None
+
+    def _build(self):
+        if self._revision == self.tracker.revision:
+            return
+        self._revision = self.tracker.revision
+        self.names = list(self.tracker.players)
+        index = {name: i for i, name in enumerate(self.names)}
+        rounds = [votes for _, votes in sorted(self.tracker.day_votes.items()) if votes]
+        self.votes = np.zeros((len(self.names), len(self.names), len(rounds)))
+        self.order = np.zeros((len(self.names), len(rounds)))
+        for k, votes in enumerate(rounds):
+            for position, (voter, target) in enumerate(votes.items()):
+                if voter in index and target in index:
+                    self.votes[index[voter], index[target], k] = 1.0
+                    self.order[index[voter], k] = position / max(1, len(votes) - 1)
+        roles = [player.role for player in self.tracker.players.values()]
+        self.wolf = np.array([role == WOLF for role in roles], dtype=float)
+        self.cleared = np.array([role not in (None, WOLF) for role in roles], dtype=float)
+        self._features = None
+
+    def features(self) -> np.ndarray:
+        """players x FEATURES, in the order of `names`."""
+        self._build()
+        if self._features is not None:
+            return self._features
+        if not self.names:
+            return np.zeros((0, len(FEATURES)))
+        votes, rounds = self.votes, self.votes.shape[2]
+        by_target = votes.sum(axis=2)  # voter x target over all rounds
+        cast = np.maximum(by_target.sum(axis=1), 1.0)
+        # co-voting: how often two players named the same target in the same round
+        covotes = np.einsum("atr,btr->ab", votes, votes)
+        np.fill_diagonal(covotes, 0.0)
+        leading = votes.sum(axis=0).argmax(axis=0)  # each round's most voted target
+        joined = votes[:, leading, np.arange(rounds)]  # voter x round, voted for the leading target
+        features = np.stack([
+            covotes @ self.wolf / cast,
+            by_target @ self.cleared / cast,
+            by_target @ self.wolf / cast,
+            (joined * self.order).sum(axis=1) / np.maximum(joined.sum(axis=1), 1.0),
+            self.wolf @ by_target / max(rounds, 1),
+        ], axis=1)
+        self._features = features
+        return features
+
+    def scores(self) -> np.ndarray:
+        """Suspicion per player, higher is more wolf-like."""
+        return self.features() @ self.weights
+
+    def ranking(self, exclude: Sequence[str] = ()) -> List[Tuple[str, float, Dict[str, float]]]:
+        """(name, score, features) of the alive players whose role is unknown,
+        most suspicious first."""
+        features, scores = self.features(), self.scores()
+        players = self.tracker.players
+        ranked = [
+            (name, float(scores[i]), dict(zip(FEATURES, features[i].tolist())))
+            for i, name in enumerate(self.names)
+            if players[name].alive and players[name].role is None and name not in exclude
+        ]
+        return sorted(ranked, key=lambda entry: -entry[1])
+
+    def table(self, exclude: Sequence[str] = ()) -> str:
+        """The ranking in a few lines, empty before the first day vote."""
+        ranking = self.ranking(exclude)
+        if not self.votes.any() or not ranking:
+            return ""
+        lines = ["Suspicion from the day votes (higher is more wolf-like):"]
+        for name, score, features in ranking:
+            reasons = ", ".join(f"{_LABELS[feature]} {value:.1f}" for feature, value in features.items() if value)
+            lines.append(f"{name} {score:+.2f}" + (f" ({reasons})" if reasons else ""))
+        return "\n".join(lines)
@@ -17,14 +17,15 @@ from sentient_campaign.agents.v1.message import (
     ActivityMessageHeader,
     MessageChannelType,
 )
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    retry_if_exception_type,
-    wait_exponential,
-)
 import random
 
+from .rate_limiter import RateLimiter, backoff_delay, retry_after
+from .vote_output import VoteOutput
+
+MODERATOR_NAME = "moderator"
+MAX_RETRIES = 3
+COMPLETION_TOKENS_ESTIMATE = 300
+
 # Configure logging
 logger = logging.getLogger("demo_agent")
 level = logging.DEBUG
@@ -108,6 +109,8 @@ class WerewolfAgent(IReactiveAgent):
         )
         self.listener_pipe = asyncio.Queue()
         self.game_agent = SentientAgent(listener_pipe=self.listener_pipe)
+        self.rate_limiter = RateLimiter.from_config((config or {}).get("rate_limit"))
+        self.vote_output = VoteOutput(name)
         logger.info(
             f"WarewolfAgent initialized with name: {name}, description: {description}, and config: {config}"
         )
@@ -132,6 +135,8 @@ class WerewolfAgent(IReactiveAgent):
 
     async def async_notify(self, message: ActivityMessage):
         logger.info(f"async_notify called with message: {message}")
+        if message.header.sender == MODERATOR_NAME:
+            self.vote_output.observe(message.content.text)
 
         await asyncio.sleep(2)
 
@@ -144,23 +149,40 @@ class WerewolfAgent(IReactiveAgent):
 
     async def async_respond(self, message: ActivityMessage):
         logger.info(f"async_respond called with message: {message}")
+        if message.header.sender == MODERATOR_NAME:
+            self.vote_output.observe(message.content.text)
         await asyncio.sleep(1)
         full_message = self.get_full_message(message)
         await self.get_response_from_agent(full_message)
         response: str = await self.listener_pipe.get()
         logger.info(f"Response received from listener_pipe: {response}")
+        response = self.vote_output.canonicalize(message.content.text, response)
         return ActivityResponse(
             response=TextContent(text=response), response_type=MimeType.TEXT_PLAIN
         )
 
-    @retry(
-        wait=wait_exponential(multiplier=1, min=20, max=300),
-        stop=stop_after_attempt(5),
-        retry=retry_if_exception_type(RateLimitError),
-    )
     async def get_response_from_agent(self, text_message):
         logger.info(f"get_response_from_agent called with text_message: {text_message}")
-        await self.conversable_agent.a_receive(
-            text_message, self.game_agent, request_reply=True, silent=True
-        )
+        # autogen sends the whole conversation with every request
+        history = self.conversable_agent.chat_messages.get(self.game_agent, [])
+        estimated = sum(len(str(m.get("content", ""))) for m in history) // 4 + len(text_message) // 4 + COMPLETION_TOKENS_ESTIMATE
+        for attempt in range(MAX_RETRIES + 1):
+            await self.rate_limiter.acquire(estimated)
+            try:
+                await self.conversable_agent.a_receive(
+                    text_message, self.game_agent, request_reply=True, silent=True
+                )
+                break
+            except RateLimitError as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                # a Retry-After holds the limiter, otherwise back off briefly
+                server_wait = retry_after(e)
+                if server_wait is not None:
+                    self.rate_limiter.pause(server_wait)
+                delay = 0.0 if server_wait is not None else backoff_delay(attempt)
+                logger.warning(f"Rate limited, retrying in {delay:.2f}s: {e}")
+            finally:
+                self.rate_limiter.release()
+            await asyncio.sleep(delay)
         logger.info("Message sent to conversable_agent for response.")
\ No newline at end of file
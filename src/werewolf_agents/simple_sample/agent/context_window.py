@@ -0,0 +1,198 @@
+import logging
+import math
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from .moderator_messages import classify
+from .moderator_templates import DAY_END, DAY_START, INTRODUCTION, NIGHT_START, ROLE_SETTING, SEER_RESULT
+
+logger = logging.getLogger(__name__)
+
+DIGEST_STRATEGIES = ("facts", "llm", "drop")
+CHARS_PER_TOKEN = 4  # cheap local estimate, close enough for Llama-style BPE vocabularies
+DIGEST_HEADER = "Notes on earlier messages (older turns are summarized here):"
+
+DIGEST_PROMPT = """You are keeping notes for {name}, a player in a game of Werewolf.
+
+Notes so far:
+{digest}
+
+Messages to add:
+{transcript}
+
+Update the notes with these messages. Keep one short line per player covering their role claims, votes, accusations and whether they are dead (with their revealed role), and one line with the eliminations so far. Do not add advice or commentary."""
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _split(entry: Dict[str, str]):
+    """(sender, text) of a history entry formatted as "[From - sender| channel]: text"."""
+    content = entry["content"]
+    if not content.startswith("[From") or "]: " not in content:
+        return None, content
+    header, text = content.split("]: ", 1)
+    return header[len("[From"):].lstrip(" -").split("|")[0].strip(), text
+
+
+class ContextWindow:
+    """Keeps the chat history sent to the LLM bounded.
+
+    The system prompt and the moderator's role message are pinned, the last
+    `window` turns are kept verbatim and older turns are folded into a running
+    digest sent in their place. Turns are evicted `fold_every` at a time, so
+    the prompt prefix stays stable between folds. Digest strategies:
+      facts  one short line per evicted turn, requests and filler left out
+      llm    the LLM rewrites the digest with the evicted turns (one call per fold)
+      drop   evicted turns are forgotten
+    """
+
+    def __init__(
+        self,
+        player_name: str,
+        window: int = 24,
+        fold_every: int = 8,
+        digest: str = "facts",
+        digest_lines: int = 40,
+        line_chars: int = 160,
+        moderator_name: str = "moderator",
+        summarize: Optional[Callable[[str], str]] = None,
+    ):
+        if digest not in DIGEST_STRATEGIES:
+            raise ValueError(f"Unknown digest strategy {digest!r}, expected one of {DIGEST_STRATEGIES}")
+        self.player_name = player_name
+        self.window = window
+        self.fold_every = max(1, fold_every)
+        self.digest_strategy = digest
+        self.digest_lines = digest_lines
+        self.line_chars = line_chars
+        self.moderator_name = moderator_name
+        self.summarize = summarize
+        self.digest: List[str] = []
+        self.stats = Counter()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], player_name: str, summarize: Optional[Callable[[str], str]] = None) -> Optional["ContextWindow"]:
+        """None unless enabled; `summarize` sends a prompt to the LLM for the llm strategy."""
+        config = config or {}
+        if not config.get("enabled", False):
+            return None
+        return cls(
+            player_name,
+            window=config.get("window", 24),
+            fold_every=config.get("fold_every", 8),
+            digest=config.get("digest", "facts"),
+            digest_lines=config.get("digest_lines", 40),
+            line_chars=config.get("line_chars", 160),
+            summarize=summarize,
+        )
+
+    def _pinned(self, entry: Dict[str, str]) -> bool:
+        if entry["role"] == "system":
+            return True
+        sender, text = _split(entry)
+        if sender != self.moderator_name:
+            return False
+        message = classify(text)
+        return message is not None and message.label == ROLE_SETTING
+
+    def trim(self, history: List[Dict[str, str]], allow_llm: bool = True):
+        """Evicts the oldest unpinned turns from `history` in place once more than
+        `window + fold_every` have piled up, folding them into the digest.
+        Without `allow_llm` the llm strategy falls back to facts for this fold."""
+        pinned = [entry for entry in history if self._pinned(entry)]
+        turns = [entry for entry in history if not self._pinned(entry)]
+        if len(turns) <= self.window + self.fold_every:
+            return
+        evicted, kept = turns[:len(turns) - self.window], turns[len(turns) - self.window:]
+        history[:] = pinned + kept
+        self.stats["folds"] += 1
+        self.stats["evicted_turns"] += len(evicted)
+        self.stats["evicted_tokens"] += sum(estimate_tokens(entry["content"]) for entry in evicted)
+        if self.digest_strategy == "drop":
+            return
+        if self.digest_strategy == "llm" and allow_llm and self.summarize is not None and self._summarize(evicted):
+            return
+        lines = [line for line in (self._fact(entry) for entry in evicted) if line]
+        self.digest = (self.digest + lines)[-self.digest_lines:]
+
+    def _summarize(self, evicted: List[Dict[str, str]]) -> bool:
+        prompt = DIGEST_PROMPT.format(
+            name=self.player_name,
+            digest="\n".join(self.digest) or "(none yet)",
+            transcript="\n".join(entry["content"] for entry in evicted),
+        )
+        try:
+            digest = self.summarize(prompt)
+        except Exception as e:
+            logger.warning(f"Context digest by the LLM failed, keeping facts instead: {e}")
+            self.stats["llm_digest_failures"] += 1
+            return False
+        self.digest = [line for line in digest.strip().splitlines() if line.strip()]
+        self.stats["llm_digests"] += 1
+        return True
+
+    def _fact(self, entry: Dict[str, str]) -> Optional[str]:
+        """The evicted turn in one short line, None when it carries nothing worth keeping."""
+        sender, text = _split(entry)
+        if entry["role"] == "assistant":
+            return self._clip(f"me: {text}")
+        if sender != self.moderator_name:
+            return self._clip(f"{sender}: {text}")
+        message = classify(text)
+        if message is None:
+            return self._clip(f"moderator: {text}")
+        variables = message.variables
+        if message.label == INTRODUCTION:
+            return f"Players: {', '.join(message.players('players'))}" if message.exact else None
+        if message.label == NIGHT_START:
+            return "Night started."
+        if message.label == DAY_START and message.exact:
+            eliminated = variables.get("eliminated_villager")
+            return f"Day started, {eliminated} was killed in the night." if eliminated else "Day started, nobody died in the night."
+        if message.label == DAY_END and message.exact:
+            return f"{variables.get('eliminated_player')} was voted out, role {variables.get('eliminated_player_role')}."
+        if message.label == SEER_RESULT and message.exact:
+            is_wolf = "is not a wolf" not in text.lower()
+            return f"Seer check: {variables.get('selected_player')} is {'a wolf' if is_wolf else 'not a wolf'}."
+        # vote and discussion requests, retries and the like: the answers that follow matter, not the request
+        return None
+
+    def _clip(self, line: str) -> str:
+        line = " ".join(line.split())
+        return line if len(line) <= self.line_chars else line[: self.line_chars].rstrip() + " [...]"
+
+    def messages(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """What to send: the pinned entries, the digest, then the recent turns."""
+        if not self.digest:
+            return history
+        pinned = [entry for entry in history if self._pinned(entry)]
+        turns = [entry for entry in history if not self._pinned(entry)]
+        digest = {"role": "user", "content": DIGEST_HEADER + "\n" + "\n".join(self.digest)}
+        return pinned + [digest] + turns
+
+    def record(self, messages: List[Dict[str, str]], response=None) -> Dict[str, int]:
+        """Token metrics of one call: the estimated prompt size, what the full
+        history would have cost and, when the API reports it, the real count."""
+        prompt_tokens = sum(estimate_tokens(entry["content"]) for entry in messages)
+        digest_tokens = estimate_tokens("\n".join(self.digest)) if self.digest else 0
+        full_tokens = prompt_tokens - digest_tokens + self.stats["evicted_tokens"]
+        metrics = {
+            "messages": len(messages),
+            "prompt_tokens": prompt_tokens,
+            "digest_tokens": digest_tokens,
+            "tokens_saved": max(0, full_tokens - prompt_tokens),
+        }
+        usage = getattr(response, "usage", None)
+        if getattr(usage, "prompt_tokens", None) is not None:
+            metrics["usage_prompt_tokens"] = usage.prompt_tokens
+        self.stats["calls"] += 1
+        for key in ("prompt_tokens", "tokens_saved"):
+            self.stats[key] += metrics[key]
+        return metrics
+
+    def report(self) -> Dict[str, Any]:
+        report = dict(self.stats)
+        report["digest_lines"] = len(self.digest)
+        return report
@@ -0,0 +1,210 @@
+import functools
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .moderator_templates import (
+    DAY_START,
+    DAY_VOTE,
+    DAY_VOTE_RETRY,
+    DISCUSSION,
+    DOCTOR_SAVE,
+    DOCTOR_SAVE_RETRY,
+    NIGHT_START,
+    ROLE_SETTING,
+    SEER_GUESS,
+    SEER_GUESS_RETRY,
+    TEMPLATES,
+    WOLF_VOTE,
+    WOLF_VOTE_RETRY,
+)
+
+VALID_ROLES = ("wolf", "villager", "seer", "doctor")
+ROLE_ALIASES = {"werewolf": "wolf", "werewolves": "wolf", "wolves": "wolf"}
+
+SET_ROLE_TEMPLATE = TEMPLATES[ROLE_SETTING]
+
+# {{ variable }} and the {% if %} / {% elif %} / {% else %} / {% endif %} tags the templates use
+_TAG = re.compile(r"\{\{\s*(?P<variable>\w+)\s*\}\}|\{%-?\s*(?P<keyword>if|elif|else|endif)\b.*?-?%\}", re.DOTALL)
+
+
+def _literal(text: str) -> str:
+    words = text.split()
+    if not words:
+        return r"\s*"
+    return r"\s*" + r"\s+".join(re.escape(word) for word in words) + r"\s*"
+
+
+def compile_template(template: str) -> re.Pattern:
+    """Turns a moderator template into a regex with a named group per variable.
+
+    Whitespace is matched loosely since the moderator's rendering does not
+    preserve the template's indentation and line breaks exactly. An if block
+    becomes an alternation of its branches (or nothing, without an else). A
+    variable that occurs again gets a group of its own, name__2 and so on,
+    see template_variables().
+    """
+    occurrences: Dict[str, int] = {}
+    blocks = [[[]]]  # open blocks, each a list of branches, each a list of regex parts
+    position = 0
+    for match in _TAG.finditer(template):
+        blocks[-1][-1].append(_literal(template[position:match.start()]))
+        position = match.end()
+        name, keyword = match.group("variable"), match.group("keyword")
+        if name:
+            occurrences[name] = occurrences.get(name, 0) + 1
+            group = name if occurrences[name] == 1 else f"{name}__{occurrences[name]}"
+            blocks[-1][-1].append(f"(?P<{group}>.*?)")
+        elif keyword == "if":
+            blocks.append([[]])
+        elif keyword in ("elif", "else"):
+            blocks[-1].append([])
+        else:
+            branches = blocks.pop()
+            if len(branches) == 1:
+                branches.append([])
+            blocks[-1][-1].append("(?:" + "|".join("".join(branch) for branch in branches) + ")")
+    blocks[0][0].append(_literal(template[position:]))
+    return re.compile("".join(blocks[0][0]), re.DOTALL | re.IGNORECASE)
+
+
+def template_variables(match: re.Match) -> Dict[str, str]:
+    """Variables of a compile_template() match, the first rendered occurrence of each."""
+    variables = {}
+    for group, value in match.groupdict().items():
+        name = group.split("__", 1)[0]
+        if value is not None and name not in variables:
+            variables[name] = value.strip()
+    return variables
+
+
+SET_ROLE_PATTERN = compile_template(SET_ROLE_TEMPLATE)
+
+
+def parse_role(text: str) -> Optional[str]:
+    """Reads the role out of the moderator's set-role message, None if it does not match."""
+    match = SET_ROLE_PATTERN.search(text)
+    if not match:
+        return None
+    role = match.group("role").strip().strip("'\"").lower()
+    role = ROLE_ALIASES.get(role, role)
+    return role if role in VALID_ROLES else None
+
+
+# Action type (as the deadlines and hedging name them) of the requests for an answer
+ACTION_KINDS = {
+    SEER_GUESS: "seer_check",
+    SEER_GUESS_RETRY: "seer_check",
+    DOCTOR_SAVE: "doctor_save",
+    DOCTOR_SAVE_RETRY: "doctor_save",
+    WOLF_VOTE: "wolf_target",
+    WOLF_VOTE_RETRY: "wolf_target",
+    DAY_VOTE: "day_vote",
+    DAY_VOTE_RETRY: "day_vote",
+    DISCUSSION: "discussion",
+}
+RETRIES = (SEER_GUESS_RETRY, DOCTOR_SAVE_RETRY, WOLF_VOTE_RETRY, DAY_VOTE_RETRY)
+
+
+def _header(text: str) -> str:
+    """The words before the first colon, e.g. "day vote retry"."""
+    return " ".join(text.split(":", 1)[0].split()).lower()
+
+
+# Every template opens with its own header line, so a message is checked
+# against a single pattern.
+_PATTERNS = {_header(template): (label, compile_template(template)) for label, template in TEMPLATES.items()}
+
+
+@dataclass(frozen=True)
+class ModeratorMessage:
+    label: str  # one of the labels in moderator_templates, e.g. DAY_VOTE
+    variables: Dict[str, str]
+    exact: bool  # the whole message matched the template, not just its header
+
+    @property
+    def action_kind(self) -> Optional[str]:
+        return ACTION_KINDS.get(self.label)
+
+    @property
+    def is_retry(self) -> bool:
+        return self.label in RETRIES
+
+    def players(self, variable: str = "alive_players") -> List[str]:
+        return parse_player_list(self.variables.get(variable, ""))
+
+
+@functools.lru_cache(maxsize=256)
+def classify(text: str) -> Optional[ModeratorMessage]:
+    """Labels a moderator message by the template it was rendered from, None
+    for anything else. Variables are only extracted when the whole message
+    matches; a known header alone still gives the label."""
+    entry = _PATTERNS.get(_header(text))
+    if entry is None:
+        return None
+    label, pattern = entry
+    match = pattern.fullmatch(text)
+    if match is None:
+        return ModeratorMessage(label, {}, False)
+    return ModeratorMessage(label, template_variables(match), True)
+
+
+def action_kind(text: str) -> Optional[str]:
+    message = classify(text)
+    return message.action_kind if message is not None else None
+
+
+def phase_started(text: str) -> Optional[str]:
+    """Returns "day" or "night" when the message opens a new phase."""
+    message = classify(text)
+    if message is None:
+        return None
+    return {NIGHT_START: "night", DAY_START: "day"}.get(message.label)
+
+
+def is_day_vote(text: str) -> bool:
+    message = classify(text)
+    return message is not None and message.label in (DAY_VOTE, DAY_VOTE_RETRY)
+
+
+# Player lists: introduction.txt names everyone, the night requests and the
+# local retries list who is still alive. wolf_night_introduction.txt lists only
+# the villagers ("alive villager players") and is deliberately not matched.
+INTRODUCTION_PLAYERS_PATTERN = re.compile(r"list of your fellow player in the game\.\s*-\s*([^\n]+)", re.IGNORECASE)
+ALIVE_PLAYERS_PATTERN = re.compile(
+    r"(?:\balive players?\b|\bstill alive\b)[^\n\[]*?(?:->|:)\s*(\[.*?\](?:\s*\])?|[^\n]+)",
+    re.IGNORECASE | re.DOTALL,
+)
+# day_start.txt and day_end_message.txt
+ELIMINATED_PATTERNS = (
+    re.compile(r"eliminated by the wolves\.\s*his name is\s*->\s*'([^']+)'", re.IGNORECASE),
+    re.compile(r"Player\s*->\s*'([^']+)'\s*was eliminated", re.IGNORECASE),
+)
+
+
+def parse_player_list(text: str) -> List[str]:
+    """Names from a rendered list, either "['a', 'b']" or "a, b"."""
+    quoted = re.findall(r"'([^'\n]+)'|\"([^\"\n]+)\"", text)
+    if quoted:
+        names = [single or double for single, double in quoted]
+    else:
+        names = re.split(r"\s*,\s*", text.strip(" []."))
+    return [name.strip() for name in names if name.strip()]
+
+
+def parse_players(text: str) -> List[str]:
+    match = INTRODUCTION_PLAYERS_PATTERN.search(text)
+    return parse_player_list(match.group(1)) if match else []
+
+
+def parse_alive_players(text: str) -> List[str]:
+    match = ALIVE_PLAYERS_PATTERN.search(text)
+    return parse_player_list(match.group(1)) if match else []
+
+
+def parse_eliminated(text: str) -> Optional[str]:
+    for pattern in ELIMINATED_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(1).strip()
+    return None
@@ -1,8 +1,15 @@
-from openai import OpenAI
+from openai import OpenAI, APIConnectionError, APIError, APIStatusError, APITimeoutError
 import logging
+import random
+import time
 from sentient_campaign.agents.v1.api import IReactiveAgent
 from sentient_campaign.agents.v1.message import ActivityMessage, ActivityResponse, MimeType, ActivityMessageHeader, MessageChannelType, TextContent
 
+from .context_window import ContextWindow
+from .deadline import DeadlineBudget
+from .llm_cache import LLMCache
+from .vote_output import VoteOutput, vote_kind
+
 # Set up logging
 logger = logging.getLogger("simple_agent")
 level = logging.DEBUG
@@ -14,6 +21,20 @@ formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(messag
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
+MODERATOR_NAME = "moderator"
+# The client's own retries are off so a call never outlives the deadline;
+# failed calls are retried here instead, as long as the deadline allows.
+MAX_RETRIES = 2
+RETRY_STATUS_CODES = (408, 409, 429)
+BACKOFF_BASE_S = 0.5
+
+
+def is_retryable(error: APIError) -> bool:
+    if isinstance(error, APIConnectionError):
+        return True
+    return isinstance(error, APIStatusError) and (error.status_code in RETRY_STATUS_CODES or error.status_code >= 500)
+
+
 class SimpleReactiveAgent(IReactiveAgent):
     
     def __init__(self):
@@ -31,6 +52,13 @@ class SimpleReactiveAgent(IReactiveAgent):
             api_key=self.llm_config["api_key"],
             base_url=self.llm_config["llm_base_url"],
         )
+        llm_cache = LLMCache.from_config(self._config.get("llm_cache"), f"/tmp/llm_cache_{name}.jsonl")
+        if llm_cache is not None:
+            self.openai_client = llm_cache.wrap(self.openai_client)
+        self.deadline_budget = DeadlineBudget(self._config.get("deadline"))
+        self.vote_output = VoteOutput(name)
+        # bounded mode: pinned prompts, recent turns and a digest of the rest instead of everything
+        self.context_window = ContextWindow.from_config(self._config.get("context_window"), name, self._summarize)
 
         ########################### System Prompt ###########################
         # Here we create a simple list for storing message history
@@ -45,6 +73,8 @@ class SimpleReactiveAgent(IReactiveAgent):
 
     # this is another required method, this is the method that the game controller will call to notify your agent of something when no response is needed
     async def async_notify(self, message: ActivityMessage):
+        if message.header.sender == MODERATOR_NAME:
+            self.vote_output.observe(message.content.text)
 
         # here we add the message to the message history, extracting relevant information from the ActivityMessage object it came in
         message_text = f"[From - {message.header.sender}| {message.header.channel}]: {message.content.text}"
@@ -53,9 +83,14 @@ class SimpleReactiveAgent(IReactiveAgent):
             "content": message_text
         })
         logger.debug(f"Message added to history: {message_text}")
+        if self.context_window is not None:
+            self.context_window.trim(self.message_history)
 
     # this is a required method, this is the method that the game controller will call to notify your agent of something when a response is needed
     async def async_respond(self, message: ActivityMessage) -> ActivityResponse:
+        deadline = self.deadline_budget.start(self._message_kind(message))
+        if message.header.sender == MODERATOR_NAME:
+            self.vote_output.observe(message.content.text)
 
         message_text = f"[From - {message.header.sender}| {message.header.channel}]: {message.content.text}"
         self.message_history.append({
@@ -63,21 +98,85 @@ class SimpleReactiveAgent(IReactiveAgent):
             "content": message_text
         })
         logger.debug(f"Message added to history: {message_text}")
+        messages = self.message_history
+        if self.context_window is not None:
+            # no digest call while the moderator waits, the facts are folded in now and the LLM digest later
+            self.context_window.trim(self.message_history, allow_llm=False)
+            messages = self.context_window.messages(self.message_history)
         
         logger.debug("Generating response from OpenAI...")
-        response = self.openai_client.chat.completions.create(
-            model=self.llm_config["llm_model_name"],
-            messages=self.message_history,
-        )
-        
-        assistant_message = f"[From {self._name} (me) | {message.header.channel}]: {response.choices[0].message.content}"
+        start = time.perf_counter()
+        response = None
+        try:
+            response = self._complete(messages, deadline)
+            response_text = response.choices[0].message.content
+            self.deadline_budget.observe(time.perf_counter() - start)
+        except APIError as e:
+            # timed out, or failed with no time left to retry: answer anyway rather than lose the turn
+            logger.warning(f"LLM call failed ({type(e).__name__}), falling back")
+            deadline.skip("response")
+            response_text = self._fallback_response(message.header.channel)
+            logger.info(f"Deadline report: {self.deadline_budget.report()}")
+        if self.context_window is not None:
+            logger.info(f"Context: {self.context_window.record(messages, response)}")
+        # name exactly one alive player in votes, so the moderator does not ask again
+        response_text = self.vote_output.canonicalize(message.content.text, response_text)
+
+        assistant_message = f"[From {self._name} (me) | {message.header.channel}]: {response_text}"
         self.message_history.append({
             "role": "assistant",
             "content": assistant_message
         })
         logger.debug(f"Assistant response added to history: {assistant_message}")
         
-        return ActivityResponse(response.choices[0].message.content)
+        return ActivityResponse(response_text)
+
+    def _complete(self, messages, deadline):
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                # give up on the call when it would run past the deadline
+                return self.openai_client.with_options(
+                    timeout=max(1.0, deadline.remaining() - self.deadline_budget.margin_seconds),
+                    max_retries=0,
+                ).chat.completions.create(
+                    model=self.llm_config["llm_model_name"],
+                    messages=messages,
+                )
+            except APIError as e:
+                delay = random.uniform(0, BACKOFF_BASE_S * 2 ** attempt)
+                if (
+                    isinstance(e, APITimeoutError)
+                    or not is_retryable(e)
+                    or attempt == MAX_RETRIES
+                    or not deadline.allows("retry")
+                ):
+                    raise
+                logger.warning(f"LLM call failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+    def _summarize(self, prompt: str) -> str:
+        response = self.openai_client.chat.completions.create(
+            model=self.llm_config["llm_model_name"],
+            messages=[
+                {"role": "system", "content": "You summarize Werewolf game transcripts into compact notes."},
+                {"role": "user", "content": prompt},
+            ],
+        )
+        return response.choices[0].message.content
+
+    def _message_kind(self, message: ActivityMessage) -> str:
+        kind = vote_kind(message.content.text)
+        if kind is not None:
+            return kind
+        return "discussion" if message.header.channel_type == MessageChannelType.GROUP else "default"
+
+    def _fallback_response(self, channel: str) -> str:
+        # the last thing said in the same channel is the best answer there is
+        prefix = f"[From {self._name} (me) | {channel}]: "
+        for entry in reversed(self.message_history):
+            if entry["role"] == "assistant" and entry["content"].startswith(prefix):
+                return entry["content"][len(prefix):]
+        return "I have not made up my mind yet, I will go with the majority."
 
 # Testing the agent: Make sure to comment out this code when you want to actually run the agent in some games. 
 
@@ -0,0 +1,87 @@
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from werewolf_agents.SuperWolf.agent.game_tracker import NOT_WOLF, WOLF, GameTracker  # noqa: E402
+from werewolf_agents.SuperWolf.agent.moderator_templates import (  # noqa: E402
+    DAY_VOTE,
+    DAY_VOTE_RETRY,
+    DOCTOR_SAVE,
+    INTRODUCTION,
+    NIGHT_START,
+    ROLE_SETTING,
+    TEMPLATES,
+    WOLF_VOTE,
+    WOLF_VOTE_RETRY,
+)
+
+PLAYERS = ["Klaus", "Bram", "Chagent", "Myra", "Emily", "John"]
+GAME_ROOM = "play-arena"
+WOLFS_DEN = "wolf's-den"
+
+# templates with {% %} blocks, as the moderator renders them
+WOLF_NIGHT = "Wolf night: \n\nHello wolfs another day has passed and night has started. Lets start the process of voting to eliminate a player.\n\nHere are the alive villager players for this night ->  {players}\n"
+DAY_START = "Day start:\n\nHello players, Good Morning. Please wake up.\n\n\n    villager dead : Alas!,A villager player has been eliminated by the wolves. his name is -> '{name}'\n\n   \n       Let me ask one by one about who are the wolfs among overselves. \n     \n\n\n"
+DAY_END = "Day End:\nday elimination : Player -> '{name}' was eliminated by the vote today. Their role was -> '{role}'.\n"
+
+
+def render(label, **variables):
+    """A template without {% %} blocks, filled in the way the moderator does."""
+    return re.sub(r"\{\{\s*(\w+)\s*\}\}", lambda match: str(variables[match.group(1)]), TEMPLATES[label])
+
+
+def wolf_game():
+    tracker = GameTracker("Klaus")
+    tracker.observe("moderator", GAME_ROOM, render(INTRODUCTION, game_room=GAME_ROOM, moderator_name="moderator", players=PLAYERS))
+    tracker.observe("moderator", None, render(ROLE_SETTING, player="Klaus", role="wolf"))
+    tracker.observe("moderator", GAME_ROOM, render(NIGHT_START))
+    tracker.observe("moderator", WOLFS_DEN, WOLF_NIGHT.format(players=PLAYERS[2:]))
+    return tracker
+
+
+def test_wolf_night_finds_fellow_wolves():
+    tracker = wolf_game()
+    assert tracker.role == "wolf" and tracker.round == 1
+    assert tracker.alive == PLAYERS
+    assert (tracker.players["Bram"].role, tracker.players["Bram"].role_source) == (WOLF, "fellow wolf")
+    assert tracker.players["Chagent"].role is None
+
+
+def test_wolf_vote_retry_does_not_kill_the_wolves():
+    tracker = wolf_game()
+    # the retry lists the villagers only, the wolves are still alive
+    tracker.observe("moderator", WOLFS_DEN, render(WOLF_VOTE_RETRY, delegatte_player="Bram", alive_players=PLAYERS[2:]))
+    assert tracker.alive == PLAYERS
+    tracker.observe("Bram", WOLFS_DEN, "Let's take out Myra.")
+    assert tracker.wolf_votes[1] == {"Bram": "Myra"}
+
+
+def test_day_messages_record_deaths_and_votes():
+    tracker = wolf_game()
+    tracker.observe("moderator", WOLFS_DEN, render(WOLF_VOTE, delegate_player="Bram"))
+    tracker.observe("Bram", WOLFS_DEN, "John")
+    tracker.observe("moderator", GAME_ROOM, DAY_START.format(name="John"))
+    assert tracker.night_kills == {1: "John"}
+    assert not tracker.players["John"].alive and tracker.players["John"].role == NOT_WOLF
+
+    tracker.observe("Emily", GAME_ROOM, "I am the seer, and I trust Myra.")
+    tracker.observe("moderator", GAME_ROOM, render(DAY_VOTE, delegate_player="Emily"))
+    tracker.observe("Emily", GAME_ROOM, "I vote for Klaus, not Myra.")
+    tracker.answered(render(DAY_VOTE, delegate_player="Klaus"), "Emily")
+    assert tracker.claims == {"Emily": "seer"}
+    assert tracker.day_votes[1] == {"Emily": "Klaus", "Klaus": "Emily"}
+
+    tracker.observe("moderator", GAME_ROOM, DAY_END.format(name="Emily", role="villager"))
+    assert (tracker.players["Emily"].role, tracker.players["Emily"].eliminated) == ("villager", "day 1")
+    assert tracker.alive == ["Klaus", "Bram", "Chagent", "Myra"]
+
+
+def test_full_alive_lists_override_inferred_deaths():
+    tracker = GameTracker("Myra")
+    tracker.observe("moderator", GAME_ROOM, render(INTRODUCTION, game_room=GAME_ROOM, moderator_name="moderator", players=PLAYERS))
+    tracker.observe("moderator", None, render(DOCTOR_SAVE, player="Myra", alive_players=["Klaus", "Bram", "Myra", "Emily"]))
+    assert tracker.alive == ["Klaus", "Bram", "Myra", "Emily"]
+    tracker.observe("moderator", GAME_ROOM, render(DAY_VOTE_RETRY, delegatte_player="Myra", alive_players=["Klaus", "Myra", "Emily"]))
+    assert tracker.alive == ["Klaus", "Myra", "Emily"]
@@ -0,0 +1,81 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from werewolf_agents.SuperWolf.agent.llm_cache import CacheMiss, LLMCache  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Who do you vote for?"}]
+
+
+class FlakyCompletions:
+    """Answers "answer N" for the N-th successful call, after failing the calls listed in `fail`."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = 0
+        self.answers = 0
+
+    def create(self, model, messages, **kwargs):
+        self.calls += 1
+        if self.calls in self.fail:
+            raise ConnectionError("transient")
+        self.answers += 1
+        usage = SimpleNamespace(prompt_tokens=5, completion_tokens=2, total_tokens=7)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"answer {self.answers}"))], usage=usage)
+
+
+class AsyncFlakyCompletions(FlakyCompletions):
+    async def create(self, model, messages, **kwargs):
+        return FlakyCompletions.create(self, model, messages, **kwargs)
+
+
+def client(completions):
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions), with_options=lambda **options: client(completions))
+
+
+def ask(cached, retries=1):
+    for attempt in range(retries + 1):
+        try:
+            return cached.chat.completions.create(model="m", messages=MESSAGES).choices[0].message.content
+        except ConnectionError:
+            if attempt == retries:
+                raise
+
+
+def test_failed_call_is_not_numbered(tmp_path):
+    path = str(tmp_path / "cache.jsonl")
+    recorded = LLMCache(path, "record").wrap(client(FlakyCompletions(fail=[1])))
+    assert [ask(recorded), ask(recorded)] == ["answer 1", "answer 2"]
+
+    # a fresh run without errors gets the same numbers, so every call is found
+    replayed = LLMCache(path, "replay_strict").wrap(client(FlakyCompletions(fail=range(1, 10))))
+    assert [ask(replayed, retries=0), ask(replayed, retries=0)] == ["answer 1", "answer 2"]
+    with pytest.raises(CacheMiss):
+        ask(replayed, retries=0)
+
+
+def test_failed_async_call_is_not_numbered(tmp_path):
+    path = str(tmp_path / "cache.jsonl")
+
+    async def run(cache, completions, retries):
+        cached = cache.wrap_async(client(completions))
+        answers = []
+        for _ in range(2):
+            for attempt in range(retries + 1):
+                try:
+                    response = await cached.chat.completions.create(model="m", messages=MESSAGES)
+                    answers.append(response.choices[0].message.content)
+                    break
+                except ConnectionError:
+                    pass
+        return answers
+
+    assert asyncio.run(run(LLMCache(path, "record"), AsyncFlakyCompletions(fail=[2]), retries=1)) == ["answer 1", "answer 2"]
+    replay = LLMCache(path, "replay_strict")
+    assert asyncio.run(run(replay, AsyncFlakyCompletions(fail=range(1, 10)), retries=0)) == ["answer 1", "answer 2"]
+    assert replay.stats["hits"] == 2
@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from werewolf_agents.SuperWolf.agent.game_tracker import GameTracker  # noqa: E402
+from werewolf_agents.SuperWolf.agent.lookahead import Lookahead  # noqa: E402
+from werewolf_agents.SuperWolf.agent.role_beliefs import RoleBeliefs  # noqa: E402
+
+PLAYERS = ["Chagent", "Klaus", "Myra", "Lars", "Emily", "vihaan", "Elise", "John"]
+NIGHT_START = " Night Start: \n Hello players night has started. Please go to sleep.\n"
+
+
+def game(player: str, role: str) -> GameTracker:
+    tracker = GameTracker(player)
+    tracker.observe("moderator", "play-arena", "Introduction:\nHere is the list of your fellow player in the game. - " + str(PLAYERS))
+    tracker.observe("moderator", None, f"Role setting: \nHello {player} you are now playing the game werewolf with the role -> '{role}' in the game. Please keep this information discreet.")
+    tracker.observe("moderator", "play-arena", NIGHT_START)
+    return tracker
+
+
+def lookahead(tracker: GameTracker, **kwargs) -> Lookahead:
+    return Lookahead(RoleBeliefs(tracker), **{"rollouts": 4000, "fast": True, "seed": 0, **kwargs})
+
+
+def test_seer_votes_out_the_wolf_they_found():
+    tracker = game("Chagent", "seer")
+    tracker.observe("moderator", None, "Seer guess result:\n\n    Nice! : Chagent you guessed it right player -> 'Emily' is a wolf.\n\n")
+    assert tracker.seer_results == {"Emily": True}
+    assert lookahead(tracker).best("day_vote") == "Emily"
+
+
+def test_wolf_spares_the_fellow_wolf():
+    tracker = game("Klaus", "wolf")
+    villagers = [name for name in PLAYERS if name not in ("Klaus", "Lars")]
+    tracker.observe("moderator", "wolf's-den", f"Wolf night: \n\nHello wolfs another day has passed and night has started. Lets start the process of voting to eliminate a player.\n\nHere are the alive villager players for this night ->  {villagers}\n")
+    search = lookahead(tracker)
+    ranking = search.rank("day_vote")
+    assert ranking[-1][0] == "Lars"
+    assert search.best("day_vote") != "Lars"
+    # wolves only kill players who are not wolves
+    assert {name for name, _ in search.rank("wolf_target")} == set(villagers)
+    assert search.report() == {"rankings": 2, "fast_day_vote": 1}
+
+
+def test_best_is_reproducible_and_cached():
+    tracker = game("Chagent", "villager")
+    first, second = lookahead(tracker), lookahead(tracker)
+    assert first.rank("day_vote") == second.rank("day_vote")
+    assert first.best("day_vote") == second.best("day_vote")
+    first.best("day_vote")
+    assert first.report()["rankings"] == 1
+
+
+def test_best_leaves_the_choice_to_the_llm():
+    tracker = game("Chagent", "villager")
+    assert lookahead(tracker, fast=False).best("day_vote") is None
+    assert lookahead(tracker).best("seer_check") is None
+    for name in PLAYERS[2:]:
+        tracker.players[name].alive = False
+    tracker._changed()
+    # a single candidate leaves nothing to rank
+    assert lookahead(tracker).best("day_vote") is None
@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from werewolf_agents.SuperWolf.agent.game_tracker import GameTracker  # noqa: E402
+from werewolf_agents.SuperWolf.agent.role_beliefs import ROLES, RoleBeliefs  # noqa: E402
+
+PLAYERS = ["Chagent", "Klaus", "Myra", "Lars", "Emily", "vihaan", "Elise", "John"]
+
+
+def seer_game() -> GameTracker:
+    tracker = GameTracker("Chagent")
+    tracker.observe("moderator", "play-arena", "Introduction:\nHere is the list of your fellow player in the game. - " + str(PLAYERS))
+    tracker.observe("moderator", None, "Role setting: \nHello Chagent you are now playing the game werewolf with the role -> 'seer' in the game. Please keep this information discreet.")
+    tracker.observe("moderator", "play-arena", " Night Start: \n Hello players night has started. Please go to sleep.\n")
+    return tracker
+
+
+def assert_distribution(beliefs: RoleBeliefs):
+    marginals = beliefs.marginals()
+    assert marginals.shape == (len(PLAYERS), len(ROLES))
+    assert np.isfinite(marginals).all()
+    assert np.allclose(marginals.sum(axis=1), 1.0)
+    # every assignment has exactly 2 wolves, 1 seer and 1 doctor
+    assert np.allclose(marginals.sum(axis=0)[1:], [2.0, 1.0, 1.0])
+
+
+def test_vote_claim_and_death_keep_a_distribution():
+    tracker = seer_game()
+    beliefs = RoleBeliefs(tracker)
+    assert len(beliefs.marginals()) == len(PLAYERS)
+    tracker.observe("moderator", "play-arena", "Day start:\n\nHello players, Good Morning. Please wake up.\n\n\n    villager dead : Alas!,A villager player has been eliminated by the wolves. his name is -> 'Myra'\n\n   \n       Let me ask one by one about who are the wolfs among overselves. \n     \n\n\n")
+    tracker.observe("Lars", "play-arena", "I am the seer, and Emily is a wolf!")
+    tracker.observe("moderator", "play-arena", 'Day vote:\nHello Klaus, please cast your final vote on who you think the wolf is. "Please respond in few words".')
+    tracker.observe("Klaus", "play-arena", "I vote for Emily.")
+    assert tracker.claims == {"Lars": "seer"}
+    assert tracker.day_votes[1] == {"Klaus": "Emily"}
+    assert_distribution(beliefs)
+    probabilities = beliefs.probabilities()
+    assert probabilities["Chagent"]["seer"] == 1.0
+    assert probabilities["Myra"]["wolf"] == 0.0
+    # the agent is the seer, so Lars's claim makes Lars more likely a wolf than anyone else
+    assert max(probabilities, key=lambda name: probabilities[name]["wolf"]) == "Lars"
+
+
+def test_self_vote_is_ignored():
+    tracker = seer_game()
+    beliefs = RoleBeliefs(tracker)
+    tracker.day_votes[1]["John"] = "John"
+    tracker._updated()
+    assert_distribution(beliefs)
+    assert beliefs.report().get("facts", 0) == 1  # only the agent's own role
+
+
+def test_impossible_weights_are_rejected():
+    tracker = seer_game()
+    beliefs = RoleBeliefs(tracker)
+    beliefs.marginals()
+    beliefs._apply(("impossible",), weights=np.full(len(beliefs.roles), -np.inf))
+    assert beliefs.report()["contradictions"] == 1
+    assert_distribution(beliefs)
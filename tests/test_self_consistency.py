@@ -0,0 +1,69 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from werewolf_agents.SuperWolf.agent.self_consistency import SelfConsistency  # noqa: E402
+
+CANDIDATES = ["Myra", "Emily", "John"]
+
+
+def sampler(answers):
+    """Sample i answers answers[i] = (text, seconds); an Exception text is raised instead."""
+    answers = iter(answers)
+
+    async def sample():
+        text, seconds = next(answers)
+        await asyncio.sleep(seconds)
+        if isinstance(text, Exception):
+            raise text
+        return text
+
+    return sample
+
+
+def decide(consistency, answers):
+    return asyncio.run(consistency.decide("day_vote", sampler(answers), CANDIDATES))
+
+
+def test_majority_returns_early():
+    answers = [("I vote Myra", 0.01), ("Myra", 0.02), ("John", 0.03), ("Myra, she lied", 0.04), ("Emily", 0.5)]
+    consensus = decide(SelfConsistency(samples=5), answers)
+    assert (consensus.player, consensus.action) == ("Myra", "I vote Myra")
+    assert (consensus.votes, consensus.completed, consensus.majority) == (3, 4, True)
+    assert consensus.seconds < 0.5
+
+
+def test_tie_goes_to_the_earliest_sample():
+    # John is named by sample 0, which finishes last
+    answers = [("John", 0.05), ("Emily", 0.01), ("Emily again", 0.02), ("John, the quiet one", 0.03)]
+    consensus = decide(SelfConsistency(samples=4), answers)
+    assert (consensus.player, consensus.action) == ("John", "John")
+    assert (consensus.votes, consensus.completed, consensus.majority) == (2, 4, False)
+
+
+def test_without_early_exit_every_sample_is_awaited():
+    answers = [("Myra", 0.01), ("Myra", 0.01), ("Emily", 0.03)]
+    consensus = decide(SelfConsistency(samples=3, early_exit=False), answers)
+    assert (consensus.player, consensus.votes, consensus.completed, consensus.majority) == ("Myra", 2, 3, True)
+
+
+def test_failed_and_unreadable_samples():
+    answers = [(ConnectionError("down"), 0.0), ("no idea", 0.02), ("not sure either", 0.01)]
+    consensus = decide(SelfConsistency(samples=3), answers)
+    # nobody named: the earliest sample's answer is kept
+    assert (consensus.player, consensus.action, consensus.completed) == (None, "no idea", 2)
+
+    with pytest.raises(RuntimeError):
+        decide(SelfConsistency(samples=2), [(ConnectionError("down"), 0.0)] * 2)
+
+
+def test_report():
+    consistency = SelfConsistency(samples=3)
+    decide(consistency, [("Myra", 0.0), ("Myra", 0.0), ("John", 0.0)])
+    decide(consistency, [("Myra", 0.0), ("Emily", 0.0), ("John", 0.0)])
+    report = consistency.report()["day_vote"]
+    assert report["decisions"] == 2 and report["majority_rate"] == 0.5
@@ -0,0 +1,47 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from werewolf_agents.SuperWolf.agent.tracing import FLUSH_EVERY, Tracer  # noqa: E402
+
+
+def spans(path):
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+
+def test_spans_are_written_on_flush_and_close(tmp_path):
+    path, otlp_path = tmp_path / "spans" / "Myra.jsonl", tmp_path / "otlp.jsonl"
+    tracer = Tracer(str(path), str(otlp_path), player_name="Myra")
+    with tracer.trace(action_type="vote", phase="day 1"):
+        for stage in ("reflection", "final_action"):
+            tracer.finish(tracer.start(stage, "m"))
+    assert spans(path) == []
+
+    tracer.flush()
+    tracer.finish(tracer.start("summary", "m"))
+    tracer.close()
+    assert [span["stage"] for span in spans(path)] == ["reflection", "final_action", "summary"]
+    assert {span["player"] for span in spans(path)} == {"Myra"}
+    assert len(spans(otlp_path)) == 3
+    assert tracer.report()["final_action"]["calls"] == 1
+
+
+def test_full_buffer_is_flushed(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer(str(path))
+    for _ in range(FLUSH_EVERY + 1):
+        tracer.finish(tracer.start("final_action", "m"))
+    tracer._writer.shutdown(wait=True)
+    assert len(spans(path)) == FLUSH_EVERY
+    tracer.close()
+    assert len(spans(path)) == FLUSH_EVERY + 1
+
+
+def test_no_paths_buffers_nothing():
+    tracer = Tracer()
+    tracer.finish(tracer.start("final_action", "m"))
+    tracer.flush()
+    tracer.close()
+    assert not tracer._buffer and tracer.report()["final_action"]["calls"] == 1
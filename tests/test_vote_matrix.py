@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from werewolf_agents.SuperWolf.agent.game_tracker import WOLF, GameTracker, PlayerState  # noqa: E402
+from werewolf_agents.SuperWolf.agent.vote_matrix import FEATURES, VoteMatrix  # noqa: E402
+
+
+def tracker_with_votes():
+    """Wolf is a known wolf, Vera a revealed villager; day 1 votes in the order cast."""
+    tracker = GameTracker("Me")
+    tracker.players = {name: PlayerState(name) for name in ("Wolf", "Ann", "Bob", "Cal", "Vera")}
+    tracker.players["Wolf"].role = WOLF
+    tracker.players["Vera"].role, tracker.players["Vera"].alive = "villager", False
+    tracker.day_votes[1] = {"Wolf": "Vera", "Ann": "Vera", "Bob": "Wolf", "Cal": "Vera"}
+    tracker.revision += 1
+    return tracker
+
+
+def test_features():
+    matrix = VoteMatrix(tracker_with_votes())
+    values = matrix.features().tolist()
+    features = dict(zip(matrix.names, values))
+    expected = {
+        # wolf_affinity, votes_for_villagers, votes_for_wolves, bandwagon, targeted_by_wolves
+        "Wolf": [0.0, 1.0, 0.0, 0.0, 0.0],
+        "Ann": [1.0, 1.0, 0.0, 1 / 3, 0.0],
+        "Bob": [0.0, 0.0, 1.0, 0.0, 0.0],
+        "Cal": [1.0, 1.0, 0.0, 1.0, 0.0],
+        "Vera": [0.0, 0.0, 0.0, 0.0, 1.0],
+    }
+    for name, values in expected.items():
+        np.testing.assert_allclose(features[name], values, err_msg=name)
+
+
+def test_ranking_and_table():
+    matrix = VoteMatrix(tracker_with_votes())
+    ranking = matrix.ranking()
+    # only alive players whose role is unknown
+    assert [name for name, _, _ in ranking] == ["Cal", "Ann", "Bob"]
+    assert ranking[0][1] == 2.5 and set(ranking[0][2]) == set(FEATURES)
+    assert [name for name, _, _ in matrix.ranking(exclude=["Cal"])] == ["Ann", "Bob"]
+    assert matrix.table().splitlines()[1] == "Cal +2.50 (voted with wolves 1.0, voted against villagers 1.0, late bandwagon 1.0)"
+
+
+def test_rebuilt_only_when_the_tracker_changed():
+    tracker = GameTracker("Me")
+    matrix = VoteMatrix(tracker)
+    assert matrix.features().shape == (0, len(FEATURES)) and matrix.table() == ""
+
+    tracker = tracker_with_votes()
+    matrix = VoteMatrix(tracker)
+    features = matrix.features()
+    assert matrix.features() is features
+    tracker.day_votes[2] = {"Ann": "Bob", "Cal": "Bob"}
+    tracker.revision += 1
+    assert matrix.features() is not features
+    assert matrix.votes.shape == (5, 5, 2)
@@ -0,0 +1,65 @@
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from werewolf_agents.SuperWolf.agent.moderator_templates import DAY_VOTE, DAY_VOTE_RETRY, DISCUSSION, DOCTOR_SAVE, TEMPLATES  # noqa: E402
+from werewolf_agents.SuperWolf.agent.vote_output import NameIndex, VoteOutput, edit_distance  # noqa: E402
+
+PLAYERS = ["Myra", "Emily", "Elise", "Chagent", "John"]
+DAY_END = "Day End:\nday elimination : Player -> '{name}' was eliminated by the vote today. Their role was -> '{role}'.\n"
+
+
+def render(label, **variables):
+    """A template without {% %} blocks, filled in the way the moderator does."""
+    return re.sub(r"\{\{\s*(\w+)\s*\}\}", lambda match: str(variables[match.group(1)]), TEMPLATES[label])
+
+
+def test_edit_distance_counts_a_swap_as_one_edit():
+    assert edit_distance("emily", "emliy") == 1
+    assert edit_distance("john", "jan") == 2
+
+
+def test_lookup_misspellings():
+    index = NameIndex(PLAYERS)
+    assert index.lookup("MYRA") == "Myra"
+    assert index.lookup("Mira") == "Myra"
+    assert index.lookup("Emliy") == "Emily"
+    assert index.lookup("Chagnet") == "Chagent"
+    assert index.lookup("Shagen") == "Chagent"  # two edits, allowed for names longer than 5 letters
+    assert index.lookup("Jan") is None  # two edits, too many for a short name
+    assert index.lookup("Jo") is None
+    assert NameIndex(["Mark", "Mary"]).lookup("Marz") is None  # as close to both
+
+
+def test_mentions_only_misspell_capitalized_words():
+    index = NameIndex(PLAYERS)
+    assert index.mentions("Nobody else but Jhon.") == ([(16, "John")], True)
+    assert index.mentions("Someone else, maybe Elsie.") == ([(20, "Elise")], True)
+    assert index.mentions("someone else") == ([], False)
+
+
+def test_canonicalize():
+    output = VoteOutput("Emily")
+    output.observe(render(DAY_VOTE_RETRY, delegatte_player="Emily", alive_players=PLAYERS))
+    request = render(DAY_VOTE, delegate_player="Emily")
+
+    clean = "I vote for Myra, her story did not add up."
+    assert output.canonicalize(request, clean) == clean
+    # my own name is not a candidate
+    assert output.canonicalize(request, "Emily votes John") == "Emily votes John"
+    assert output.canonicalize(request, "I vote Mira") == "I vote to eliminate Myra."
+    assert output.canonicalize(request, "Myra seems fine, I vote John") == "I vote to eliminate John."
+    assert output.canonicalize(request, "I am not sure yet") == "I am not sure yet"
+    assert output.canonicalize(render(DISCUSSION, delegate_player="Emily"), "Mira is odd") == "Mira is odd"
+    assert output.report() == {"votes": 5, "clean": 2, "misspelled": 1, "ambiguous": 1, "retries_avoided": 2, "unresolved": 1, "retries_received": 1}
+
+
+def test_eliminated_players_are_not_candidates():
+    output = VoteOutput("Myra")
+    output.observe(render(DOCTOR_SAVE, player="Myra", alive_players=PLAYERS))
+    output.observe(DAY_END.format(name="John", role="villager"))
+    assert output.alive == ["Myra", "Emily", "Elise", "Chagent"]
+    # the doctor may save themself
+    assert output.canonicalize(render(DOCTOR_SAVE, player="Myra", alive_players=output.alive), "Myra, John") == "Myra, John"